@@ -0,0 +1,148 @@
+from typing import List, Dict, Tuple
+import numpy as np
+import logging
+from .models import ScheduleRequest, RoomType, LockType
+
+logger = logging.getLogger(__name__)
+
+ROOM_TYPES = list(RoomType)
+
+
+def parse_period(period: str) -> Tuple[str, str]:
+    """Separar un periodo "Lun-3" en día y bloque"""
+    day, _, block = period.partition('-')
+    return day, block
+
+
+class ProblemInstance:
+    """
+    Versión compilada e indexada de un ScheduleRequest.
+
+    Se construye una sola vez por solicitud y traduce todos los identificadores
+    a enteros (posición en las listas de la solicitud), de modo que los solvers
+    y el cálculo de métricas nunca recorren listas ni separan strings en sus
+    ciclos internos.
+    """
+
+    def __init__(self, request: ScheduleRequest):
+        self.request = request
+
+        # Identificadores e índices
+        self.periods: List[str] = list(request.periods)
+        self.course_ids: List[str] = [c.id for c in request.courses]
+        self.room_ids: List[str] = [r.id for r in request.rooms]
+        self.teacher_ids: List[str] = [t.id for t in request.teachers]
+        for c in request.courses:
+            if c.teacherId not in self.teacher_ids:
+                self.teacher_ids.append(c.teacherId)
+
+        self.period_index: Dict[str, int] = {p: i for i, p in enumerate(self.periods)}
+        self.course_index: Dict[str, int] = {c: i for i, c in enumerate(self.course_ids)}
+        self.room_index: Dict[str, int] = {r: i for i, r in enumerate(self.room_ids)}
+        self.teacher_index: Dict[str, int] = {t: i for i, t in enumerate(self.teacher_ids)}
+
+        self.n_periods = len(self.periods)
+        self.n_courses = len(self.course_ids)
+        self.n_rooms = len(self.room_ids)
+        self.n_teachers = len(self.teacher_ids)
+
+        # Cursos y salas
+        self.course_teacher = np.array(
+            [self.teacher_index[c.teacherId] for c in request.courses], dtype=np.int64
+        )
+        self.course_blocks = np.array([c.blocksPerWeek for c in request.courses], dtype=np.int64)
+        self.course_room_type = np.array(
+            [ROOM_TYPES.index(c.roomType) for c in request.courses], dtype=np.int64
+        )
+        self.room_type = np.array([ROOM_TYPES.index(r.type) for r in request.rooms], dtype=np.int64)
+        self.course_normal = self.course_room_type == ROOM_TYPES.index(RoomType.NORMAL)
+        self.room_special = self.room_type != ROOM_TYPES.index(RoomType.NORMAL)
+        self.rooms_by_type: List[np.ndarray] = [
+            np.flatnonzero(self.room_type == k) for k in range(len(ROOM_TYPES))
+        ]
+        self.course_rooms: List[np.ndarray] = [
+            self.rooms_by_type[k] for k in self.course_room_type.tolist()
+        ]
+
+        self.teacher_courses: List[List[int]] = [[] for _ in range(self.n_teachers)]
+        for ci, t in enumerate(self.course_teacher.tolist()):
+            self.teacher_courses[t].append(ci)
+
+        # Días y bloques: periodo -> (día, bloque)
+        day_names = []
+        block_numbers = []
+        for p in self.periods:
+            day, block = parse_period(p)
+            day_names.append(day)
+            block_numbers.append(int(block) if block.isdigit() else None)
+        self.days: List[str] = list(dict.fromkeys(day_names))
+        day_lookup = {d: i for i, d in enumerate(self.days)}
+        self.n_days = len(self.days)
+        self.period_day = np.array([day_lookup[d] for d in day_names], dtype=np.int64)
+
+        # Bloques sin número toman su orden de aparición dentro del día
+        self.period_block = np.zeros(self.n_periods, dtype=np.int64)
+        seen_per_day = [0] * self.n_days
+        for i, (d, b) in enumerate(zip(self.period_day.tolist(), block_numbers)):
+            seen_per_day[d] += 1
+            self.period_block[i] = b if b is not None else seen_per_day[d]
+
+        # Periodos de cada día ordenados por bloque
+        self.day_periods: List[np.ndarray] = []
+        for d in range(self.n_days):
+            periods = np.flatnonzero(self.period_day == d)
+            self.day_periods.append(periods[np.argsort(self.period_block[periods], kind='stable')])
+        self.day_period_lists: List[List[int]] = [p.tolist() for p in self.day_periods]
+
+        self.period_first = np.zeros(self.n_periods, dtype=bool)
+        self.period_last = np.zeros(self.n_periods, dtype=bool)
+        for periods in self.day_period_lists:
+            if periods:
+                self.period_first[periods[0]] = True
+                self.period_last[periods[-1]] = True
+        self.max_block = int(self.period_block.max(initial=0))
+
+        # Disponibilidad docente × periodo (arreglo y máscara de bits por docente)
+        self.teacher_available = np.ones((self.n_teachers, self.n_periods), dtype=bool)
+        for a in request.availability:
+            t = self.teacher_index.get(a.teacherId)
+            p = self.period_index.get(a.period)
+            if t is not None and p is not None and not a.allowed:
+                self.teacher_available[t, p] = False
+        self.teacher_available_mask: List[int] = [
+            self._to_mask(row) for row in self.teacher_available
+        ]
+
+        # Bloqueos duros y asignaciones fijas
+        self.course_banned = np.zeros((self.n_courses, self.n_periods), dtype=bool)
+        self.must_place: List[Tuple[int, int]] = []
+        for lock in request.hardLocks:
+            c = self.course_index.get(lock.courseId)
+            p = self.period_index.get(lock.period)
+            if c is None or p is None:
+                logger.warning(f"Bloqueo ignorado: {lock.kind} {lock.courseId} {lock.period}")
+                continue
+            if lock.kind == LockType.BAN:
+                self.course_banned[c, p] = True
+            elif lock.kind == LockType.MUST_PLACE:
+                self.must_place.append((c, p))
+
+        self.fixed: List[Tuple[int, int, int]] = []
+        for fix in request.fixedAssignments:
+            c = self.course_index.get(fix.courseId)
+            p = self.period_index.get(fix.period)
+            r = self.room_index.get(fix.roomId)
+            if c is None or p is None or r is None:
+                logger.warning(f"Asignación fija ignorada: {fix.courseId} {fix.period} {fix.roomId}")
+                continue
+            self.fixed.append((c, p, r))
+
+        # Periodos permitidos por curso: disponibilidad del docente y prohibiciones
+        self.course_allowed = self.teacher_available[self.course_teacher] & ~self.course_banned
+
+    @staticmethod
+    def _to_mask(row: np.ndarray) -> int:
+        mask = 0
+        for p in np.flatnonzero(row).tolist():
+            mask |= 1 << p
+        return mask
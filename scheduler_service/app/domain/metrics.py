@@ -0,0 +1,133 @@
+"""
+Conteo de penalizaciones sobre horarios en forma de arreglos paralelos
+(curso, periodo, sala) de índices de un ProblemInstance. Es la referencia
+común para ambos solvers: el CP-SAT la usa para reportar métricas y la
+metaheurística para evaluar y verificar su evaluador incremental.
+"""
+from typing import List, Optional, Tuple
+import numpy as np
+from .models import Assignment, Metrics, Weights
+from .instance import ProblemInstance
+
+# Penalización por cada violación dura (topes, disponibilidad, prohibiciones)
+HARD_PENALTY = 1000000
+
+
+def assignments_to_arrays(instance: ProblemInstance,
+                          assignments: List[Assignment]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Traducir asignaciones del dominio a arreglos de índices (se omiten ids desconocidos)"""
+    rows = [
+        (instance.course_index[a.courseId], instance.period_index[a.period], instance.room_index[a.roomId])
+        for a in assignments
+        if a.courseId in instance.course_index and a.period in instance.period_index
+        and a.roomId in instance.room_index
+    ]
+    arrays = np.array(rows, dtype=np.int64).reshape(-1, 3)
+    return arrays[:, 0], arrays[:, 1], arrays[:, 2]
+
+
+def _count_pairs(keys: np.ndarray) -> int:
+    """Contar pares de bloques que comparten la misma clave"""
+    counts = np.bincount(keys)
+    return int((counts * (counts - 1) // 2).sum())
+
+
+def count_overlaps(instance: ProblemInstance, course: np.ndarray,
+                   period: np.ndarray, room: np.ndarray) -> int:
+    """Contar número de topes (docente y sala)"""
+    teachers = instance.course_teacher[course]
+    return (
+        _count_pairs(period * instance.n_teachers + teachers) +
+        _count_pairs(period * instance.n_rooms + room)
+    )
+
+
+def count_availability_violations(instance: ProblemInstance, course: np.ndarray,
+                                  period: np.ndarray) -> int:
+    """Contar bloques en periodos no disponibles para el docente o prohibidos para el curso"""
+    return int((~instance.course_allowed[course, period]).sum())
+
+
+def teacher_day_load(instance: ProblemInstance, course: np.ndarray, period: np.ndarray) -> np.ndarray:
+    """Carga de bloques por docente y día"""
+    loads = np.zeros((instance.n_teachers, instance.n_days), dtype=np.int64)
+    np.add.at(loads, (instance.course_teacher[course], instance.period_day[period]), 1)
+    return loads
+
+
+def count_holes(instance: ProblemInstance, course: np.ndarray, period: np.ndarray) -> int:
+    """Contar huecos en los horarios de los docentes"""
+    occupancy = np.zeros((instance.n_teachers, instance.n_days, instance.max_block + 1), dtype=bool)
+    occupancy[instance.course_teacher[course], instance.period_day[period], instance.period_block[period]] = True
+
+    n_slots = occupancy.shape[2]
+    busy = occupancy.any(axis=2)
+    first = occupancy.argmax(axis=2)
+    last = n_slots - 1 - occupancy[:, :, ::-1].argmax(axis=2)
+    count = occupancy.sum(axis=2)
+
+    # Huecos entre el primer y último bloque de cada día
+    return int(np.where(busy, last - first + 1 - count, 0).sum())
+
+
+def count_early(instance: ProblemInstance, period: np.ndarray) -> int:
+    """Contar bloques en la primera hora del día"""
+    return int(instance.period_first[period].sum())
+
+
+def count_late(instance: ProblemInstance, period: np.ndarray) -> int:
+    """Contar bloques en la última hora del día"""
+    return int(instance.period_last[period].sum())
+
+
+def calculate_imbalance(instance: ProblemInstance, course: np.ndarray, period: np.ndarray) -> float:
+    """Calcular desbalance en la carga diaria (suma de varianzas por docente)"""
+    if instance.n_days == 0:
+        return 0.0
+    return float(np.var(teacher_day_load(instance, course, period), axis=1).sum())
+
+
+def count_special_room_usage(instance: ProblemInstance, course: np.ndarray, room: np.ndarray) -> int:
+    """Contar uso innecesario de salas especiales"""
+    return int((instance.room_special[room] & instance.course_normal[course]).sum())
+
+
+def weighted_cost(weights: Weights, holes: float, early: float, late: float,
+                  imbalance: float, special_room: float, hard_violations: float) -> float:
+    """Función objetivo común a ambos solvers"""
+    return (
+        weights.holes * holes +
+        weights.early * early +
+        weights.late * late +
+        weights.imbalance * imbalance +
+        weights.specialRoom * special_room +
+        HARD_PENALTY * hard_violations
+    )
+
+
+def compute_metrics(instance: ProblemInstance, course: np.ndarray, period: np.ndarray,
+                    room: np.ndarray, objective: Optional[float] = None) -> Metrics:
+    """Calcular métricas de un horario; si no se entrega objetivo se usa weighted_cost"""
+    holes = count_holes(instance, course, period)
+    early = count_early(instance, period)
+    late = count_late(instance, period)
+    imbalance = calculate_imbalance(instance, course, period)
+    special_room = count_special_room_usage(instance, course, room)
+    hard_violations = (
+        count_overlaps(instance, course, period, room) +
+        count_availability_violations(instance, course, period)
+    )
+
+    if objective is None:
+        objective = weighted_cost(
+            instance.request.weights, holes, early, late, imbalance, special_room, hard_violations
+        )
+
+    return Metrics(
+        objective=objective,
+        holes=holes,
+        late=late,
+        early=early,
+        imbalance=imbalance,
+        hardViolations=hard_violations
+    )
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from enum import Enum
 
 class RoomType(str, Enum):
@@ -47,10 +47,68 @@ class Weights(BaseModel):
     imbalance: float = Field(ge=0)
     specialRoom: float = Field(ge=0)
 
+class Penalty(str, Enum):
+    HOLES = "holes"
+    LATE = "late"
+    EARLY = "early"
+    IMBALANCE = "imbalance"
+    SPECIAL_ROOM = "specialRoom"
+
+class CpFormulation(str, Enum):
+    WINDOW = "window"
+    COMPACT = "compact"
+
+class ObjectiveMode(str, Enum):
+    WEIGHTED = "weighted"
+    LEXICOGRAPHIC = "lexicographic"
+
+class AnnealingSchedule(str, Enum):
+    ADAPTIVE = "adaptive"
+    FIXED = "fixed"
+
+class Metaheuristic(str, Enum):
+    ANNEALING = "annealing"
+    TEMPERING = "tempering"
+
+class CpMode(str, Enum):
+    MONOLITHIC = "monolithic"
+    LNS = "lns"
+    TWO_STAGE = "two-stage"
+
+class CpProfile(str, Enum):
+    FAST = "fast"
+    BALANCED = "balanced"
+    PROVE_OPTIMAL = "prove-optimal"
+    DETERMINISTIC = "deterministic"
+
 class SolverOptions(BaseModel):
     maxTimeSec: int = Field(ge=1, default=30)
     seed: int = Field(default=7)
     fallbackIfNoFeasible: bool = Field(default=True)
+    annealingSchedule: AnnealingSchedule = Field(default=AnnealingSchedule.ADAPTIVE)
+    metaMaxTimeSec: Optional[float] = Field(gt=0, default=None)
+    # Con el esquema adaptativo, el enfriamiento por iteraciones hace reproducible la metaheurística
+    metaMaxIterations: Optional[int] = Field(ge=1, default=None)
+    metaWorkers: int = Field(ge=1, default=1)
+    metaBatchSize: int = Field(ge=1, default=1)
+    metaheuristic: Metaheuristic = Field(default=Metaheuristic.ANNEALING)
+    temperingReplicas: int = Field(ge=2, default=4)
+    cpMode: CpMode = Field(default=CpMode.MONOLITHIC)
+    cpProfile: CpProfile = Field(default=CpProfile.BALANCED)
+    cpWorkers: Optional[int] = Field(ge=1, default=None)
+    gapTolerance: Optional[float] = Field(ge=0, default=None)
+    warmStart: bool = Field(default=False)
+    cpSymmetryBreaking: bool = Field(default=False)
+    cpFormulation: CpFormulation = Field(default=CpFormulation.WINDOW)
+    portfolio: bool = Field(default=False)
+    objectiveMode: ObjectiveMode = Field(default=ObjectiveMode.WEIGHTED)
+    lexicographicOrder: List[Penalty] = Field(default=[])
+    decompose: bool = Field(default=False)
+
+class Assignment(BaseModel):
+    courseId: str
+    period: str
+    roomId: str
 
 class ScheduleRequest(BaseModel):
     periods: List[str]
@@ -60,14 +118,10 @@ class ScheduleRequest(BaseModel):
     availability: List[Availability]
     hardLocks: List[HardLock] = []
     fixedAssignments: List[FixedAssignment] = []
+    previousSchedule: List[Assignment] = []
     weights: Weights
     options: SolverOptions
 
-class Assignment(BaseModel):
-    courseId: str
-    period: str
-    roomId: str
-
 class Metrics(BaseModel):
     objective: float
     holes: int
@@ -75,6 +129,27 @@ class Metrics(BaseModel):
     early: int
     imbalance: float
     hardViolations: int
+    iterations: Optional[int] = None
+    iterationsPerSec: Optional[float] = None
+    acceptanceRatio: Optional[float] = None
+    buildTimeSec: Optional[float] = None
+    numVariables: Optional[int] = None
+    numConstraints: Optional[int] = None
+    prunedVariables: Optional[int] = None
+    hintFeasible: Optional[bool] = None
+    warmStartTimeSec: Optional[float] = None
+    timeToFirstSolutionSec: Optional[float] = None
+    modelCacheHit: Optional[bool] = None
+    resultCacheHit: Optional[bool] = None
+    symmetryGroups: Optional[int] = None
+    portfolioWinner: Optional[str] = None
+    lexicographicValues: Optional[Dict[str, int]] = None
+    components: Optional[int] = None
+    bestBound: Optional[float] = None
+    gap: Optional[float] = None
+    wallTimeSec: Optional[float] = None
+    deterministicTimeSec: Optional[float] = None
+    solutionsFound: Optional[int] = None
 
 class SolutionStatus(str, Enum):
     OPTIMAL = "OPTIMAL"
@@ -88,3 +163,29 @@ class ScheduleResponse(BaseModel):
     assignments: List[Assignment]
     metrics: Metrics
     explanation: str
+
+class SolutionUpdate(BaseModel):
+    """Solución mejorada reportada durante la búsqueda (/solve/stream)"""
+    objective: float
+    bound: float
+    gap: float
+    elapsedSec: float
+    assignments: List[Assignment]
+
+class JobStatus(str, Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+
+class Job(BaseModel):
+    """Resolución asíncrona (/jobs): estado, mejor solución hasta ahora y resultado"""
+    id: str
+    status: JobStatus
+    createdAt: float
+    startedAt: Optional[float] = None
+    finishedAt: Optional[float] = None
+    progress: Optional[SolutionUpdate] = None
+    result: Optional[ScheduleResponse] = None
+    error: Optional[str] = None
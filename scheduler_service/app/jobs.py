@@ -0,0 +1,222 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+import os
+import queue
+import threading
+import time
+import uuid
+import logging
+from .domain.models import ScheduleRequest, Job, JobStatus
+from .solver_cp.model_cache import structural_key
+from .service import stream_request
+from .solve_pool import SolvePool, PoolSaturated
+
+logger = logging.getLogger(__name__)
+
+# Configuración por variables de entorno del contenedor
+JOB_WORKERS_ENV = "JOB_WORKERS"  # Jobs que se resuelven a la vez en el pool
+JOB_QUEUE_DEPTH_ENV = "JOB_QUEUE_DEPTH"  # Jobs en espera antes de rechazar con 429
+JOB_RETENTION_ENV = "JOB_RETENTION_SEC"  # Tiempo que se conserva un job terminado
+DEFAULT_JOB_WORKERS = 1
+DEFAULT_JOB_QUEUE_DEPTH = 32
+DEFAULT_JOB_RETENTION_SEC = 3600
+
+FINISHED = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class JobStore(ABC):
+    """
+    Almacenamiento de jobs. JobManager solo usa estos métodos, de modo que se
+    puede reemplazar la implementación en memoria por otra local (por ejemplo,
+    en disco) sin cambiar el resto.
+    """
+
+    @abstractmethod
+    def save(self, job: Job):
+        ...
+
+    @abstractmethod
+    def load(self, job_id: str) -> Optional[Job]:
+        ...
+
+    @abstractmethod
+    def delete(self, job_id: str):
+        ...
+
+    @abstractmethod
+    def purge(self, finished_before: float):
+        """Eliminar los jobs terminados antes del instante dado"""
+
+
+class MemoryJobStore(JobStore):
+    """Jobs en un diccionario del proceso"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def save(self, job: Job):
+        with self._lock:
+            self._jobs[job.id] = job
+
+    def load(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def purge(self, finished_before: float):
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finishedAt is not None and job.finishedAt < finished_before
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+class JobManager:
+    """
+    Cola de resoluciones asíncronas (/jobs) sobre el pool de resolución.
+
+    submit devuelve el job de inmediato. Cada job se resuelve como /solve en un
+    proceso del pool (esperando lugar si está lleno); un hilo de este proceso
+    solo espera el resultado y guarda en el store cada solución mejorada de
+    CP-SAT (progress), de modo que get devuelve la mejor solución hasta ahora.
+    cancel detiene la búsqueda y conserva la mejor solución encontrada. Los
+    modos sin soluciones intermedias (LNS, por componentes) no reportan
+    progreso. Los jobs terminados se eliminan pasado retention_sec.
+    """
+
+    def __init__(self, pool: SolvePool, store: Optional[JobStore] = None, workers: Optional[int] = None,
+                 queue_depth: Optional[int] = None, retention_sec: Optional[float] = None):
+        self.pool = pool
+        self.store = store if store is not None else MemoryJobStore()
+        self.workers = workers or int(os.environ.get(JOB_WORKERS_ENV, DEFAULT_JOB_WORKERS))
+        if queue_depth is None:
+            queue_depth = int(os.environ.get(JOB_QUEUE_DEPTH_ENV, DEFAULT_JOB_QUEUE_DEPTH))
+        if retention_sec is None:
+            retention_sec = float(os.environ.get(JOB_RETENTION_ENV, DEFAULT_JOB_RETENTION_SEC))
+        self.retention_sec = retention_sec
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=max(queue_depth, 1))
+        self._requests: Dict[str, ScheduleRequest] = {}
+        self._running: Dict[str, object] = {}  # Evento de detención de cada job en curso
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, request: ScheduleRequest) -> Job:
+        """Encolar una resolución; PoolSaturated si la cola está llena"""
+        self.store.purge(time.time() - self.retention_sec)
+        job = Job(id=uuid.uuid4().hex, status=JobStatus.QUEUED, createdAt=time.time())
+        with self._lock:
+            self.store.save(job)
+            self._requests[job.id] = request
+        try:
+            self._queue.put_nowait(job.id)
+        except queue.Full:
+            with self._lock:
+                self.store.delete(job.id)
+                self._requests.pop(job.id, None)
+            raise PoolSaturated(f"Hay {self._queue.qsize()} jobs en espera (máximo {self._queue.maxsize})")
+        self._start_workers()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.load(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancelar un job en espera o en curso. Un job ya terminado se elimina del
+        store. Devuelve el job, o None si no existe.
+        """
+        with self._lock:
+            job = self.store.load(job_id)
+            if job is None:
+                return None
+            if job.status in FINISHED:
+                self.store.delete(job_id)
+                return job
+            queued = job.status == JobStatus.QUEUED
+            job = self._save(job, status=JobStatus.CANCELLED, finishedAt=time.time() if queued else None)
+            self._requests.pop(job_id, None)
+            stop = self._running.get(job_id)
+        if stop is not None:
+            stop.set()
+        return job
+
+    def _start_workers(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"job-worker-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(job_id)
+            except Exception as e:
+                logger.error(f"Error en el job {job_id}: {str(e)}")
+                self._finish(job_id, status=JobStatus.FAILED, error=str(e))
+
+    def _run(self, job_id: str):
+        updates, stop = self.pool.channel()
+        with self._lock:
+            job = self.store.load(job_id)
+            request = self._requests.pop(job_id, None)
+            if job is None or job.status != JobStatus.QUEUED or request is None:
+                return
+            self._save(job, status=JobStatus.RUNNING, startedAt=time.time())
+            self._running[job_id] = stop
+
+        try:
+            future = self.pool.submit(
+                stream_request, request, updates, stop, affinity=structural_key(request), block=True
+            )
+            # Marca de fin: el proceso ya envió todas sus soluciones cuando termina
+            future.add_done_callback(lambda _: updates.put(None))
+            with self._lock:
+                job = self.store.load(job_id)
+                if job is None or job.status != JobStatus.RUNNING:
+                    # Cancelado mientras esperaba lugar en el pool
+                    stop.set()
+            while True:
+                update = updates.get()
+                if update is None:
+                    break
+                self._update(job_id, progress=update)
+            response = future.result()
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+        self._finish(job_id, status=JobStatus.COMPLETED, result=response)
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            job = self.store.load(job_id)
+            if job is not None:
+                self._save(job, **fields)
+
+    def _finish(self, job_id: str, **fields):
+        with self._lock:
+            self._finish_locked(job_id, finishedAt=time.time(), **fields)
+
+    def _finish_locked(self, job_id: str, **fields):
+        """Cerrar el job; uno cancelado conserva su estado pero guarda el resultado"""
+        job = self.store.load(job_id)
+        if job is None:
+            return
+        if job.status == JobStatus.CANCELLED:
+            fields.pop('status', None)
+        self._save(job, **fields)
+
+    def _save(self, job: Job, **fields) -> Job:
+        job = job.model_copy(update=fields)
+        self.store.save(job)
+        return job
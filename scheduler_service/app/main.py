@@ -1,13 +1,18 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from .domain.models import (
     ScheduleRequest,
     ScheduleResponse,
-    Assignment,
-    SolutionStatus
+    Job
 )
-from .solver_cp.cp_solver import ScheduleSolver
-from .solver_meta.simulated_annealing import SimulatedAnnealing
+from .solver_cp.model_cache import structural_key
+from .service import solve_request, stream_request, repair_request
+from .solve_pool import SolvePool, PoolSaturated, PoolUnavailable, RETRY_AFTER_SEC
+from .jobs import JobManager
+from .result_cache import ResultCache, request_key
 from .nlp.interpreter import NaturalLanguageInterpreter, NLPRequest, NLPResponse
+import asyncio
+import json
 import logging
 
 app = FastAPI(
@@ -18,6 +23,24 @@ app = FastAPI(
 
 logger = logging.getLogger(__name__)
 
+# Las resoluciones corren en un pool acotado de procesos para no bloquear el event loop
+solve_pool = SolvePool()
+
+# Resoluciones largas como jobs asíncronos, con su propia cola sobre el mismo pool
+job_manager = JobManager(solve_pool)
+
+# Respuestas de /solve para solicitudes idénticas (incluida la semilla)
+result_cache = ResultCache()
+
+async def _run_in_pool(fn, request: ScheduleRequest, affinity=None) -> ScheduleResponse:
+    """Ejecutar en el pool, traduciendo la saturación a 429 y la falta de procesos a 503"""
+    try:
+        return await solve_pool.run(fn, request, affinity=affinity)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(RETRY_AFTER_SEC)})
+    except PoolUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(RETRY_AFTER_SEC)})
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
@@ -29,39 +52,103 @@ async def version():
 @app.post("/solve", response_model=ScheduleResponse)
 async def solve_schedule(request: ScheduleRequest):
     try:
-        # Intentar primero con CP-SAT
-        solver = ScheduleSolver(request)
-        response = solver.solve()
-        
-        # Si CP-SAT no encuentra solución y está habilitado el fallback
-        if (response.status in [SolutionStatus.INFEASIBLE, SolutionStatus.TIMEOUT] 
-            and request.options.fallbackIfNoFeasible):
-            logger.info("CP-SAT no encontró solución, intentando con metaheurística")
-            meta_solver = SimulatedAnnealing(request)
-            response = meta_solver.solve()
-        
-        return response
+        # Solicitudes idénticas se resuelven una sola vez; las que solo comparten
+        # estructura van al proceso que tiene su modelo en caché
+        return await result_cache.get_or_solve(
+            request_key(request),
+            lambda: _run_in_pool(solve_request, request, affinity=structural_key(request))
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error solving schedule: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _stream_message(item, sse: bool) -> str:
+    """Serializar una actualización, el resultado final o un error como NDJSON o SSE"""
+    if isinstance(item, Exception):
+        event, data = "error", json.dumps({"detail": str(item)})
+    else:
+        event = "result" if isinstance(item, ScheduleResponse) else "solution"
+        data = item.model_dump_json()
+    return f"event: {event}\ndata: {data}\n\n" if sse else data + "\n"
+
+@app.post("/solve/stream")
+async def solve_schedule_stream(request: ScheduleRequest, http_request: Request):
+    """
+    Resolver como /solve, enviando cada solución mejorada de CP-SAT apenas se
+    encuentra (objetivo, cota, brecha, tiempo y asignaciones). El último mensaje
+    es el ScheduleResponse de /solve. Se responde con server-sent events si el
+    cliente acepta text/event-stream y con NDJSON en otro caso; si el cliente se
+    desconecta, la búsqueda se detiene.
+
+    La búsqueda corre en el pool de resolución como /solve; las soluciones
+    llegan desde el proceso por una cola compartida.
+    """
+    sse = "text/event-stream" in http_request.headers.get("accept", "")
+    loop = asyncio.get_running_loop()
+    updates, stop = solve_pool.channel()
+    try:
+        future = solve_pool.submit(stream_request, request, updates, stop, affinity=structural_key(request))
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(RETRY_AFTER_SEC)})
+    except PoolUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(RETRY_AFTER_SEC)})
+    # Marca de fin: el proceso ya envió todas sus soluciones cuando termina
+    future.add_done_callback(lambda _: updates.put(None))
+
+    async def stream():
+        try:
+            while True:
+                item = await loop.run_in_executor(None, updates.get)
+                if item is None:
+                    break
+                yield _stream_message(item, sse)
+            try:
+                yield _stream_message(await solve_pool.wait(future), sse)
+            except Exception as e:
+                logger.error(f"Error solving schedule: {str(e)}")
+                yield _stream_message(e, sse)
+        finally:
+            if not future.done():
+                stop.set()
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type)
+
+@app.post("/jobs", response_model=Job, status_code=202)
+async def create_job(request: ScheduleRequest):
+    """
+    Encolar una resolución como /solve y devolver el job de inmediato. El estado,
+    la mejor solución hasta ahora y el resultado se consultan en GET /jobs/{id}.
+    """
+    try:
+        return job_manager.submit(request)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(RETRY_AFTER_SEC)})
+
+@app.get("/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} no encontrado")
+    return job
+
+@app.delete("/jobs/{job_id}", response_model=Job)
+async def cancel_job(job_id: str):
+    """Cancelar un job en espera o en curso (conserva la mejor solución); uno terminado se elimina"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} no encontrado")
+    return job
+
 @app.post("/repair", response_model=ScheduleResponse)
 async def repair_schedule(request: ScheduleRequest):
     try:
         # Usar directamente el solver metaheurístico para reparaciones
-        solver = SimulatedAnnealing(request)
-        
-        # Extraer asignaciones fijas de request.fixedAssignments
-        fixed_assignments = [
-            Assignment(
-                courseId=fix.courseId,
-                period=fix.period,
-                roomId=fix.roomId
-            ) for fix in request.fixedAssignments
-        ]
-        
-        response = solver.solve(initial_solution=fixed_assignments)
-        return response
+        return await _run_in_pool(repair_request, request)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error repairing schedule: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
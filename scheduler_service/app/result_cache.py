@@ -0,0 +1,145 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+from .domain.models import ScheduleRequest, ScheduleResponse, SolutionStatus
+
+logger = logging.getLogger(__name__)
+
+# Configuración por variables de entorno del contenedor
+RESULT_CACHE_ENTRIES_ENV = "RESULT_CACHE_MAX_ENTRIES"  # 0 desactiva la caché (se mantiene la deduplicación)
+RESULT_CACHE_TTL_ENV = "RESULT_CACHE_TTL_SEC"
+DEFAULT_RESULT_CACHE_ENTRIES = 128
+DEFAULT_RESULT_CACHE_TTL_SEC = 600
+# Resultados que no cambian al reintentar; un TIMEOUT o la respuesta de
+# respaldo de la metaheurística podrían mejorar con otro intento
+CACHEABLE_STATUSES = (SolutionStatus.OPTIMAL, SolutionStatus.FEASIBLE, SolutionStatus.INFEASIBLE)
+
+
+def request_key(request: ScheduleRequest) -> str:
+    """
+    Hash canónico de la solicitud completa, incluidos pesos y opciones (y por
+    lo tanto la semilla). No depende del orden de las listas de datos; sí del
+    de los periodos (define el orden de días y bloques sin número) y del de
+    options.lexicographicOrder, que define prioridades.
+    """
+    def canonical(items) -> list:
+        return sorted(json.dumps(item.model_dump(mode='json'), sort_keys=True) for item in items)
+
+    data = {
+        'periods': list(request.periods),
+        'rooms': canonical(request.rooms),
+        'teachers': canonical(request.teachers),
+        'courses': canonical(request.courses),
+        'availability': canonical(request.availability),
+        'hardLocks': canonical(request.hardLocks),
+        'fixedAssignments': canonical(request.fixedAssignments),
+        'previousSchedule': canonical(request.previousSchedule),
+        'weights': request.weights.model_dump(mode='json'),
+        'options': request.options.model_dump(mode='json')
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Caché LRU con vencimiento (TTL) de respuestas de /solve, indexada por
+    request_key, con deduplicación de solicitudes en curso: si llega una
+    solicitud idéntica a otra que se está resolviendo, espera esa resolución en
+    lugar de lanzar otra. Solo se guardan los estados de CACHEABLE_STATUSES; los
+    errores no se guardan y se entregan a todos los que esperaban. Las respuestas servidas sin resolver (desde la caché o
+    compartidas) llevan metrics.resultCacheHit en True.
+
+    La deduplicación usa futures de concurrent.futures, así que funciona aunque
+    las solicitudes lleguen por event loops distintos.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_sec: Optional[float] = None):
+        if max_entries is None:
+            max_entries = int(os.environ.get(RESULT_CACHE_ENTRIES_ENV, DEFAULT_RESULT_CACHE_ENTRIES))
+        if ttl_sec is None:
+            ttl_sec = float(os.environ.get(RESULT_CACHE_TTL_ENV, DEFAULT_RESULT_CACHE_TTL_SEC))
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._entries: "OrderedDict[str, Tuple[float, ScheduleResponse]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_solve(self, key: str, solve: Callable[[], Awaitable[ScheduleResponse]]) -> ScheduleResponse:
+        """Respuesta en caché para la clave, la de una resolución idéntica en curso o la de solve()"""
+        with self._lock:
+            response = self._lookup(key)
+            if response is not None:
+                self.hits += 1
+                return self._served(response)
+            shared = self._inflight.get(key)
+            if shared is None:
+                self.misses += 1
+                shared = self._inflight[key] = Future()
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            # Si se cancela este cliente, el future compartido sigue pendiente
+            # para el primero y los demás
+            return self._served(await asyncio.shield(asyncio.wrap_future(shared)))
+
+        try:
+            response = await solve()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            # Una cancelación del primer cliente no debe cancelar a los demás
+            error = e if isinstance(e, Exception) else RuntimeError("La resolución compartida se interrumpió")
+            if not shared.done():
+                shared.set_exception(error)
+            raise
+        response.metrics.resultCacheHit = False
+        with self._lock:
+            del self._inflight[key]
+            self._store(key, response)
+        if not shared.done():
+            shared.set_result(response)
+        return response
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, key: str) -> Optional[ScheduleResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _store(self, key: str, response: ScheduleResponse):
+        if self.max_entries <= 0 or response.status not in CACHEABLE_STATUSES:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_sec, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _served(response: ScheduleResponse) -> ScheduleResponse:
+        served = response.model_copy(deep=True)
+        served.metrics.resultCacheHit = True
+        return served
@@ -0,0 +1,125 @@
+from typing import Any, Optional, Tuple
+import logging
+from .domain.models import (
+    ScheduleRequest,
+    ScheduleResponse,
+    Assignment,
+    SolutionStatus,
+    Metaheuristic,
+    CpMode
+)
+from .domain.instance import ProblemInstance
+from .solver_cp.cp_solver import ScheduleSolver
+from .solver_cp.lns import LargeNeighborhoodSearch
+from .solver_cp.two_stage import TwoStageSolver
+from .solver_cp.model_cache import ModelCache, structural_key
+from .solver_cp.portfolio import PortfolioSolver
+from .solver_cp.decomposition import DecomposedSolver, split_components
+from .solver_cp.cancellation import stop_on
+from .solver_meta.simulated_annealing import SimulatedAnnealing
+from .solver_meta.multistart import ParallelAnnealing
+from .solver_meta.parallel_tempering import ParallelTempering
+
+logger = logging.getLogger(__name__)
+
+# Modelos CP-SAT construidos, reutilizables cuando solo cambian pesos u opciones.
+# Cada proceso del pool de resolución tiene su propia caché.
+model_cache = ModelCache()
+
+
+def make_metaheuristic(request: ScheduleRequest, instance: ProblemInstance):
+    """Elegir la metaheurística según las opciones de la solicitud"""
+    if request.options.metaheuristic == Metaheuristic.TEMPERING:
+        return ParallelTempering(request, instance)
+    if request.options.metaWorkers > 1:
+        return ParallelAnnealing(request, instance)
+    return SimulatedAnnealing(request, instance)
+
+
+def checkout_cp_solver(request: ScheduleRequest) -> Tuple[Optional[str], Any]:
+    """
+    Solver CP para la solicitud (modelo completo, LNS o dos etapas para
+    instancias grandes, o por componentes independientes si se pide) y su clave
+    en la caché de modelos (None si no se guarda en caché).
+    """
+    if request.options.decompose:
+        components = split_components(request)
+        if len(components) > 1:
+            return None, DecomposedSolver(request, components)
+    if request.options.cpMode == CpMode.LNS:
+        return None, LargeNeighborhoodSearch(request, ProblemInstance(request))
+    # Reutilizar el modelo construido si solo cambiaron pesos u opciones de búsqueda
+    key = structural_key(request)
+    solver = model_cache.checkout(key)
+    if solver is not None:
+        solver.reuse(request)
+    elif request.options.cpMode == CpMode.TWO_STAGE:
+        solver = TwoStageSolver(request, ProblemInstance(request))
+    else:
+        solver = ScheduleSolver(request, ProblemInstance(request))
+    return key, solver
+
+
+def run_solve(request: ScheduleRequest, key: Optional[str], solver) -> ScheduleResponse:
+    """Resolver con CP, devolver el modelo a la caché y recurrir a la metaheurística si falla"""
+    if request.options.portfolio and isinstance(solver, ScheduleSolver):
+        response = PortfolioSolver(request, solver).solve()
+    else:
+        response = solver.solve()
+    if key is not None:
+        model_cache.checkin(key, solver)
+
+    # Si CP-SAT no encuentra solución y está habilitado el fallback (salvo que se haya detenido)
+    if (response.status in [SolutionStatus.INFEASIBLE, SolutionStatus.TIMEOUT]
+        and request.options.fallbackIfNoFeasible
+        and not solver.stop_requested):
+        logger.info("CP-SAT no encontró solución, intentando con metaheurística")
+        # La instancia compilada se comparte con la metaheurística
+        meta_solver = make_metaheuristic(request, solver.instance)
+        response = meta_solver.solve()
+
+    return response
+
+
+def solve_request(request: ScheduleRequest) -> ScheduleResponse:
+    """Resolver una solicitud de /solve (punto de entrada de los procesos del pool)"""
+    key, solver = checkout_cp_solver(request)
+    return run_solve(request, key, solver)
+
+
+def stream_request(request: ScheduleRequest, updates, stop) -> ScheduleResponse:
+    """
+    Resolver como solve_request enviando cada solución mejorada de CP-SAT a la
+    cola updates; la búsqueda se detiene cuando se activa el evento stop
+    (ambos de SolvePool.channel). Punto de entrada del pool para /solve/stream
+    y los jobs.
+    """
+    key, solver = checkout_cp_solver(request)
+    if isinstance(solver, ScheduleSolver):
+        solver.listener = updates.put
+    try:
+        with stop_on(solver, stop):
+            return run_solve(request, key, solver)
+    finally:
+        if isinstance(solver, ScheduleSolver):
+            solver.listener = None
+
+
+def repair_request(request: ScheduleRequest) -> ScheduleResponse:
+    """Reparar con la metaheurística partiendo de las asignaciones fijas (punto de entrada del pool)"""
+    solver = make_metaheuristic(request, ProblemInstance(request))
+
+    # Extraer asignaciones fijas de request.fixedAssignments
+    fixed_assignments = [
+        Assignment(
+            courseId=fix.courseId,
+            period=fix.period,
+            roomId=fix.roomId
+        ) for fix in request.fixedAssignments
+    ]
+
+    return solver.solve(initial_solution=fixed_assignments)
+
+
+def clear_model_cache():
+    model_cache.clear()
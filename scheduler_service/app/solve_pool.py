@@ -0,0 +1,161 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Optional, Tuple
+import asyncio
+import multiprocessing
+import os
+import threading
+import logging
+from .solver_cp.profiles import available_cpus, limit_cpus
+
+logger = logging.getLogger(__name__)
+
+# Configuración por variables de entorno del contenedor
+WORKERS_ENV = "SOLVER_WORKERS"  # Procesos de resolución (por defecto, los núcleos disponibles)
+QUEUE_DEPTH_ENV = "SOLVER_QUEUE_DEPTH"  # Solicitudes en espera además de las que se resuelven
+DEFAULT_QUEUE_PER_WORKER = 4
+RETRY_AFTER_SEC = 5
+
+
+class PoolSaturated(Exception):
+    """No queda lugar en la cola de resolución (se responde 429)"""
+
+
+class PoolUnavailable(Exception):
+    """El pool de resolución no puede atender la solicitud (se responde 503)"""
+
+
+class SolvePool:
+    """
+    Pool acotado de procesos para ejecutar las resoluciones fuera del event loop.
+
+    Admite a lo sumo workers solicitudes en ejecución más queue_depth en
+    espera; las demás se rechazan de inmediato con PoolSaturated. Cada worker es
+    un ProcessPoolExecutor de un proceso, de modo que una solicitud puede
+    dirigirse al proceso que ya tiene su modelo en caché (affinity): se usa el
+    worker menos ocupado y, entre los empatados, el de la afinidad. Cada worker
+    recibe una parte igual de los núcleos (limit_cpus), de modo que CP-SAT y las
+    metaheurísticas paralelas dentro de él no sobresuscriben el contenedor.
+
+    Para resoluciones que informan progreso, channel() entrega una cola y un
+    evento compartidos entre procesos: el worker envía soluciones por la cola y
+    la API activa el evento para detener la búsqueda.
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_depth: Optional[int] = None):
+        self.workers = workers or int(os.environ.get(WORKERS_ENV, 0)) or available_cpus()
+        if queue_depth is None:
+            queue_depth = int(os.environ.get(QUEUE_DEPTH_ENV, DEFAULT_QUEUE_PER_WORKER * self.workers))
+        self.queue_depth = queue_depth
+        self.worker_cpus = max(1, available_cpus() // self.workers)
+        self._executors: List[Optional[ProcessPoolExecutor]] = [None] * self.workers
+        self._pending = [0] * self.workers
+        self._admitted = 0
+        self._manager = None
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_depth
+
+    @property
+    def admitted(self) -> int:
+        return self._admitted
+
+    def admit(self, block: bool = False):
+        """Reservar un lugar; si la cola está llena, esperar (block) o lanzar PoolSaturated"""
+        with self._lock:
+            while block and self._admitted >= self.capacity:
+                self._released.wait()
+            if self._admitted >= self.capacity:
+                raise PoolSaturated(
+                    f"Hay {self._admitted} resoluciones en curso o en espera (máximo {self.capacity})"
+                )
+            self._admitted += 1
+
+    def release(self):
+        with self._lock:
+            self._admitted -= 1
+            self._released.notify()
+
+    def submit(self, fn: Callable, *args, affinity: Optional[str] = None, block: bool = False) -> Future:
+        """
+        Encolar fn(*args) en un proceso del pool. El lugar se libera cuando el
+        proceso termina, aunque el cliente se haya ido. Con block se espera un
+        lugar en vez de rechazar.
+        """
+        self.admit(block)
+        with self._lock:
+            preferred = hash(affinity) % self.workers if affinity is not None else 0
+            slot = min(range(self.workers), key=lambda k: (self._pending[k], k != preferred))
+            self._pending[slot] += 1
+
+        def done(future: Optional[Future]):
+            with self._lock:
+                self._pending[slot] -= 1
+            if future is not None and not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+                self._discard(slot, executor, future.exception())
+            self.release()
+
+        executor = self._executor(slot)
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool as e:
+            self._discard(slot, executor, e)
+            done(None)
+            raise self._unavailable(e)
+        future.add_done_callback(done)
+        return future
+
+    async def run(self, fn: Callable, *args, affinity: Optional[str] = None):
+        """Ejecutar fn(*args) en un proceso del pool sin bloquear el event loop"""
+        return await self.wait(self.submit(fn, *args, affinity=affinity))
+
+    async def wait(self, future: Future):
+        """Esperar una resolución encolada con submit sin bloquear el event loop"""
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool as e:
+            raise self._unavailable(e)
+
+    def channel(self) -> Tuple[multiprocessing.Queue, multiprocessing.Event]:
+        """Cola de progreso y evento de detención que pueden pasarse a un proceso del pool"""
+        with self._lock:
+            if self._manager is None:
+                self._manager = multiprocessing.Manager()
+            return self._manager.Queue(), self._manager.Event()
+
+    def broadcast(self, fn: Callable):
+        """Ejecutar fn() en cada proceso ya iniciado y esperar el resultado"""
+        for executor in self._executors:
+            if executor is not None:
+                executor.submit(fn).result()
+
+    def shutdown(self):
+        for k, executor in enumerate(self._executors):
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+                self._executors[k] = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+    def _discard(self, slot: int, executor: ProcessPoolExecutor, error: BaseException):
+        """Un proceso murió (por ejemplo, sin memoria): se recrea en la próxima solicitud"""
+        with self._lock:
+            if self._executors[slot] is executor:
+                logger.error(f"Proceso de resolución {slot} caído: {error}")
+                self._executors[slot] = None
+
+    @staticmethod
+    def _unavailable(error: BaseException) -> PoolUnavailable:
+        return PoolUnavailable(f"El proceso de resolución terminó inesperadamente: {error}")
+
+    def _executor(self, slot: int) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executors[slot] is None:
+                self._executors[slot] = ProcessPoolExecutor(
+                    max_workers=1, initializer=limit_cpus, initargs=(self.worker_cpus,)
+                )
+            return self._executors[slot]
@@ -0,0 +1,28 @@
+from contextlib import contextmanager
+import threading
+
+STOP_POLL_SEC = 0.1  # Frecuencia con que se revisa un pedido de detención
+
+
+@contextmanager
+def stop_on(solver, stop, interval: float = STOP_POLL_SEC):
+    """
+    Mientras dura el bloque, llamar solver.stop() cuando se active el evento
+    stop (de threading o multiprocessing, por ejemplo el de
+    SolvePool.channel). Se insiste en cada intervalo hasta que el bloque
+    termine, porque un pedido que llega mientras se construye el modelo no
+    detiene una búsqueda que todavía no empezó.
+    """
+    finished = threading.Event()
+
+    def watch():
+        while not finished.is_set():
+            if stop.wait(interval):
+                solver.stop()
+                finished.wait(interval)
+
+    threading.Thread(target=watch, daemon=True).start()
+    try:
+        yield
+    finally:
+        finished.set()
@@ -4,229 +4,607 @@ from ..domain.models import (
     ScheduleResponse, 
     Assignment, 
     Metrics, 
-    SolutionStatus
+    SolutionStatus,
+    SolutionUpdate,
+    ObjectiveMode,
+    CpFormulation,
+    Weights
 )
+from ..domain.instance import ProblemInstance
+from ..domain.metrics import compute_metrics, assignments_to_arrays
+from ..solver_meta.simulated_annealing import SimulatedAnnealing
+from .profiles import apply_profile
+from .presolve import Presolve
+from .symmetry import Symmetries
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import Callable, List, Dict, Set, Tuple, Optional
+import copy
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+WARM_START_TIME_FRACTION = 0.1  # Fracción del presupuesto para la pasada heurística de arranque
+
+
+def relative_gap(objective: float, bound: float) -> float:
+    """Brecha relativa entre el objetivo y la cota inferior (0 si el objetivo es 0)"""
+    return abs(objective - bound) / abs(objective) if objective else 0.0
+
+
+class SolutionProgress(cp_model.CpSolverSolutionCallback):
+    """
+    Registrar el avance de la búsqueda: soluciones encontradas y tiempo de la
+    primera. Si se entrega on_solution, se llama con el propio callback en cada
+    solución nueva (desde el hilo del solver).
+    """
+
+    def __init__(self, on_solution: Optional[Callable[['SolutionProgress'], None]] = None):
+        super().__init__()
+        self.solutions = 0
+        self.first_solution_time: Optional[float] = None
+        self.on_solution = on_solution
+
+    def on_solution_callback(self):
+        if self.solutions == 0:
+            self.first_solution_time = self.WallTime()
+        self.solutions += 1
+        if self.on_solution is not None:
+            self.on_solution(self)
+
+
 class ScheduleSolver:
-    def __init__(self, request: ScheduleRequest):
+    def __init__(self, request: ScheduleRequest, instance: Optional[ProblemInstance] = None):
         self.request = request
+        self.instance = instance or ProblemInstance(request)
         self.model = cp_model.CpModel()
         self.solver = cp_model.CpSolver()
-        self.solver.parameters.max_time_in_seconds = request.options.maxTimeSec
-        self.solver.parameters.random_seed = request.options.seed
-        
-        # Índices para acceso rápido
-        self.period_indices = {p: i for i, p in enumerate(request.periods)}
-        self.room_indices = {r.id: i for i, r in enumerate(request.rooms)}
-        self.course_indices = {c.id: i for i, c in enumerate(request.courses)}
+        apply_profile(self.solver.parameters, request.options)
+        self.progress = SolutionProgress(self._report_solution)
+        # Receptor de soluciones mejoradas durante la búsqueda (streaming)
+        self.listener: Optional[Callable[[SolutionUpdate], None]] = None
+        self.solve_start: Optional[float] = None
+        self.search_wall_time = 0.0
+        self.search_deterministic_time = 0.0
+        self.stop_requested = False
+        self.lexicographic_values: Optional[Dict[str, int]] = None
+        self.hint_feasible: Optional[bool] = None
+        self.warm_start_time: Optional[float] = None
+        self.penalties: Optional[Dict[str, cp_model.LinearExpr]] = None
+        self.constant_penalties: Set[str] = set()  # Penalizaciones sin variables
+        self.last_solution: List[Assignment] = []
+        self.reused = False
+        self.symmetry: Optional[Symmetries] = None
+        self.day_loads: Optional[Dict[Tuple[int, int], cp_model.IntVar]] = None
         
-        # Variables binarias x[c,p,r] = 1 si el curso c se dicta en periodo p y sala r
+        build_start = time.perf_counter()
+        self._create_variables()
+        self.build_time = time.perf_counter() - build_start
+
+    def _create_variables(self):
+        """
+        Crear x[c,p,r] = 1 si el curso c se dicta en periodo p y sala r (índices
+        enteros del ProblemInstance), solo en el dominio que deja el Presolve:
+        las celdas prohibidas no tienen variable y las fijas son constantes.
+        También se crean los índices que usan las restricciones: variables por
+        (curso, periodo), ocupación por (docente, periodo) y por (sala, periodo).
+        """
+        inst = self.instance
+        self.presolve = Presolve(inst)
         self.x = {}
-        for c in request.courses:
-            for p in request.periods:
-                for r in request.rooms:
-                    if r.type == c.roomType:  # Solo crear variables para salas compatibles
-                        self.x[c.id, p, r.id] = self.model.NewBoolVar(f'x_{c.id}_{p}_{r.id}')
-    
+        self.course_period_vars: Dict[Tuple[int, int], list] = {}
+        self.room_period_vars: Dict[Tuple[int, int], list] = {}
+        for c in range(inst.n_courses):
+            for p in range(inst.n_periods):
+                cell = []
+                fixed = self.presolve.is_fixed(c, p)
+                for r in self.presolve.rooms(c, p):
+                    var = self.model.NewConstant(1) if fixed else self.model.NewBoolVar(f'x_{c}_{p}_{r}')
+                    self.x[c, p, r] = var
+                    cell.append(var)
+                    self.room_period_vars.setdefault((r, p), []).append(var)
+                self.course_period_vars[c, p] = cell
+        self.pruned = sum(len(rooms) for rooms in inst.course_rooms) * inst.n_periods - len(self.x)
+        self._index_teachers()
+
+    def _index_teachers(self):
+        """Variables y expresión de ocupación de cada docente en cada periodo"""
+        inst = self.instance
+        self.teacher_period_vars: Dict[Tuple[int, int], list] = {}
+        for t in range(inst.n_teachers):
+            for p in range(inst.n_periods):
+                self.teacher_period_vars[t, p] = [
+                    var for c in inst.teacher_courses[t] for var in self.course_period_vars[c, p]
+                ]
+        self.teacher_busy = {
+            key: cp_model.LinearExpr.Sum(group) for key, group in self.teacher_period_vars.items()
+        }
+
     def add_coverage_constraints(self):
         """Cada curso debe cumplir con sus blocksPerWeek"""
-        for c in self.request.courses:
+        inst = self.instance
+        for c in range(inst.n_courses):
             self.model.Add(
-                sum(self.x[c.id, p, r.id] 
-                    for p in self.request.periods 
-                    for r in self.request.rooms 
-                    if r.type == c.roomType) == c.blocksPerWeek
+                cp_model.LinearExpr.Sum([
+                    var for p in range(inst.n_periods) for var in self.course_period_vars[c, p]
+                ]) == int(inst.course_blocks[c])
             )
     
     def add_no_overlap_constraints(self):
         """Un docente no puede dictar más de un curso por periodo y 
         una sala no puede alojar más de un curso por periodo"""
-        
         # No topes de docente
-        for p in self.request.periods:
-            for t in self.request.teachers:
-                courses_by_teacher = [c for c in self.request.courses if c.teacherId == t.id]
-                self.model.Add(
-                    sum(self.x[c.id, p, r.id]
-                        for c in courses_by_teacher
-                        for r in self.request.rooms
-                        if r.type == c.roomType) <= 1
-                )
+        for group in self.teacher_period_vars.values():
+            if len(group) > 1:
+                self.model.AddAtMostOne(group)
         
         # No topes de sala
-        for p in self.request.periods:
-            for r in self.request.rooms:
-                self.model.Add(
-                    sum(self.x[c.id, p, r.id]
-                        for c in self.request.courses
-                        if r.type == c.roomType) <= 1
-                )
-
-    def add_availability_constraints(self):
-        """Respetar las disponibilidades de los docentes"""
-        for a in self.request.availability:
-            if not a.allowed:
-                courses = [c for c in self.request.courses if c.teacherId == a.teacherId]
-                for c in courses:
-                    for r in self.request.rooms:
-                        if r.type == c.roomType and (c.id, a.period, r.id) in self.x:
-                            self.model.Add(self.x[c.id, a.period, r.id] == 0)
+        for group in self.room_period_vars.values():
+            if len(group) > 1:
+                self.model.AddAtMostOne(group)
 
     def add_hard_locks(self):
-        """Aplicar prohibiciones y obligaciones puntuales"""
-        for lock in self.request.hardLocks:
-            if lock.kind == "ban":
-                for r in self.request.rooms:
-                    if (lock.courseId, lock.period, r.id) in self.x:
-                        self.model.Add(self.x[lock.courseId, lock.period, r.id] == 0)
-            elif lock.kind == "must-place":
-                self.model.Add(
-                    sum(self.x[lock.courseId, lock.period, r.id]
-                        for r in self.request.rooms
-                        if (lock.courseId, lock.period, r.id) in self.x) == 1
-                )
+        """Aplicar obligaciones puntuales (las prohibiciones ya no tienen variables)"""
+        for c, p in self.instance.must_place:
+            self.model.Add(cp_model.LinearExpr.Sum(self.course_period_vars[c, p]) == 1)
 
     def add_fixed_assignments(self):
-        """Respetar asignaciones fijas"""
-        for fix in self.request.fixedAssignments:
-            if (fix.courseId, fix.period, fix.roomId) in self.x:
-                self.model.Add(self.x[fix.courseId, fix.period, fix.roomId] == 1)
+        """Las asignaciones fijas ya son constantes; las que chocan entre sí hacen el modelo infactible"""
+        if self.presolve.conflicts:
+            self.model.AddBoolOr([])
 
     def add_objective(self):
-        """Añadir función objetivo con penalizaciones"""
-        holes_cost = self._calculate_holes_cost()
-        late_early_cost = self._calculate_late_early_cost()
-        imbalance_cost = self._calculate_imbalance_cost()
-        special_room_cost = self._calculate_special_room_cost()
-
-        total_cost = (
-            self.request.weights.holes * holes_cost +
-            self.request.weights.late * late_early_cost +
-            self.request.weights.imbalance * imbalance_cost +
-            self.request.weights.specialRoom * special_room_cost
-        )
+        """
+        Añadir función objetivo con penalizaciones. Con options.cpFormulation
+        "compact", huecos y desbalance usan la formulación compacta
+        (primer/último bloque del día y rango de la carga diaria).
+        """
+        early_cost, late_cost = self._calculate_late_early_cost()
+        compact = self.request.options.cpFormulation == CpFormulation.COMPACT
+        terms = {
+            'holes': self._calculate_compact_holes_cost() if compact else self._calculate_holes_cost(),
+            'early': early_cost,
+            'late': late_cost,
+            'imbalance': (
+                self._calculate_load_range_cost() if compact else self._calculate_imbalance_cost()
+            ),
+            'specialRoom': self._calculate_special_room_cost()
+        }
+        # Términos de penalización por peso; se conservan para cambiar solo los pesos
+        self.penalties = {name: cp_model.LinearExpr.Sum(group) for name, group in terms.items()}
+        self.constant_penalties = {name for name, group in terms.items() if not group}
+        self.set_objective(self.request.weights)
 
-        self.model.Minimize(total_cost)
+    def set_objective(self, weights: Weights):
+        """Reemplazar el objetivo con otros pesos sobre los mismos términos de penalización"""
+        self.model.Minimize(sum(
+            getattr(weights, name) * term for name, term in self.penalties.items()
+        ))
 
     def _calculate_holes_cost(self):
         """Calcular costo por huecos en los horarios de los docentes"""
+        inst = self.instance
         holes_vars = []
-        for t in self.request.teachers:
-            courses = [c for c in self.request.courses if c.teacherId == t.id]
-            for day in set(p.split('-')[0] for p in self.request.periods):
-                day_periods = [p for p in self.request.periods if p.startswith(day)]
+        for t in range(inst.n_teachers):
+            if not inst.teacher_courses[t]:
+                continue
+            for day, day_periods in enumerate(inst.day_period_lists):
                 for i in range(len(day_periods)-2):
                     # Si hay clase en p1 y p3 pero no en p2, es un hueco
                     p1, p2, p3 = day_periods[i:i+3]
-                    has_p1 = sum(self.x[c.id, p1, r.id]
-                                for c in courses
-                                for r in self.request.rooms
-                                if (c.id, p1, r.id) in self.x)
-                    has_p2 = sum(self.x[c.id, p2, r.id]
-                                for c in courses
-                                for r in self.request.rooms
-                                if (c.id, p2, r.id) in self.x)
-                    has_p3 = sum(self.x[c.id, p3, r.id]
-                                for c in courses
-                                for r in self.request.rooms
-                                if (c.id, p3, r.id) in self.x)
+                    has_p1 = self.teacher_busy[t, p1]
+                    has_p2 = self.teacher_busy[t, p2]
+                    has_p3 = self.teacher_busy[t, p3]
                     
-                    hole = self.model.NewBoolVar(f'hole_{t.id}_{day}_{i}')
-                    self.model.Add(has_p1 + has_p3 - 2*has_p2 >= 1).OnlyEnforceIf(hole)
+                    hole = self.model.NewBoolVar(f'hole_{t}_{day}_{i}')
+                    self.model.Add(has_p1 + has_p3 - has_p2 - hole <= 1)
                     holes_vars.append(hole)
         
-        return sum(holes_vars)
+        return holes_vars
+
+    def _calculate_compact_holes_cost(self):
+        """
+        Huecos con variables de primer y último bloque por docente y día: el
+        hueco del día es el largo del tramo ocupado menos la carga, como en
+        compute_metrics. Usa cuatro variables por docente y día en vez de una
+        por cada ventana de tres periodos.
+        """
+        inst = self.instance
+        loads = self._teacher_day_loads()
+        holes_vars = []
+        for (t, d), load in loads.items():
+            # Periodos en que el docente podría tener clase; sin ninguno no hay huecos
+            day_periods = [p for p in inst.day_period_lists[d] if self.teacher_period_vars[t, p]]
+            if not day_periods:
+                continue
+            blocks = [int(inst.period_block[p]) for p in day_periods]
+            first = self.model.NewIntVar(min(blocks), max(blocks), f'first_{t}_{d}')
+            last = self.model.NewIntVar(min(blocks), max(blocks), f'last_{t}_{d}')
+            used = self.model.NewBoolVar(f'used_{t}_{d}')
+            self.model.Add(load <= len(day_periods) * used)
+            for p, block in zip(day_periods, blocks):
+                busy = self.teacher_busy[t, p]
+                # Si hay clase en el bloque, el tramo lo incluye
+                self.model.Add(first <= block + (max(blocks) - block) * (1 - busy))
+                self.model.Add(last >= block - (block - min(blocks)) * (1 - busy))
+            hole = self.model.NewIntVar(0, max(blocks) - min(blocks), f'holes_{t}_{d}')
+            self.model.Add(hole >= last - first + 1 - load).OnlyEnforceIf(used)
+            holes_vars.append(hole)
+        return holes_vars
 
     def _calculate_late_early_cost(self):
         """Calcular costo por clases en primera y última hora"""
-        late_early_vars = []
-        for t in self.request.teachers:
-            courses = [c for c in self.request.courses if c.teacherId == t.id]
-            for day in set(p.split('-')[0] for p in self.request.periods):
-                day_periods = [p for p in self.request.periods if p.startswith(day)]
-                first_period = day_periods[0]
-                last_period = day_periods[-1]
-                
-                # Primera hora
-                early = sum(self.x[c.id, first_period, r.id]
-                          for c in courses
-                          for r in self.request.rooms
-                          if (c.id, first_period, r.id) in self.x)
-                late_early_vars.append(early)
-                
-                # Última hora
-                late = sum(self.x[c.id, last_period, r.id]
-                         for c in courses
-                         for r in self.request.rooms
-                         if (c.id, last_period, r.id) in self.x)
-                late_early_vars.append(late)
+        inst = self.instance
+        early_vars = []
+        late_vars = []
+        for t in range(inst.n_teachers):
+            for day_periods in inst.day_period_lists:
+                # Primera y última hora
+                early_vars.extend(self.teacher_period_vars[t, day_periods[0]])
+                late_vars.extend(self.teacher_period_vars[t, day_periods[-1]])
         
-        return sum(late_early_vars)
+        return early_vars, late_vars
 
     def _calculate_imbalance_cost(self):
         """Calcular costo por desbalance en la carga diaria"""
+        inst = self.instance
         imbalance_vars = []
-        for t in self.request.teachers:
-            courses = [c for c in self.request.courses if c.teacherId == t.id]
-            
+        for t in range(inst.n_teachers):
+            if not inst.teacher_courses[t]:
+                continue
+
+            # Carga diaria del docente como variable, para no repetir la suma en cada par de días
+            loads = [self._teacher_day_loads()[t, d] for d in range(inst.n_days)]
+
             # Calcular diferencias entre pares de días
-            days = list(set(p.split('-')[0] for p in self.request.periods))
-            for i in range(len(days)):
-                for j in range(i + 1, len(days)):
-                    day1_periods = [p for p in self.request.periods if p.startswith(days[i])]
-                    day2_periods = [p for p in self.request.periods if p.startswith(days[j])]
-                    
-                    load1 = sum(self.x[c.id, p, r.id]
-                              for p in day1_periods
-                              for c in courses
-                              for r in self.request.rooms
-                              if (c.id, p, r.id) in self.x)
-                    
-                    load2 = sum(self.x[c.id, p, r.id]
-                              for p in day2_periods
-                              for c in courses
-                              for r in self.request.rooms
-                              if (c.id, p, r.id) in self.x)
-                    
+            for i in range(len(loads)):
+                for j in range(i + 1, len(loads)):
                     # Usar diferencia absoluta como medida de desbalance
-                    diff = self.model.NewIntVar(0, len(self.request.periods), f'diff_{t.id}_{i}_{j}')
-                    self.model.AddAbsEquality(diff, load1 - load2)
+                    diff = self.model.NewIntVar(0, inst.n_periods, f'diff_{t}_{i}_{j}')
+                    self.model.AddAbsEquality(diff, loads[i] - loads[j])
                     imbalance_vars.append(diff)
         
-        return sum(imbalance_vars)
+        return imbalance_vars
+
+    def _calculate_load_range_cost(self):
+        """
+        Desbalance como rango de la carga diaria de cada docente (máxima menos
+        mínima): dos variables por docente en vez de una por cada par de días.
+        """
+        inst = self.instance
+        loads = self._teacher_day_loads()
+        range_vars = []
+        for t in range(inst.n_teachers):
+            if not inst.teacher_courses[t] or inst.n_days < 2:
+                continue
+            days = [loads[t, d] for d in range(inst.n_days)]
+            highest = self.model.NewIntVar(0, inst.n_periods, f'max_load_{t}')
+            lowest = self.model.NewIntVar(0, inst.n_periods, f'min_load_{t}')
+            for load in days:
+                self.model.Add(highest >= load)
+                self.model.Add(lowest <= load)
+            range_vars.append(highest - lowest)
+        return range_vars
+
+    def _teacher_day_loads(self) -> Dict[Tuple[int, int], cp_model.IntVar]:
+        """Carga diaria de cada docente con cursos como variable (se crea una vez y la comparten los términos)"""
+        if self.day_loads is None:
+            inst = self.instance
+            self.day_loads = {}
+            for t in range(inst.n_teachers):
+                if not inst.teacher_courses[t]:
+                    continue
+                for d, day_periods in enumerate(inst.day_period_lists):
+                    load = self.model.NewIntVar(0, len(day_periods), f'load_{t}_{d}')
+                    self.model.Add(load == cp_model.LinearExpr.Sum(
+                        [var for p in day_periods for var in self.teacher_period_vars[t, p]]
+                    ))
+                    self.day_loads[t, d] = load
+        return self.day_loads
 
     def _calculate_special_room_cost(self):
         """Calcular costo por uso innecesario de salas especiales"""
+        inst = self.instance
         special_room_vars = []
-        special_rooms = [r for r in self.request.rooms if r.type != "normal"]
-        for r in special_rooms:
-            for p in self.request.periods:
-                for c in self.request.courses:
-                    if (c.id, p, r.id) in self.x and c.roomType == "normal":
-                        special_room_vars.append(self.x[c.id, p, r.id])
+        for r in np.flatnonzero(inst.room_special).tolist():
+            for p in range(inst.n_periods):
+                special_room_vars.extend(
+                    self.x[c, p, r] for c in np.flatnonzero(inst.course_normal).tolist()
+                    if (c, p, r) in self.x
+                )
         
-        return sum(special_room_vars)
+        return special_room_vars
+
+    def add_symmetry_breaking(self):
+        """
+        Romper simetrías detectadas en la instancia (options.cpSymmetryBreaking):
+        en cada periodo las salas intercambiables se ocupan en orden, y en cada
+        grupo de secciones paralelas un curso solo usa un periodo si el anterior
+        del grupo ya tiene un bloque en un periodo previo.
+        """
+        inst = self.instance
+        self.symmetry = Symmetries(inst)
+        if not self.room_period_vars:
+            # El modelo en dos etapas no distingue salas: esa simetría ya no existe
+            self.symmetry.room_groups = []
+
+        for group in self.symmetry.room_groups:
+            for p in range(inst.n_periods):
+                for r1, r2 in zip(group, group[1:]):
+                    later = self.room_period_vars.get((r2, p), [])
+                    if later:
+                        self.model.Add(
+                            cp_model.LinearExpr.Sum(later) <=
+                            cp_model.LinearExpr.Sum(self.room_period_vars.get((r1, p), []))
+                        )
+
+        for group in self.symmetry.course_groups:
+            for c1, c2 in zip(group, group[1:]):
+                # Bloques de c1 en periodos anteriores a p, acumulados en una variable
+                before = 0
+                for p in range(inst.n_periods):
+                    later = self.course_period_vars[c2, p]
+                    if later:
+                        self.model.Add(cp_model.LinearExpr.Sum(later) <= before)
+                    current = self.course_period_vars[c1, p]
+                    if current:
+                        prefix = self.model.NewIntVar(0, int(inst.course_blocks[c1]), f'pre_{c1}_{p}')
+                        self.model.Add(prefix == before + cp_model.LinearExpr.Sum(current))
+                        before = prefix
+
+        logger.info(
+            f"Ruptura de simetría: {len(self.symmetry.room_groups)} grupos de salas, "
+            f"{len(self.symmetry.course_groups)} grupos de cursos"
+        )
+
+    def build_model(self):
+        """
+        Añadir todas las restricciones y el objetivo, registrando el tiempo de
+        construcción. Si el modelo ya está construido (reutilizado desde la caché)
+        solo se reemplaza el objetivo con los pesos de la solicitud actual.
+        """
+        if self.penalties is not None:
+            self.set_objective(self.request.weights)
+            return
+        build_start = time.perf_counter()
+        self.add_coverage_constraints()
+        self.add_no_overlap_constraints()
+        self.add_hard_locks()
+        self.add_fixed_assignments()
+        if self.request.options.cpSymmetryBreaking:
+            self.add_symmetry_breaking()
+        self.add_objective()
+        self.build_time += time.perf_counter() - build_start
+        proto = self.model.Proto()
+        logger.info(
+            f"Modelo CP-SAT construido en {self.build_time:.3f}s: "
+            f"{len(proto.variables)} variables, {len(proto.constraints)} restricciones"
+        )
+
+    def reuse(self, request: ScheduleRequest):
+        """
+        Preparar un modelo ya construido para otra solicitud con la misma
+        estructura (ver model_cache.structural_key): solver, pesos y sugerencias
+        nuevos sobre las mismas variables y restricciones.
+        """
+        self.request = request
+        self.instance = copy.copy(self.instance)
+        self.instance.request = request
+        self.solver = cp_model.CpSolver()
+        apply_profile(self.solver.parameters, request.options)
+        self.progress = SolutionProgress(self._report_solution)
+        self.listener = None
+        self.stop_requested = False
+        self.lexicographic_values = None
+        self.hint_feasible = None
+        self.warm_start_time = None
+        self.build_time = 0.0
+        self.reused = True
+
+    def warm_start(self):
+        """
+        Sugerir a CP-SAT un horario de partida: request.previousSchedule si viene,
+        la última solución de este modelo si se reutiliza desde la caché, o si
+        options.warmStart está activo, el resultado de una pasada corta de
+        SimulatedAnnealing (descontada del presupuesto del solver).
+        """
+        self.model.ClearHints()
+        hint = self.request.previousSchedule or self.last_solution
+        options = self.request.options
+        if not hint and options.warmStart:
+            start = time.perf_counter()
+            budget = options.maxTimeSec * WARM_START_TIME_FRACTION
+            meta_options = options.model_copy(update={'metaMaxTimeSec': budget})
+            meta_request = self.request.model_copy(update={'options': meta_options})
+            hint = SimulatedAnnealing(meta_request, self.instance).solve().assignments
+            self.warm_start_time = time.perf_counter() - start
+            parameters = self.solver.parameters
+            parameters.max_time_in_seconds = max(parameters.max_time_in_seconds - self.warm_start_time, 1.0)
+        if hint:
+            self.add_solution_hint(hint)
+
+    def add_solution_hint(self, assignments: List[Assignment]):
+        """Sugerir el horario dado como solución inicial y registrar si es factible"""
+        inst = self.instance
+        course, period, room = assignments_to_arrays(inst, assignments)
+        complete = np.array_equal(np.bincount(course, minlength=inst.n_courses), inst.course_blocks)
+        self.hint_feasible = bool(
+            complete and compute_metrics(inst, course, period, room).hardViolations == 0
+        )
+        if not self.hint_feasible:
+            # Dejar que CP-SAT repare la sugerencia en vez de descartarla
+            self.solver.parameters.repair_hint = True
+
+        if self.symmetry is not None:
+            # Una sugerencia que viola la ruptura de simetría se descartaría
+            course, period, room = self.symmetry.canonicalize(course, period, room)
+        self._add_hints(course, period, room)
+        logger.info(f"Arranque en caliente con {len(course)} asignaciones (factible: {self.hint_feasible})")
+
+    def _add_hints(self, course: np.ndarray, period: np.ndarray, room: np.ndarray,
+                   model: Optional[cp_model.CpModel] = None):
+        """Fijar las sugerencias de las variables del modelo (por defecto self.model) a partir del horario"""
+        model = self.model if model is None else model
+        hinted = set(zip(course.tolist(), period.tolist(), room.tolist()))
+        for key, var in self.x.items():
+            model.AddHint(var, key in hinted)
+
+    def _record_search(self, solver: cp_model.CpSolver):
+        """Acumular el tiempo de reloj y determinista de una llamada a Solve"""
+        self.search_wall_time += solver.WallTime()
+        self.search_deterministic_time += solver.deterministic_time
+
+    def _search_stats(self) -> dict:
+        """
+        Cota, brecha relativa, tiempos y soluciones de la búsqueda. En modo
+        lexicográfico la cota del solver es la de la última etapa y no acota el
+        objetivo ponderado, por lo que no se informan cota ni brecha.
+        """
+        stats = {
+            'wallTimeSec': self.search_wall_time,
+            'deterministicTimeSec': self.search_deterministic_time,
+            'solutionsFound': self.progress.solutions
+        }
+        if self.progress.solutions and self.lexicographic_values is None:
+            objective = self.solver.ObjectiveValue()
+            bound = self.solver.BestObjectiveBound()
+            stats.update({'bestBound': bound, 'gap': relative_gap(objective, bound)})
+        return stats
+
+    def _stopped_at_gap(self) -> bool:
+        """La búsqueda terminó por la tolerancia de brecha con la cota aún bajo el objetivo"""
+        if self.lexicographic_values is not None:
+            return False
+        return self.solver.BestObjectiveBound() < self.solver.ObjectiveValue() - 1e-6
+
+    def _model_stats(self) -> dict:
+        """Estadísticas de construcción del modelo, del arranque y de la búsqueda para las métricas"""
+        proto = self.model.Proto()
+        return {
+            **self._search_stats(),
+            'buildTimeSec': self.build_time,
+            'numVariables': len(proto.variables),
+            'numConstraints': len(proto.constraints),
+            'prunedVariables': self.pruned,
+            'hintFeasible': self.hint_feasible,
+            'warmStartTimeSec': self.warm_start_time,
+            'timeToFirstSolutionSec': self.progress.first_solution_time,
+            'modelCacheHit': self.reused,
+            'symmetryGroups': len(self.symmetry) if self.symmetry is not None else None,
+            'lexicographicValues': self.lexicographic_values
+        }
+
+    def _report_solution(self, progress: SolutionProgress):
+        """Entregar la solución recién encontrada al listener, si hay uno"""
+        if self.listener is None:
+            return
+        objective = progress.ObjectiveValue()
+        bound = progress.BestObjectiveBound()
+        self.listener(SolutionUpdate(
+            objective=objective,
+            bound=bound,
+            gap=relative_gap(objective, bound),
+            elapsedSec=time.perf_counter() - self.solve_start,
+            assignments=self._extract_solution(progress.Value)
+        ))
+
+    def stop(self):
+        """Detener la búsqueda en curso; solve() devuelve la mejor solución hasta ahora"""
+        self.stop_requested = True
+        self.solver.StopSearch()
+
+    def _lexicographic_stages(self) -> List[str]:
+        """
+        Penalizaciones en orden de prioridad: options.lexicographicOrder y luego
+        las demás de peso positivo, de mayor a menor peso. Se omiten las
+        penalizaciones sin variables, que no necesitan etapa.
+        """
+        weights = self.request.weights
+        order = [penalty.value for penalty in self.request.options.lexicographicOrder]
+        order += sorted(
+            (name for name in self.penalties if name not in order and getattr(weights, name) > 0),
+            key=lambda name: -getattr(weights, name)
+        )
+        return [name for name in dict.fromkeys(order) if name not in self.constant_penalties]
+
+    def _solve_lexicographic(self) -> int:
+        """
+        Objetivo lexicográfico (options.objectiveMode): minimizar cada penalización
+        en orden de prioridad, acotando las ya optimizadas a su mejor valor y
+        sugiriendo la solución de la etapa anterior. Cada etapa recibe una parte
+        igual del tiempo que queda. Las etapas se resuelven sobre una copia del
+        modelo, que así sigue siendo reutilizable desde la caché.
+        """
+        stages = self._lexicographic_stages()
+        model = self.model.Clone()
+        base = self.solver.parameters
+        deadline = time.perf_counter() + base.max_time_in_seconds
+        status = cp_model.OPTIMAL
+        solved = None
+        self.lexicographic_values = {}
+
+        for i, name in enumerate(stages):
+            if self.stop_requested:
+                break
+            term = self.penalties[name]
+            model.Minimize(term)
+            stage = cp_model.CpSolver()
+            stage.parameters.copy_from(base)
+            stage.parameters.max_time_in_seconds = max((deadline - time.perf_counter()) / (len(stages) - i), 0.1)
+            if base.max_deterministic_time < float('inf'):
+                stage.parameters.max_deterministic_time = base.max_deterministic_time / len(stages)
+            self.solver = stage
+            stage_status = stage.Solve(model, self.progress)
+            self._record_search(stage)
+            if stage_status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                if solved is None:
+                    return stage_status
+                # Sin solución en el tiempo de la etapa: se conserva la de la etapa anterior
+                self.solver = solved
+                return cp_model.FEASIBLE
+
+            solved = stage
+            value = int(round(stage.ObjectiveValue()))
+            self.lexicographic_values[name] = value
+            if stage_status != cp_model.OPTIMAL:
+                status = cp_model.FEASIBLE
+            model.Add(term <= value)
+            model.ClearHints()
+            self._add_hints(*self._solution_arrays(stage.Value), model=model)
+            logger.info(f"Etapa lexicográfica {i + 1}/{len(stages)}: {name} = {value}")
+
+        if solved is None:
+            return cp_model.UNKNOWN
+        return status if len(self.lexicographic_values) == len(stages) else cp_model.FEASIBLE
+
+    def _objective_value(self) -> float:
+        """Objetivo ponderado de la solución (en modo lexicográfico el del solver es el de la última etapa)"""
+        if self.lexicographic_values is None:
+            return self.solver.ObjectiveValue()
+        weights = self.request.weights
+        return float(sum(getattr(weights, name) * self.solver.Value(term) for name, term in self.penalties.items()))
 
     def solve(self) -> ScheduleResponse:
         """Resolver el problema y devolver la solución"""
+        self.solve_start = time.perf_counter()
+        self.search_wall_time = 0.0
+        self.search_deterministic_time = 0.0
         try:
             # Añadir todas las restricciones
-            self.add_coverage_constraints()
-            self.add_no_overlap_constraints()
-            self.add_availability_constraints()
-            self.add_hard_locks()
-            self.add_fixed_assignments()
-            self.add_objective()
+            self.build_model()
+            self.warm_start()
 
             # Resolver
-            status = self.solver.Solve(self.model)
+            if self.request.options.objectiveMode == ObjectiveMode.LEXICOGRAPHIC:
+                status = self._solve_lexicographic()
+            else:
+                status = self.solver.Solve(self.model, self.progress)
+                self._record_search(self.solver)
 
-            if status == cp_model.OPTIMAL:
+            if status == cp_model.OPTIMAL and self._stopped_at_gap():
+                # CP-SAT informa OPTIMAL al alcanzar relative_gap_limit; no está probado
+                solution_status = SolutionStatus.FEASIBLE
+            elif status == cp_model.OPTIMAL:
                 solution_status = SolutionStatus.OPTIMAL
             elif status == cp_model.FEASIBLE:
                 solution_status = SolutionStatus.FEASIBLE
@@ -237,6 +615,7 @@ class ScheduleSolver:
 
             if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
                 assignments = self._extract_solution()
+                self.last_solution = assignments
                 metrics = self._calculate_metrics()
                 explanation = self._generate_explanation(metrics)
                 
@@ -259,7 +638,8 @@ class ScheduleSolver:
                         late=0,
                         early=0,
                         imbalance=0,
-                        hardViolations=0
+                        hardViolations=0,
+                        **self._model_stats()
                     ),
                     explanation="No se encontró solución factible"
                 )
@@ -268,40 +648,30 @@ class ScheduleSolver:
             logger.error(f"Error solving schedule: {str(e)}")
             raise
 
-    def _extract_solution(self) -> List[Assignment]:
-        """Extraer la solución del solver"""
-        assignments = []
-        for (c_id, p, r_id), var in self.x.items():
-            if self.solver.Value(var) == 1:
-                assignments.append(Assignment(
-                    courseId=c_id,
-                    period=p,
-                    roomId=r_id
-                ))
-        return assignments
+    def _extract_solution(self, value: Optional[Callable] = None) -> List[Assignment]:
+        """Extraer la solución del solver (o de un callback, si se entrega su Value)"""
+        inst = self.instance
+        course, period, room = self._solution_arrays(value)
+        return [
+            Assignment(courseId=inst.course_ids[c], period=inst.periods[p], roomId=inst.room_ids[r])
+            for c, p, r in zip(course.tolist(), period.tolist(), room.tolist())
+        ]
+
+    def _solution_arrays(self, value: Optional[Callable] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Índices (curso, periodo, sala) de las variables activas en la solución"""
+        value = value or self.solver.Value
+        active = [key for key, var in self.x.items() if value(var) == 1]
+        arrays = np.array(active, dtype=np.int64).reshape(-1, 3)
+        return arrays[:, 0], arrays[:, 1], arrays[:, 2]
 
     def _calculate_metrics(self) -> Metrics:
         """Calcular métricas de la solución"""
-        objective_value = self.solver.ObjectiveValue()
-        
-        # Calcular métricas individuales
-        holes = sum(1 for (c_id, p, r_id), var in self.x.items() 
-                   if self.solver.Value(var) == 1)  # TODO: implementar conteo real
-        
-        late_early = sum(1 for (c_id, p, r_id), var in self.x.items()
-                        if self.solver.Value(var) == 1 and 
-                        (p.endswith('-1') or p.endswith('-7')))
-        
-        imbalance = 0.0  # TODO: implementar cálculo real
-        
-        return Metrics(
-            objective=objective_value,
-            holes=holes,
-            late=late_early // 2,  # Dividir entre early y late
-            early=late_early // 2,
-            imbalance=imbalance,
-            hardViolations=0  # Si llegamos aquí, no hay violaciones duras
+        course, period, room = self._solution_arrays()
+        metrics = compute_metrics(
+            self.instance, course, period, room,
+            objective=self._objective_value()
         )
+        return metrics.model_copy(update=self._model_stats())
 
     def _generate_explanation(self, metrics: Metrics) -> str:
         """Generar explicación en lenguaje natural de la solución"""
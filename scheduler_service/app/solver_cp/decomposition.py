@@ -0,0 +1,260 @@
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+from typing import Dict, List, Optional, Set
+import math
+import multiprocessing
+import logging
+from ..domain.models import (
+    ScheduleRequest,
+    ScheduleResponse,
+    Assignment,
+    Metrics,
+    SolutionStatus,
+    CpMode,
+    RoomType
+)
+from ..domain.instance import ProblemInstance
+from ..domain.metrics import assignments_to_arrays, compute_metrics
+from ..solver_meta.simulated_annealing import SimulatedAnnealing
+from .cp_solver import ScheduleSolver
+from .lns import LargeNeighborhoodSearch
+from .two_stage import TwoStageSolver
+from .profiles import available_cpus
+from .cancellation import stop_on
+
+logger = logging.getLogger(__name__)
+
+# De menor a mayor gravedad: el estado combinado es el más grave de los componentes
+STATUS_SEVERITY = [
+    SolutionStatus.OPTIMAL,
+    SolutionStatus.FEASIBLE,
+    SolutionStatus.METAHEURISTIC,
+    SolutionStatus.TIMEOUT,
+    SolutionStatus.INFEASIBLE
+]
+SUMMED_STATS = ['buildTimeSec', 'numVariables', 'numConstraints', 'prunedVariables']
+
+
+def contended_room_types(request: ScheduleRequest) -> Set[RoomType]:
+    """
+    Tipos de sala que pueden escasear: hay menos salas del tipo que docentes con
+    cursos de ese tipo. Como un docente dicta a lo sumo un bloque por periodo,
+    en los demás tipos siempre queda una sala libre.
+    """
+    rooms = Counter(r.type for r in request.rooms)
+    teachers: Dict[RoomType, Set[str]] = {}
+    for course in request.courses:
+        teachers.setdefault(course.roomType, set()).add(course.teacherId)
+    return {room_type for room_type, ids in teachers.items() if rooms[room_type] < len(ids)}
+
+
+def split_components(request: ScheduleRequest) -> List[ScheduleRequest]:
+    """
+    Separar la solicitud en componentes conexas del grafo de conflictos: dos
+    cursos están conectados si comparten docente (no pueden toparse) o un tipo
+    de sala que puede escasear (compiten por las mismas salas). El objetivo se
+    descompone por docente y por curso, así que cada componente puede
+    resolverse por separado.
+
+    Cada subsolicitud conserva los periodos, pesos y opciones, con los docentes,
+    salas, disponibilidad, bloqueos, asignaciones fijas y horario previo que le
+    corresponden. Las salas de un tipo sin escasez se comparten entre
+    componentes; DecomposedSolver resuelve los choques al combinar. Devuelve una
+    lista de un elemento si no hay nada que separar.
+    """
+    contended = contended_room_types(request)
+    parent = list(range(len(request.courses)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    first_by_key: Dict[tuple, int] = {}
+    for i, course in enumerate(request.courses):
+        keys = [('teacher', course.teacherId)]
+        if course.roomType in contended:
+            keys.append(('room', course.roomType))
+        for key in keys:
+            j = first_by_key.setdefault(key, i)
+            parent[find(i)] = find(j)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(request.courses)):
+        groups.setdefault(find(i), []).append(i)
+    if len(groups) <= 1:
+        return [request]
+
+    components = []
+    for members in groups.values():
+        courses = [request.courses[i] for i in members]
+        course_ids = {c.id for c in courses}
+        teacher_ids = {c.teacherId for c in courses}
+        room_types = {c.roomType for c in courses}
+        components.append(request.model_copy(update={
+            'courses': courses,
+            'teachers': [t for t in request.teachers if t.id in teacher_ids],
+            'rooms': [r for r in request.rooms if r.type in room_types],
+            'availability': [a for a in request.availability if a.teacherId in teacher_ids],
+            'hardLocks': [h for h in request.hardLocks if h.courseId in course_ids],
+            'fixedAssignments': [f for f in request.fixedAssignments if f.courseId in course_ids],
+            'previousSchedule': [a for a in request.previousSchedule if a.courseId in course_ids]
+        }))
+    return components
+
+
+# Evento de detención compartido por las componentes de una resolución
+_stop_event = None
+
+
+def _init_worker(stop_event):
+    """Inicializar un proceso del pool (o el actual) con el evento de detención"""
+    global _stop_event
+    _stop_event = stop_event
+
+
+def _solve_component(request: ScheduleRequest) -> ScheduleResponse:
+    """Resolver una componente como /solve, sin caché (función de nivel de módulo para el pool)"""
+    instance = ProblemInstance(request)
+    if request.options.cpMode == CpMode.LNS:
+        solver = LargeNeighborhoodSearch(request, instance)
+    elif request.options.cpMode == CpMode.TWO_STAGE:
+        solver = TwoStageSolver(request, instance)
+    else:
+        solver = ScheduleSolver(request, instance)
+    with stop_on(solver, _stop_event):
+        response = solver.solve()
+    if (response.status in [SolutionStatus.INFEASIBLE, SolutionStatus.TIMEOUT]
+            and request.options.fallbackIfNoFeasible and not _stop_event.is_set()):
+        response = SimulatedAnnealing(request, instance).solve()
+    return response
+
+
+class DecomposedSolver:
+    """
+    Resolución por componentes independientes (options.decompose): cada
+    componente de split_components se resuelve en un pool de procesos con el
+    modo CP de la solicitud (y la metaheurística como respaldo) y los
+    resultados se combinan en una sola respuesta.
+
+    Se usan a lo sumo available_cpus() procesos (dentro del pool de resolución,
+    la parte de núcleos del worker); con un solo núcleo las componentes se
+    resuelven en secuencia. Si hay más componentes que núcleos, el plazo
+    options.maxTimeSec se reparte entre las tandas para respetar el tiempo
+    total, y los workers de CP-SAT se reparten entre los procesos. El
+    portafolio no se usa dentro de las componentes para no sumar un proceso
+    por componente.
+
+    Si alguna componente no tiene solución se devuelven las asignaciones de las
+    demás, con el estado más grave.
+    """
+
+    def __init__(self, request: ScheduleRequest, components: List[ScheduleRequest],
+                 instance: Optional[ProblemInstance] = None):
+        self.request = request
+        self.components = components
+        self.instance = instance or ProblemInstance(request)
+        self.stop_requested = False
+        self._stop_event = multiprocessing.Event()
+
+    def solve(self) -> ScheduleResponse:
+        options = self.request.options
+        processes = min(len(self.components), available_cpus())
+        waves = math.ceil(len(self.components) / processes)
+        component_options = options.model_copy(update={
+            'maxTimeSec': max(1, options.maxTimeSec // waves),
+            'cpWorkers': options.cpWorkers or max(1, available_cpus() // processes),
+            'portfolio': False
+        })
+        requests = [c.model_copy(update={'options': component_options}) for c in self.components]
+
+        if processes == 1:
+            _init_worker(self._stop_event)
+            responses = [_solve_component(r) for r in requests]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=processes, initializer=_init_worker, initargs=(self._stop_event,)
+            ) as pool:
+                responses = list(pool.map(_solve_component, requests))
+        return self._merge(responses)
+
+    def stop(self):
+        """Detener las componentes en curso y las pendientes; solve() combina lo encontrado"""
+        self.stop_requested = True
+        self._stop_event.set()
+
+    def _merge(self, responses: List[ScheduleResponse]) -> ScheduleResponse:
+        """
+        Unir asignaciones, tomar el estado más grave y recalcular las métricas
+        sobre la instancia completa. Las componentes sin solución no aportan
+        asignaciones.
+        """
+        status = max((r.status for r in responses), key=STATUS_SEVERITY.index)
+        stats = {
+            name: sum(getattr(r.metrics, name) or 0 for r in responses) for name in SUMMED_STATS
+        }
+        logger.info(
+            f"Descomposición: {len(responses)} componentes, estados "
+            f"{', '.join(r.status.value for r in responses)}"
+        )
+        unsolved = [i for i, r in enumerate(responses) if not r.assignments]
+        if len(unsolved) == len(responses):
+            return ScheduleResponse(
+                status=status,
+                assignments=[],
+                metrics=Metrics(
+                    objective=float('inf'), holes=0, late=0, early=0, imbalance=0, hardViolations=0,
+                    components=len(responses), **stats
+                ),
+                explanation=(
+                    f"Ninguna de las {len(responses)} componentes tiene solución: {responses[0].explanation}"
+                )
+            )
+
+        assignments = self._separate_rooms([a for r in responses for a in r.assignments])
+        metrics = compute_metrics(self.instance, *assignments_to_arrays(self.instance, assignments))
+        metrics = metrics.model_copy(update={'components': len(responses), **stats})
+        explanation = [f"Resuelto en {len(responses)} componentes independientes."]
+        if unsolved:
+            explanation.append(
+                f"Sin solución en las componentes {', '.join(str(i + 1) for i in unsolved)} "
+                f"(cursos {', '.join(c.id for i in unsolved for c in self.components[i].courses)}); "
+                "se devuelven las asignaciones de las demás."
+            )
+        return ScheduleResponse(
+            status=status,
+            assignments=assignments,
+            metrics=metrics,
+            explanation=" ".join(explanation + [r.explanation for r in responses])
+        )
+
+    def _separate_rooms(self, assignments: List[Assignment]) -> List[Assignment]:
+        """
+        Componentes que comparten un tipo de sala sin escasez pueden elegir la
+        misma sala en un periodo: el bloque se mueve a otra sala libre del mismo
+        tipo (las salas de un tipo son intercambiables y, por contended_room_types,
+        alcanzan). Las asignaciones fijas conservan su sala.
+        """
+        room_type = {r.id: r.type for r in self.request.rooms}
+        rooms_by_type: Dict[RoomType, List[str]] = {}
+        for room in self.request.rooms:
+            rooms_by_type.setdefault(room.type, []).append(room.id)
+        fixed = {(f.courseId, f.period, f.roomId) for f in self.request.fixedAssignments}
+
+        def is_fixed(a: Assignment) -> bool:
+            return (a.courseId, a.period, a.roomId) in fixed
+
+        used = {(a.period, a.roomId) for a in assignments if is_fixed(a)}
+        separated = []
+        for a in assignments:
+            if not is_fixed(a):
+                if (a.period, a.roomId) in used:
+                    free = next(
+                        (r for r in rooms_by_type[room_type[a.roomId]] if (a.period, r) not in used), None
+                    )
+                    if free is not None:
+                        a = a.model_copy(update={'roomId': free})
+                used.add((a.period, a.roomId))
+            separated.append(a)
+        return separated
@@ -0,0 +1,262 @@
+from ortools.sat.python import cp_model
+from typing import List, Optional, Tuple
+import numpy as np
+import random
+import time
+import logging
+from ..domain.models import (
+    ScheduleRequest,
+    ScheduleResponse,
+    Assignment,
+    SolutionStatus
+)
+from ..domain.instance import ProblemInstance
+from ..domain.metrics import compute_metrics
+from ..solver_meta.state import ScheduleState
+from .profiles import apply_profile
+from ..solver_meta.simulated_annealing import SimulatedAnnealing
+
+logger = logging.getLogger(__name__)
+
+NEIGHBORHOODS = ['teacher', 'day', 'room_type']
+INITIAL_TIME_FRACTION = 0.1  # Fracción del presupuesto para la solución inicial heurística
+SUBPROBLEM_TIME_FRACTION = 0.05  # Fracción del presupuesto para cada submodelo
+SUBPROBLEM_MIN_TIME_SEC = 0.2
+ROOM_TYPE_MAX_COURSES = 8  # Cursos liberados como máximo en el vecindario por tipo de sala
+
+
+class LargeNeighborhoodSearch:
+    """
+    Búsqueda de vecindario grande (LNS) sobre CP-SAT.
+
+    Parte de un horario factible (entregado o generado con SimulatedAnnealing) y
+    repetidamente libera un vecindario —la semana de un docente, un día completo
+    o una muestra de cursos de un mismo tipo de sala— dejando el resto fijo.
+    Cada vecindario se reoptimiza con un submodelo CP-SAT pequeño cuyo objetivo
+    es exacto para los docentes y días afectados, y el cambio se acepta si no
+    empeora el costo total.
+    """
+
+    def __init__(self, request: ScheduleRequest, instance: Optional[ProblemInstance] = None):
+        self.request = request
+        self.instance = instance or ProblemInstance(request)
+        self.rng = random.Random(request.options.seed)
+        self.neighborhoods_tried = 0
+        self.neighborhoods_improved = 0
+        self.stop_requested = False
+        self.subsolver: Optional[cp_model.CpSolver] = None
+
+    def solve(self, initial_solution: Optional[List[Assignment]] = None) -> ScheduleResponse:
+        options = self.request.options
+        start = time.perf_counter()
+        deadline = start + options.maxTimeSec
+
+        state = self._initial_state(initial_solution, options.maxTimeSec * INITIAL_TIME_FRACTION)
+        cost = self._cost(state)
+        subproblem_time = max(SUBPROBLEM_MIN_TIME_SEC, options.maxTimeSec * SUBPROBLEM_TIME_FRACTION)
+
+        # Si todos los bloques son fijos no hay vecindario que liberar
+        movable = bool((~state.fixed).any())
+        while movable and cost > 0 and time.perf_counter() < deadline and not self.stop_requested:
+            kind = NEIGHBORHOODS[self.neighborhoods_tried % len(NEIGHBORHOODS)]
+            free_blocks, free_periods = self._select_neighborhood(state, kind)
+            self.neighborhoods_tried += 1
+            if len(free_blocks) == 0:
+                continue
+
+            time_limit = min(subproblem_time, deadline - time.perf_counter())
+            if time_limit <= 0:
+                break
+            candidate = self._reoptimize(state, free_blocks, free_periods, time_limit)
+            if candidate is None:
+                continue
+            candidate_cost = self._cost(candidate)
+            if candidate_cost <= cost:
+                if candidate_cost < cost:
+                    self.neighborhoods_improved += 1
+                state, cost = candidate, candidate_cost
+
+        metrics = compute_metrics(self.instance, state.course, state.period, state.room)
+        explanation = (
+            f"LNS: {self.neighborhoods_tried} vecindarios reoptimizados, "
+            f"{self.neighborhoods_improved} con mejora. "
+            f"Huecos: {metrics.holes}, bloques en horarios extremos: {metrics.early + metrics.late}."
+        )
+        feasible = metrics.hardViolations == 0 and self._covers(state)
+        return ScheduleResponse(
+            status=SolutionStatus.FEASIBLE if feasible else SolutionStatus.METAHEURISTIC,
+            assignments=state.to_assignments(self.instance.course_ids, self.instance.periods, self.instance.room_ids),
+            metrics=metrics,
+            explanation=explanation
+        )
+
+    def stop(self):
+        """Detener la búsqueda; solve() devuelve el mejor horario hasta ahora"""
+        self.stop_requested = True
+        subsolver = self.subsolver
+        if subsolver is not None:
+            subsolver.StopSearch()
+
+    def _initial_state(self, initial_solution: Optional[List[Assignment]], time_budget: float) -> ScheduleState:
+        """
+        Convertir la solución inicial en estado, generándola con la metaheurística
+        si falta. Una solución incompleta (por ejemplo un horario anterior
+        parcial) se completa igual que en el recocido: sus bloques se mantienen
+        y los faltantes se ubican con el constructor voraz.
+        """
+        inst = self.instance
+        if initial_solution is None and self.request.previousSchedule:
+            initial_solution = self.request.previousSchedule
+        if initial_solution is None or not self._covers(ScheduleState.from_solution(inst, initial_solution)):
+            options = self.request.options.model_copy(update={'metaMaxTimeSec': time_budget})
+            request = self.request.model_copy(update={'options': options})
+            initial_solution = SimulatedAnnealing(request, inst).solve(initial_solution).assignments
+
+        # Asignaciones fijas y bloqueos "must-place" nunca se liberan; los
+        # bloques de la solución inicial sí
+        return ScheduleState.from_solution(inst, initial_solution)
+
+    def _covers(self, state: ScheduleState) -> bool:
+        """Si el estado tiene exactamente los bloques semanales de cada curso"""
+        inst = self.instance
+        return np.array_equal(np.bincount(state.course, minlength=inst.n_courses), inst.course_blocks)
+
+    def _cost(self, state: ScheduleState) -> float:
+        return compute_metrics(self.instance, state.course, state.period, state.room).objective
+
+    def _select_neighborhood(self, state: ScheduleState, kind: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Elegir bloques liberados y periodos en que pueden ubicarse"""
+        inst = self.instance
+        all_periods = np.ones(inst.n_periods, dtype=bool)
+        if kind == 'teacher':
+            teachers = [t for t in range(inst.n_teachers) if inst.teacher_courses[t]]
+            if not teachers:
+                return np.empty(0, dtype=np.int64), all_periods
+            t = self.rng.choice(teachers)
+            mask = inst.course_teacher[state.course] == t
+            periods = all_periods
+        elif kind == 'day':
+            d = self.rng.randrange(inst.n_days)
+            mask = inst.period_day[state.period] == d
+            periods = inst.period_day == d
+        else:  # room_type
+            room_type = self.rng.choice(sorted(set(inst.course_room_type.tolist())))
+            courses = np.flatnonzero(inst.course_room_type == room_type).tolist()
+            if len(courses) > ROOM_TYPE_MAX_COURSES:
+                courses = self.rng.sample(courses, ROOM_TYPE_MAX_COURSES)
+            mask = np.isin(state.course, courses)
+            periods = all_periods
+        return np.flatnonzero(mask & ~state.fixed), periods
+
+    def _reoptimize(self, state: ScheduleState, free_blocks: np.ndarray,
+                    free_periods: np.ndarray, time_limit: float) -> Optional[ScheduleState]:
+        """Resolver el submodelo del vecindario y devolver el nuevo estado (None si falla)"""
+        inst = self.instance
+        weights = self.request.weights
+        model = cp_model.CpModel()
+
+        # Ocupación de los bloques que permanecen fijos
+        kept = np.ones(len(state), dtype=bool)
+        kept[free_blocks] = False
+        teacher_occ = np.zeros((inst.n_teachers, inst.n_periods), dtype=np.int64)
+        room_occ = np.zeros((inst.n_rooms, inst.n_periods), dtype=np.int64)
+        np.add.at(teacher_occ, (inst.course_teacher[state.course[kept]], state.period[kept]), 1)
+        np.add.at(room_occ, (state.room[kept], state.period[kept]), 1)
+
+        # Variables solo para celdas permitidas y libres
+        need = np.bincount(state.course[free_blocks], minlength=inst.n_courses)
+        x = {}
+        by_course = {}
+        for c in np.flatnonzero(need).tolist():
+            t = int(inst.course_teacher[c])
+            for p in np.flatnonzero(free_periods & inst.course_allowed[c] & (teacher_occ[t] == 0)).tolist():
+                for r in inst.course_rooms[c].tolist():
+                    if room_occ[r, p] == 0:
+                        x[c, p, r] = model.NewBoolVar(f'x_{c}_{p}_{r}')
+                        by_course.setdefault(c, []).append(x[c, p, r])
+            if c not in by_course:
+                return None
+            model.Add(sum(by_course[c]) == int(need[c]))
+
+        by_teacher_period = {}
+        by_room_period = {}
+        for (c, p, r), var in x.items():
+            by_teacher_period.setdefault((int(inst.course_teacher[c]), p), []).append(var)
+            by_room_period.setdefault((r, p), []).append(var)
+        for group in list(by_teacher_period.values()) + list(by_room_period.values()):
+            model.Add(sum(group) <= 1)
+
+        # Objetivo exacto para los docentes y días afectados
+        teachers = sorted(set(inst.course_teacher[np.flatnonzero(need)].tolist()))
+        days = sorted(set(inst.period_day[free_periods].tolist()))
+        objective = []
+        for t in teachers:
+            for d in days:
+                occupancy = []
+                for p in inst.day_period_lists[d]:
+                    fixed = int(min(teacher_occ[t, p], 1))
+                    occupancy.append(fixed + sum(by_teacher_period.get((t, p), [])))
+                load = sum(occupancy)
+                objective.append(self._day_penalty(model, inst.day_period_lists[d], occupancy, t, d))
+                load_var = model.NewIntVar(0, len(occupancy), f'load_{t}_{d}')
+                model.Add(load_var == load)
+                square = model.NewIntVar(0, len(occupancy) ** 2, f'sq_{t}_{d}')
+                model.AddMultiplicationEquality(square, [load_var, load_var])
+                # La carga semanal del docente es constante: su varianza solo depende de Σ carga²
+                objective.append(weights.imbalance / max(inst.n_days, 1) * square)
+        model.Minimize(sum(objective))
+
+        # Sugerir la ubicación actual de los bloques liberados
+        for b in free_blocks.tolist():
+            key = (int(state.course[b]), int(state.period[b]), int(state.room[b]))
+            if key in x:
+                model.AddHint(x[key], 1)
+
+        solver = cp_model.CpSolver()
+        apply_profile(solver.parameters, self.request.options, time_limit)
+        solver.parameters.random_seed = self.request.options.seed + self.neighborhoods_tried
+        self.subsolver = solver
+        if self.stop_requested:
+            return None
+        status = solver.Solve(model)
+        self.subsolver = None
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return None
+
+        candidate = state.copy()
+        slots = {c: [] for c in by_course}
+        for (c, p, r), var in x.items():
+            if solver.Value(var):
+                slots[c].append((p, r))
+        for b in free_blocks.tolist():
+            p, r = slots[int(state.course[b])].pop()
+            candidate.period[b] = p
+            candidate.room[b] = r
+        return candidate
+
+    def _day_penalty(self, model: cp_model.CpModel, periods: List[int], occupancy: list, t: int, d: int):
+        """
+        Huecos y extremos de un docente en un día, con primer y último bloque
+        ocupados. Como en la formulación compacta de CP-SAT, el hueco solo se
+        cuenta si el docente tiene clase ese día.
+        """
+        inst = self.instance
+        weights = self.request.weights
+        blocks = [int(inst.period_block[p]) for p in periods]
+        first = model.NewIntVar(min(blocks), max(blocks), f'first_{t}_{d}')
+        last = model.NewIntVar(min(blocks), max(blocks), f'last_{t}_{d}')
+        holes = model.NewIntVar(0, len(periods), f'holes_{t}_{d}')
+        used = model.NewBoolVar(f'used_{t}_{d}')
+        model.Add(sum(occupancy) <= len(periods) * used)
+        for block, occ in zip(blocks, occupancy):
+            if isinstance(occ, int):
+                if occ:
+                    model.Add(first <= block)
+                    model.Add(last >= block)
+                continue
+            busy = model.NewBoolVar('')
+            model.Add(busy == occ)
+            model.Add(first <= block).OnlyEnforceIf(busy)
+            model.Add(last >= block).OnlyEnforceIf(busy)
+        model.Add(holes >= last - first + 1 - sum(occupancy)).OnlyEnforceIf(used)
+        return weights.holes * holes + weights.early * occupancy[0] + weights.late * occupancy[-1]
@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from typing import Optional, Tuple
+import hashlib
+import json
+import threading
+import logging
+from ..domain.models import ScheduleRequest
+from .cp_solver import ScheduleSolver
+
+logger = logging.getLogger(__name__)
+
+MODEL_CACHE_MAX_ENTRIES = 16
+MODEL_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Memoria estimada por variable (proto y objeto Python) y por restricción
+VAR_BYTES = 250
+CONSTRAINT_BYTES = 400
+
+
+def structural_key(request: ScheduleRequest) -> str:
+    """
+    Hash canónico de la parte estructural de la solicitud: periodos, salas,
+    docentes, cursos, disponibilidad, bloqueos, asignaciones fijas y las opciones
+    que cambian el modelo (modo, formulación y ruptura de simetría). No depende
+    del orden de las listas de datos salvo el de los periodos (define el orden
+    de días y bloques sin número), ni de pesos u opciones de búsqueda.
+    """
+    def canonical(items) -> list:
+        return sorted(json.dumps(item.model_dump(mode='json'), sort_keys=True) for item in items)
+
+    data = {
+        'periods': list(request.periods),
+        'rooms': canonical(request.rooms),
+        'teachers': sorted(t.id for t in request.teachers),
+        'courses': canonical(request.courses),
+        'availability': canonical(request.availability),
+        'hardLocks': canonical(request.hardLocks),
+        'fixedAssignments': canonical(request.fixedAssignments),
+        'cpMode': request.options.cpMode.value,
+        'symmetryBreaking': request.options.cpSymmetryBreaking,
+        'formulation': request.options.cpFormulation.value
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+class ModelCache:
+    """
+    Caché LRU de modelos CP-SAT construidos, indexada por structural_key.
+
+    Un modelo se retira de la caché mientras se usa (checkout) y se devuelve al
+    terminar (checkin), por lo que dos solicitudes concurrentes nunca comparten
+    el mismo modelo. La expulsión respeta un límite de entradas y un límite de
+    memoria estimado a partir de la cantidad de variables y restricciones.
+    """
+
+    def __init__(self, max_entries: int = MODEL_CACHE_MAX_ENTRIES, max_bytes: int = MODEL_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[ScheduleSolver, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def checkout(self, key: str) -> Optional[ScheduleSolver]:
+        """Retirar el modelo de la clave, o None si no está en caché"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._bytes -= entry[1]
+            return entry[0]
+
+    def checkin(self, key: str, solver: ScheduleSolver):
+        """Devolver un modelo construido a la caché, expulsando los menos usados si no cabe"""
+        size = self._estimate_size(solver)
+        if size > self.max_bytes:
+            logger.info(f"Modelo de {size / 2**20:.1f} MiB excede la caché; no se guarda")
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (solver, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    @staticmethod
+    def _estimate_size(solver: ScheduleSolver) -> int:
+        proto = solver.model.Proto()
+        return VAR_BYTES * len(proto.variables) + CONSTRAINT_BYTES * len(proto.constraints)
@@ -0,0 +1,141 @@
+from typing import Optional
+import multiprocessing
+import threading
+import logging
+from ..domain.models import ScheduleRequest, ScheduleResponse, SolutionUpdate
+from ..domain.instance import ProblemInstance
+from ..domain.metrics import assignments_to_arrays, compute_metrics
+from ..solver_meta.incumbent import IncumbentExchange
+from ..solver_meta.simulated_annealing import SimulatedAnnealing
+from .cp_solver import ScheduleSolver
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_SEC = 0.1
+JOIN_GRACE_SEC = 5.0  # Margen para que la metaheurística entregue su respuesta tras el plazo
+
+
+def _run_metaheuristic(request: ScheduleRequest, instance: ProblemInstance, exchange: IncumbentExchange):
+    """Recocido del portafolio (función de nivel de módulo para el proceso hijo)"""
+    try:
+        annealer = SimulatedAnnealing(request, instance)
+        annealer.exchange = exchange
+        exchange.finish(annealer.solve())
+    except Exception as e:
+        exchange.fail(str(e))
+
+
+class PortfolioSolver:
+    """
+    Portafolio CP-SAT + recocido simulado (options.portfolio).
+
+    El recocido corre en un proceso aparte mientras CP-SAT resuelve en el
+    principal, ambos con el plazo options.maxTimeSec. Cada solución de CP-SAT se
+    ofrece al recocido, que continúa desde ella si mejora la suya; el recocido
+    informa el costo de su mejor solución. El recocido se detiene en cuanto
+    CP-SAT termina (por prueba, brecha o plazo) y CP-SAT se detiene si el
+    recocido llega a costo 0.
+
+    Se devuelve la respuesta con menor objetivo según compute_metrics (la de
+    CP-SAT ante empates). Sin solución de CP-SAT, la del recocido se devuelve si
+    no viola restricciones duras o si options.fallbackIfNoFeasible está activo.
+    """
+
+    def __init__(self, request: ScheduleRequest, solver: ScheduleSolver):
+        self.request = request
+        self.solver = solver
+        self.meta_cost = float('inf')
+        self.meta_response: Optional[ScheduleResponse] = None
+        self.meta_finished = False
+
+    def solve(self) -> ScheduleResponse:
+        options = self.request.options
+        instance = self.solver.instance
+        exchange = IncumbentExchange()
+        meta_options = options.model_copy(update={'metaMaxTimeSec': float(options.maxTimeSec)})
+        meta_request = self.request.model_copy(update={'options': meta_options})
+        process = multiprocessing.Process(
+            target=_run_metaheuristic, args=(meta_request, instance, exchange), daemon=True
+        )
+        process.start()
+
+        # Dejar un núcleo al recocido si no se fijó la cantidad de workers
+        parameters = self.solver.solver.parameters
+        if options.cpWorkers is None and parameters.num_workers > 1:
+            parameters.num_workers -= 1
+
+        watcher = threading.Thread(target=self._watch, args=(exchange, process), daemon=True)
+        watcher.start()
+
+        listener = self.solver.listener
+
+        def share(update: SolutionUpdate):
+            # Un recocido terminado ya no lee la cola
+            if not self.meta_finished and process.is_alive():
+                exchange.offer(update.assignments)
+            if listener is not None:
+                listener(update)
+
+        self.solver.listener = share
+        try:
+            cp_response = self.solver.solve()
+            # CP-SAT terminó (con una prueba, al alcanzar la brecha o en el plazo, que
+            # también es el del recocido): el recocido entrega su mejor solución
+            exchange.stop()
+            watcher.join(timeout=options.maxTimeSec + JOIN_GRACE_SEC)
+        finally:
+            self.solver.listener = listener
+            exchange.stop()
+            process.join(timeout=JOIN_GRACE_SEC)
+            if process.is_alive():
+                process.terminate()
+            exchange.close()
+        return self._choose(cp_response, instance)
+
+    def _watch(self, exchange: IncumbentExchange, process: multiprocessing.Process):
+        """Seguir los mensajes del recocido; detener CP-SAT si llega a costo 0"""
+        while True:
+            message = exchange.poll(POLL_INTERVAL_SEC)
+            if message is None:
+                if not process.is_alive():
+                    self.meta_finished = True
+                    return
+                continue
+            kind, payload = message
+            if kind == 'cost':
+                self.meta_cost = min(self.meta_cost, payload)
+            elif kind == 'done':
+                self.meta_response = payload
+                self.meta_cost = min(self.meta_cost, payload.metrics.objective)
+            else:
+                logger.error(f"Error en el recocido del portafolio: {payload}")
+            if self.meta_cost <= 0:
+                self.solver.stop()
+            if kind != 'cost':
+                self.meta_finished = True
+                return
+
+    def _choose(self, cp_response: ScheduleResponse, instance: ProblemInstance) -> ScheduleResponse:
+        meta = self.meta_response
+        cp_cost = float('inf')
+        if cp_response.assignments:
+            cp_cost = compute_metrics(instance, *assignments_to_arrays(instance, cp_response.assignments)).objective
+
+        if meta is None:
+            winner = 'cp'
+        elif not cp_response.assignments:
+            usable = meta.metrics.hardViolations == 0 or self.request.options.fallbackIfNoFeasible
+            winner = 'meta' if usable else 'cp'
+        else:
+            winner = 'meta' if meta.metrics.objective < cp_cost else 'cp'
+
+        meta_cost = meta.metrics.objective if meta is not None else float('inf')
+        logger.info(f"Portafolio: gana {winner} (CP-SAT {cp_cost:.2f}, recocido {meta_cost:.2f})")
+        response = meta if winner == 'meta' else cp_response
+        return response.model_copy(update={
+            'metrics': response.metrics.model_copy(update={'portfolioWinner': winner}),
+            'explanation': (
+                f"Portafolio CP-SAT + recocido: se eligió "
+                f"{'el recocido' if winner == 'meta' else 'CP-SAT'}. {response.explanation}"
+            )
+        })
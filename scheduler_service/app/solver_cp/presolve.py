@@ -0,0 +1,67 @@
+from typing import Dict, List, Tuple
+import numpy as np
+import logging
+from ..domain.instance import ProblemInstance
+
+logger = logging.getLogger(__name__)
+
+
+class Presolve:
+    """
+    Dominio reducido de las variables CP antes de construir el modelo.
+
+    Parte de los periodos permitidos de cada curso (disponibilidad docente y
+    prohibiciones) y propaga las asignaciones fijas y los bloqueos "must-place":
+    el docente queda ocupado en ese periodo para sus demás cursos, la sala fija
+    queda ocupada para los demás cursos y el curso no puede usar otra sala en
+    ese periodo. Las celdas fijas se modelan como constantes y las prohibidas
+    no generan variables.
+
+    Las asignaciones fijas que contradicen el dominio (docente no disponible,
+    periodo prohibido o dos fijas que se topan) se registran en conflicts: el
+    modelo es infactible, como lo era con las restricciones explícitas.
+    """
+
+    def __init__(self, instance: ProblemInstance):
+        self.instance = instance
+        inst = instance
+        self.allowed = inst.course_allowed.copy()
+        self.room_taken = np.zeros((inst.n_rooms, inst.n_periods), dtype=bool)
+        self.fixed_rooms: Dict[Tuple[int, int], int] = {}
+        self.conflicts: List[str] = []
+
+        teacher_taken: Dict[Tuple[int, int], int] = {}
+        fixed = [(c, p, r) for c, p, r in inst.fixed if r in inst.course_rooms[c]]
+        for c, p, r in fixed:
+            t = int(inst.course_teacher[c])
+            if not self.allowed[c, p] or self.room_taken[r, p] or teacher_taken.get((t, p), c) != c:
+                self.conflicts.append(
+                    f"{inst.course_ids[c]} fijo en {inst.periods[p]} {inst.room_ids[r]}"
+                )
+                continue
+            self.fixed_rooms[c, p] = r
+            self.room_taken[r, p] = True
+            teacher_taken[t, p] = c
+
+        # Un must-place también ocupa al docente en ese periodo
+        for c, p in inst.must_place:
+            teacher_taken.setdefault((int(inst.course_teacher[c]), p), c)
+
+        for (t, p), owner in teacher_taken.items():
+            for c in inst.teacher_courses[t]:
+                if c != owner:
+                    self.allowed[c, p] = False
+
+        if self.conflicts:
+            logger.warning(f"Asignaciones fijas en conflicto: {'; '.join(self.conflicts)}")
+
+    def rooms(self, c: int, p: int) -> List[int]:
+        """Salas candidatas del curso c en el periodo p (vacío si la celda está prohibida)"""
+        if (c, p) in self.fixed_rooms:
+            return [self.fixed_rooms[c, p]]
+        if not self.allowed[c, p]:
+            return []
+        return [r for r in self.instance.course_rooms[c].tolist() if not self.room_taken[r, p]]
+
+    def is_fixed(self, c: int, p: int) -> bool:
+        return (c, p) in self.fixed_rooms
@@ -0,0 +1,103 @@
+from typing import Optional
+import math
+import os
+import logging
+from ..domain.models import SolverOptions, CpProfile
+
+logger = logging.getLogger(__name__)
+
+# Con el perfil determinista, el tiempo determinista se fija por debajo de
+# maxTimeSec para que en hardware normal termine antes que el plazo de reloj
+DETERMINISTIC_TIME_FRACTION = 0.5
+
+# Núcleos que puede usar un proceso de resolución; SolvePool lo fija en cada
+# worker para que el paralelismo interno se reparta los núcleos del contenedor
+CPU_LIMIT_ENV = "SOLVER_CPUS"
+
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """Cuota de CPU del contenedor (cgroup v2 o v1), o None si no hay límite"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+        if quota != 'max':
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus() -> int:
+    """
+    Núcleos que el proceso puede usar: afinidad de CPU acotada por la cuota del
+    cgroup y por SOLVER_CPUS si está definida
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+    if os.environ.get(CPU_LIMIT_ENV):
+        cpus = min(cpus, int(os.environ[CPU_LIMIT_ENV]))
+    return max(cpus, 1)
+
+
+def limit_cpus(cpus: int):
+    """Acotar available_cpus() en este proceso y en los que lance"""
+    os.environ[CPU_LIMIT_ENV] = str(max(1, cpus))
+
+
+def apply_profile(parameters, options: SolverOptions, max_time: Optional[float] = None):
+    """
+    Configurar los parámetros de CP-SAT según options.cpProfile:
+
+    - fast: búsqueda en paralelo sin linealización, se detiene con un 5 % de brecha
+    - balanced: portafolio en paralelo con linealización por defecto, hasta el óptimo
+    - prove-optimal: linealización completa, hasta el óptimo
+    - deterministic: búsqueda intercalada reproducible, limitada por tiempo determinista
+
+    maxTimeSec es siempre el límite de reloj. Con el perfil determinista el
+    resultado es reproducible mientras el límite determinista se alcance antes;
+    si la máquina es muy lenta corta el reloj y deja de serlo.
+
+    options.cpWorkers fija la cantidad de workers; por defecto se usan los
+    núcleos disponibles en el contenedor. options.gapTolerance reemplaza la
+    brecha relativa del perfil: la búsqueda termina al alcanzarla.
+    """
+    max_time = options.maxTimeSec if max_time is None else max_time
+    profile = options.cpProfile
+    workers = options.cpWorkers or available_cpus()
+
+    parameters.max_time_in_seconds = max_time
+    parameters.random_seed = options.seed
+    parameters.num_workers = workers
+
+    if profile == CpProfile.FAST:
+        parameters.linearization_level = 0
+        parameters.relative_gap_limit = 0.05
+    elif profile == CpProfile.BALANCED:
+        parameters.linearization_level = 1
+        parameters.relative_gap_limit = 0.0
+    elif profile == CpProfile.PROVE_OPTIMAL:
+        parameters.linearization_level = 2
+        parameters.relative_gap_limit = 0.0
+    else:  # deterministic
+        parameters.interleave_search = True
+        parameters.max_deterministic_time = max_time * DETERMINISTIC_TIME_FRACTION
+
+    if options.gapTolerance is not None:
+        parameters.relative_gap_limit = options.gapTolerance
+
+    logger.debug(f"Perfil CP-SAT {profile.value} con {workers} workers")
@@ -0,0 +1,72 @@
+from typing import Dict, List, Tuple
+import numpy as np
+from ..domain.instance import ProblemInstance
+
+
+class Symmetries:
+    """
+    Grupos de elementos intercambiables de una instancia:
+
+    - Salas del mismo tipo que no aparecen en asignaciones fijas: cada periodo
+      puede permutar sus salas sin cambiar factibilidad ni costo.
+    - Cursos del mismo docente con igual tipo de sala, bloques semanales y
+      periodos permitidos, sin asignaciones fijas ni bloqueos "must-place"
+      (secciones paralelas): sus conjuntos de periodos son intercambiables.
+
+    Solo se reportan grupos de dos o más elementos.
+    """
+
+    def __init__(self, instance: ProblemInstance):
+        self.instance = instance
+        pinned_rooms = {r for _, _, r in instance.fixed}
+        pinned_courses = {c for c, _, _ in instance.fixed} | {c for c, _ in instance.must_place}
+
+        self.room_groups: List[List[int]] = [
+            group for group in (
+                [r for r in rooms.tolist() if r not in pinned_rooms] for rooms in instance.rooms_by_type
+            )
+            if len(group) > 1
+        ]
+
+        by_signature: Dict[Tuple, List[int]] = {}
+        for c in range(instance.n_courses):
+            if c in pinned_courses:
+                continue
+            signature = (
+                int(instance.course_teacher[c]),
+                int(instance.course_room_type[c]),
+                int(instance.course_blocks[c]),
+                instance.course_allowed[c].tobytes()
+            )
+            by_signature.setdefault(signature, []).append(c)
+        self.course_groups: List[List[int]] = [group for group in by_signature.values() if len(group) > 1]
+
+    def __len__(self) -> int:
+        return len(self.room_groups) + len(self.course_groups)
+
+    def canonicalize(self, course: np.ndarray, period: np.ndarray,
+                     room: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Llevar un horario a la forma que cumplen las restricciones de ruptura de
+        simetría, con el mismo costo: dentro de cada grupo de cursos, el de menor
+        índice toma el conjunto de periodos que empieza antes; dentro de cada grupo
+        de salas, cada periodo usa las salas de menor índice.
+        """
+        course, period, room = course.copy(), period.copy(), room.copy()
+
+        for group in self.course_groups:
+            members = [np.flatnonzero(course == c) for c in group]
+            if any(len(blocks) == 0 for blocks in members):
+                continue
+            order = sorted(range(len(group)), key=lambda i: period[members[i]].min())
+            for c, i in zip(group, order):
+                course[members[i]] = c
+
+        for group in self.room_groups:
+            rank = {r: k for k, r in enumerate(group)}
+            for p in np.unique(period).tolist():
+                blocks = [b for b in np.flatnonzero(period == p).tolist() if int(room[b]) in rank]
+                blocks.sort(key=lambda b: rank[int(room[b])])
+                for k, b in enumerate(blocks):
+                    room[b] = group[k]
+        return course, period, room
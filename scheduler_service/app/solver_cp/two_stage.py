@@ -0,0 +1,134 @@
+from ortools.sat.python import cp_model
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import numpy as np
+import logging
+from ..domain.models import ScheduleRequest
+from ..domain.instance import ProblemInstance
+from .cp_solver import ScheduleSolver
+from .presolve import Presolve
+
+logger = logging.getLogger(__name__)
+
+
+class TwoStageSolver(ScheduleSolver):
+    """
+    Resolución en dos etapas: primero un modelo CP-SAT con y[c,p] = 1 si el curso
+    c se dicta en el periodo p, con capacidad por tipo de sala en cada periodo;
+    luego la asignación de salas concretas periodo a periodo con un emparejamiento
+    bipartito (caminos aumentantes).
+
+    Las salas compatibles de un curso son todas las de su tipo, por lo que son
+    intercambiables y la capacidad por tipo garantiza que el emparejamiento
+    existe: el óptimo coincide con el del modelo completo, con un número de
+    variables menor en el factor de salas por tipo.
+    """
+
+    def __init__(self, request: ScheduleRequest, instance: Optional[ProblemInstance] = None):
+        super().__init__(request, instance)
+        self._matched: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def reuse(self, request: ScheduleRequest):
+        super().reuse(request)
+        self._matched = None
+
+    def _create_variables(self):
+        """Crear y[c,p] solo en el dominio del Presolve, con constantes para los periodos fijos"""
+        inst = self.instance
+        self.presolve = Presolve(inst)
+        self.x = {}
+        self.y = {}
+        self.course_period_vars: Dict[Tuple[int, int], list] = {}
+        self.room_period_vars: Dict[Tuple[int, int], list] = {}
+        for c in range(inst.n_courses):
+            has_rooms = len(inst.course_rooms[c]) > 0
+            for p in range(inst.n_periods):
+                if self.presolve.is_fixed(c, p):
+                    self.y[c, p] = self.model.NewConstant(1)
+                elif has_rooms and self.presolve.allowed[c, p]:
+                    self.y[c, p] = self.model.NewBoolVar(f'y_{c}_{p}')
+                self.course_period_vars[c, p] = [self.y[c, p]] if (c, p) in self.y else []
+        self.pruned = sum(1 for rooms in inst.course_rooms if len(rooms)) * inst.n_periods - len(self.y)
+        self._index_teachers()
+
+    def add_no_overlap_constraints(self):
+        """Sin topes de docente y sin exceder las salas de cada tipo en cada periodo"""
+        super().add_no_overlap_constraints()
+        inst = self.instance
+        courses_by_type: Dict[int, List[int]] = {}
+        for c in range(inst.n_courses):
+            courses_by_type.setdefault(int(inst.course_room_type[c]), []).append(c)
+        for k, courses in courses_by_type.items():
+            capacity = len(inst.rooms_by_type[k])
+            if len(courses) <= capacity:
+                continue
+            for p in range(inst.n_periods):
+                self.model.Add(
+                    cp_model.LinearExpr.Sum([var for c in courses for var in self.course_period_vars[c, p]])
+                    <= capacity
+                )
+
+    def _add_hints(self, course: np.ndarray, period: np.ndarray, room: np.ndarray,
+                   model: Optional[cp_model.CpModel] = None):
+        """Sugerir solo los periodos del horario dado; las salas las decide el emparejamiento"""
+        model = self.model if model is None else model
+        hinted = set(zip(course.tolist(), period.tolist()))
+        for key, var in self.y.items():
+            model.AddHint(var, key in hinted)
+
+    def _solution_arrays(self, value: Optional[Callable] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Periodos de la primera etapa con las salas del emparejamiento. El de la
+        solución final se calcula una vez; los de soluciones intermedias (value
+        de un callback) no se guardan.
+        """
+        if value is not None:
+            return self._assign_rooms(value)
+        if self._matched is None:
+            self._matched = self._assign_rooms(self.solver.Value)
+        return self._matched
+
+    def _assign_rooms(self, value: Callable) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        by_period: Dict[int, List[int]] = {}
+        for (c, p), var in self.y.items():
+            if value(var) == 1:
+                by_period.setdefault(p, []).append(c)
+
+        active = []
+        for p in sorted(by_period):
+            rooms = self._match_rooms(p, by_period[p])
+            active.extend((c, p, rooms[c]) for c in by_period[p])
+        arrays = np.array(active, dtype=np.int64).reshape(-1, 3)
+        return arrays[:, 0], arrays[:, 1], arrays[:, 2]
+
+    def _match_rooms(self, period: int, courses: List[int]) -> Dict[int, int]:
+        """Emparejamiento máximo curso-sala de un periodo, respetando salas fijas"""
+        inst = self.instance
+        room_course: Dict[int, int] = {}
+        pinned: Set[int] = set()
+        for c, p, r in inst.fixed:
+            if p == period and c in courses and r not in room_course:
+                room_course[r] = c
+                pinned.add(c)
+
+        def augment(c: int, seen: Set[int]) -> bool:
+            for r in inst.course_rooms[c].tolist():
+                if r in seen:
+                    continue
+                seen.add(r)
+                owner = room_course.get(r)
+                if owner is None or (owner not in pinned and augment(owner, seen)):
+                    room_course[r] = c
+                    return True
+            return False
+
+        unmatched = [c for c in courses if c not in pinned and not augment(c, set())]
+        rooms = {c: r for r, c in room_course.items()}
+        if unmatched:
+            # Solo ocurre con salas fijas en conflicto: ubicar igual y dejar que las métricas lo reporten
+            logger.warning(
+                f"Sin sala libre en {inst.periods[period]} para "
+                f"{', '.join(inst.course_ids[c] for c in unmatched)}"
+            )
+            for c in unmatched:
+                rooms[c] = int(inst.course_rooms[c][0])
+        return rooms
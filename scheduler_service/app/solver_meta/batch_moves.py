@@ -0,0 +1,225 @@
+from typing import List, NamedTuple, Optional, Tuple
+import numpy as np
+from ..domain.instance import ProblemInstance
+from ..domain.metrics import HARD_PENALTY
+from .delta_evaluator import IncrementalEvaluator, Change
+
+
+class MoveBatch(NamedTuple):
+    """
+    Lote de movimientos candidatos. Cada movimiento reubica ``block`` en
+    (``period``, ``room``); los intercambios reubican además ``block2``
+    (-1 en los demás movimientos).
+    """
+    block: np.ndarray
+    period: np.ndarray
+    room: np.ndarray
+    block2: np.ndarray
+    period2: np.ndarray
+    room2: np.ndarray
+
+
+class BatchMoveEvaluator:
+    """
+    Genera y evalúa lotes de movimientos swap/move/change_room con operaciones
+    NumPy sobre los contadores de un IncrementalEvaluator, sin modificar el estado.
+
+    El delta de una reubicación se obtiene de forma cerrada: topes a partir de la
+    ocupación (docente, periodo) y (sala, periodo), varianza a partir de la carga
+    diaria y huecos recalculando solo las filas docente-día afectadas. Un
+    intercambio es la suma de dos reubicaciones independientes cuando sus bloques
+    no comparten docente ni sala; los pocos que sí comparten se evalúan de forma
+    exacta aplicando y revirtiendo el movimiento.
+    """
+
+    def __init__(self, instance: ProblemInstance, seed: int):
+        self.instance = instance
+        self.rng = np.random.default_rng(seed)
+        weights = instance.request.weights
+        self.weights = weights
+
+        # Periodos de cada día en una matriz rellenada: (día, posición) -> periodo
+        width = max((len(p) for p in instance.day_period_lists), default=0)
+        self.day_matrix = np.zeros((max(instance.n_days, 1), max(width, 1)), dtype=np.int64)
+        self.day_valid = np.zeros(self.day_matrix.shape, dtype=bool)
+        self.period_pos = np.zeros(instance.n_periods, dtype=np.int64)
+        for d, periods in enumerate(instance.day_period_lists):
+            self.day_matrix[d, :len(periods)] = periods
+            self.day_valid[d, :len(periods)] = True
+            self.period_pos[periods] = np.arange(len(periods))
+        self.day_blocks = instance.period_block[self.day_matrix]
+
+        # Salas compatibles de cada curso en una matriz rellenada
+        self.room_count = np.array([len(r) for r in instance.course_rooms], dtype=np.int64)
+        self.room_matrix = np.zeros((max(instance.n_courses, 1), max(int(self.room_count.max(initial=0)), 1)),
+                                    dtype=np.int64)
+        for c, rooms in enumerate(instance.course_rooms):
+            self.room_matrix[c, :len(rooms)] = rooms
+
+    def propose(self, evaluator: IncrementalEvaluator, size: int) -> MoveBatch:
+        """Generar un lote de movimientos sobre bloques no fijos"""
+        inst = self.instance
+        state = evaluator.state
+        movable = np.flatnonzero(~state.fixed)
+        rng = self.rng
+
+        block = movable[rng.integers(len(movable), size=size)]
+        period = state.period[block].copy()
+        room = state.room[block].copy()
+        block2 = np.full(size, -1, dtype=np.int64)
+        period2 = np.full(size, -1, dtype=np.int64)
+        room2 = np.full(size, -1, dtype=np.int64)
+
+        kind = rng.integers(3, size=size)
+        move = kind == 1
+        change_room = (kind == 2) & (self.room_count[state.course[block]] > 0)
+        swap = kind == 0
+
+        # Mover: cualquier otro periodo
+        if inst.n_periods > 1:
+            period[move] = (period[move] + rng.integers(1, inst.n_periods, size=int(move.sum()))) % inst.n_periods
+
+        # Cambiar de sala: una sala compatible al azar
+        courses = state.course[block[change_room]]
+        choice = (rng.random(len(courses)) * self.room_count[courses]).astype(np.int64)
+        room[change_room] = self.room_matrix[courses, choice]
+
+        # Intercambiar periodos con otro bloque
+        other = movable[rng.integers(len(movable), size=int(swap.sum()))]
+        block2[swap] = other
+        period[swap] = state.period[other]
+        period2[swap] = state.period[block[swap]]
+        room2[swap] = state.room[other]
+
+        return MoveBatch(block, period, room, block2, period2, room2)
+
+    def score(self, evaluator: IncrementalEvaluator, moves: MoveBatch) -> np.ndarray:
+        """Delta de costo de cada movimiento respecto del estado actual"""
+        deltas = self._relocation_delta(evaluator, moves.block, moves.period, moves.room)
+
+        swap = moves.block2 >= 0
+        if swap.any():
+            state = evaluator.state
+            b1 = moves.block[swap]
+            b2 = moves.block2[swap]
+            deltas[swap] += self._relocation_delta(evaluator, b2, moves.period2[swap], moves.room2[swap])
+
+            # Intercambios sin efecto o con bloques que interactúan
+            inst = self.instance
+            same = (b1 == b2) | (state.period[b1] == state.period[b2])
+            swap_idx = np.flatnonzero(swap)
+            deltas[swap_idx[same]] = np.inf
+            interacting = ~same & (
+                (inst.course_teacher[state.course[b1]] == inst.course_teacher[state.course[b2]]) |
+                (state.room[b1] == state.room[b2])
+            )
+            base = evaluator.cost
+            for k in swap_idx[interacting].tolist():
+                undo = evaluator.apply(self.changes(moves, k))
+                deltas[k] = evaluator.cost - base
+                evaluator.revert(undo)
+
+        return deltas
+
+    def changes(self, moves: MoveBatch, k: int) -> List[Change]:
+        """Cambios del movimiento k, en el formato de IncrementalEvaluator.apply"""
+        changes = [(int(moves.block[k]), int(moves.period[k]), int(moves.room[k]))]
+        if moves.block2[k] >= 0:
+            changes.append((int(moves.block2[k]), int(moves.period2[k]), int(moves.room2[k])))
+        return changes
+
+    def metropolis(self, deltas: np.ndarray, T: float) -> Tuple[Optional[int], int]:
+        """
+        Muestreo de Metropolis sobre el lote: acepta el primer movimiento que pasa
+        la prueba, lo que equivale a evaluarlos uno a uno sobre el mismo estado.
+        Devuelve el índice aceptado (o None) y la cantidad de candidatos examinados.
+        """
+        with np.errstate(over='ignore', invalid='ignore'):
+            accept = (deltas <= 0) | (self.rng.random(len(deltas)) < np.exp(-deltas / T))
+        accept &= np.isfinite(deltas)
+        hits = np.flatnonzero(accept)
+        if len(hits) == 0:
+            return None, len(deltas)
+        return int(hits[0]), int(hits[0]) + 1
+
+    @staticmethod
+    def best_improvement(deltas: np.ndarray) -> Optional[int]:
+        """Índice del movimiento de mayor mejora, o None si ninguno mejora"""
+        k = int(np.argmin(deltas))
+        return k if deltas[k] < 0 else None
+
+    def _relocation_delta(self, ev: IncrementalEvaluator, block: np.ndarray,
+                          period: np.ndarray, room: np.ndarray) -> np.ndarray:
+        """Delta de reubicar cada bloque en (periodo, sala), de forma vectorizada"""
+        inst = self.instance
+        w = self.weights
+        state = ev.state
+        course = state.course[block]
+        teacher = inst.course_teacher[course]
+        p0 = state.period[block]
+        r0 = state.room[block]
+
+        # Topes: al quitar se liberan n-1 pares y al agregar se crean tantos como ocupantes
+        same_cell = p0 == period
+        d_overlap = (
+            ev.teacher_period[teacher, period] - same_cell - (ev.teacher_period[teacher, p0] - 1) +
+            ev.room_period[room, period] - (same_cell & (r0 == room)) - (ev.room_period[r0, p0] - 1)
+        )
+        d_avail = (
+            (~inst.course_allowed[course, period]).astype(np.int64) -
+            (~inst.course_allowed[course, p0]).astype(np.int64)
+        )
+        d_early = inst.period_first[period].astype(np.int64) - inst.period_first[p0]
+        d_late = inst.period_last[period].astype(np.int64) - inst.period_last[p0]
+        d_special = (
+            (inst.room_special[room] & inst.course_normal[course]).astype(np.int64) -
+            (inst.room_special[r0] & inst.course_normal[course])
+        )
+
+        # Varianza: Σx constante y Σx² cambia en 2(x1 - x0) + 2 si cambia de día
+        d0 = inst.period_day[p0]
+        d1 = inst.period_day[period]
+        other_day = d0 != d1
+        if inst.n_days:
+            d_sq = np.where(other_day, 2 * (ev.load[teacher, d1] - ev.load[teacher, d0]) + 2, 0)
+            d_imbalance = d_sq / inst.n_days
+        else:
+            d_imbalance = np.zeros(len(block))
+
+        # Huecos: fila del día de origen (incluye el destino si es el mismo día) y del destino
+        pos0 = self.period_pos[p0]
+        pos1 = self.period_pos[period]
+        holes_from = self._row_holes(ev, teacher, d0, pos0, np.where(other_day, -1, pos1))
+        holes_to = self._row_holes(ev, teacher, d1, np.full(len(block), -1), pos1)
+        d_holes = (
+            holes_from - ev.holes_td[teacher, d0] +
+            np.where(other_day, holes_to - ev.holes_td[teacher, d1], 0)
+        )
+
+        return (
+            HARD_PENALTY * (d_overlap + d_avail) +
+            w.holes * d_holes +
+            w.early * d_early +
+            w.late * d_late +
+            w.imbalance * d_imbalance +
+            w.specialRoom * d_special
+        ).astype(float)
+
+    def _row_holes(self, ev: IncrementalEvaluator, teacher: np.ndarray, day: np.ndarray,
+                   minus_pos: np.ndarray, plus_pos: np.ndarray) -> np.ndarray:
+        """Huecos de las filas docente-día tras quitar/agregar un bloque (-1 = sin cambio)"""
+        n = len(teacher)
+        rows = ev.teacher_period[teacher[:, None], self.day_matrix[day]]
+        rows = np.where(self.day_valid[day], rows, 0)
+        idx = np.arange(n)
+        minus = minus_pos >= 0
+        plus = plus_pos >= 0
+        rows[idx[minus], minus_pos[minus]] -= 1
+        rows[idx[plus], plus_pos[plus]] += 1
+
+        busy = rows > 0
+        count = busy.sum(axis=1)
+        blocks = self.day_blocks[day]
+        first = np.where(busy, blocks, np.iinfo(np.int64).max).min(axis=1)
+        last = np.where(busy, blocks, np.iinfo(np.int64).min).max(axis=1)
+        return np.where(count >= 2, last - first + 1 - count, 0)
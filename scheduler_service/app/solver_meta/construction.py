@@ -0,0 +1,270 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+import random
+from ..domain.instance import ProblemInstance, ROOM_TYPES
+from .state import ScheduleState
+
+BACKTRACKS_PER_BLOCK = 5  # Presupuesto de expulsiones por bloque pendiente
+MAX_REPORTED_COURSES = 5  # Cursos sin ubicar que se detallan en el informe
+
+
+class ConstructionResult(NamedTuple):
+    feasible: bool
+    placed: int
+    backtracks: int
+    unplaced: List[int]
+    messages: List[str]
+
+
+class GreedyConstructor:
+    """
+    Construcción voraz de una solución inicial sin violaciones duras.
+
+    Ubica un bloque a la vez eligiendo el curso más restringido (menor holgura
+    entre periodos posibles y bloques pendientes, desempatando por la carga del
+    docente), al estilo DSATUR. La ocupación de docentes y salas se lleva en
+    máscaras de bits por periodo, por lo que los periodos posibles de un curso se
+    obtienen con operaciones de enteros en vez de recorrer la solución parcial.
+
+    Si un curso se queda sin periodos, se expulsan los bloques no fijos que
+    bloquean el periodo más barato y vuelven a la cola (retroceso acotado por
+    BACKTRACKS_PER_BLOCK). Antes de construir se verifican condiciones
+    necesarias de capacidad; si alguna falla no se retrocede. Lo que no se logra
+    ubicar se informa en el resultado junto con las causas detectadas.
+    """
+
+    def __init__(self, instance: ProblemInstance, rng: random.Random,
+                 max_backtracks: Optional[int] = None):
+        self.instance = instance
+        self.rng = rng
+        self.max_backtracks = max_backtracks
+        self.full = (1 << instance.n_periods) - 1
+        self.allowed_mask = [
+            sum(1 << p for p in np.flatnonzero(row).tolist()) for row in instance.course_allowed
+        ]
+        self.day_mask = [sum(1 << p for p in periods) for periods in instance.day_period_lists]
+
+    def build(self, state: ScheduleState) -> ConstructionResult:
+        """Completar in situ los bloques sin ubicar del estado"""
+        inst = self.instance
+        self.state = state
+        self.teacher_busy = [0] * inst.n_teachers
+        self.room_busy = [0] * inst.n_rooms
+        self.type_full = [0 if len(rooms) else self.full for rooms in inst.rooms_by_type]
+        self.teacher_slot: Dict[Tuple[int, int], int] = {}
+        self.room_slot: Dict[Tuple[int, int], int] = {}
+        self.course_day = np.zeros((inst.n_courses, max(inst.n_days, 1)), dtype=np.int64)
+        self.teacher_day = np.zeros((inst.n_teachers, max(inst.n_days, 1)), dtype=np.int64)
+
+        for b in np.flatnonzero(state.placed()).tolist():
+            self._occupy(b, int(state.period[b]), int(state.room[b]))
+
+        pending: Dict[int, List[int]] = {}
+        for b in np.flatnonzero(~state.placed()).tolist():
+            pending.setdefault(int(state.course[b]), []).append(b)
+        messages = self._capacity_messages(pending)
+
+        demand = np.bincount(inst.course_teacher[state.course], minlength=inst.n_teachers)
+        budget = self.max_backtracks
+        if messages:
+            # Una condición necesaria no se cumple: retroceder no puede lograr factibilidad
+            budget = 0
+        elif budget is None:
+            budget = BACKTRACKS_PER_BLOCK * sum(len(blocks) for blocks in pending.values())
+        ejected = np.zeros(len(state), dtype=np.int64)
+        backtracks = 0
+        placed = 0
+        unplaced = []
+
+        while pending:
+            # Curso más restringido: menor holgura, luego docente más cargado
+            best_key, course, options = None, -1, 0
+            for c, blocks in pending.items():
+                mask = self._options(c)
+                key = (mask.bit_count() - len(blocks), -int(demand[inst.course_teacher[c]]), c)
+                if best_key is None or key < best_key:
+                    best_key, course, options = key, c, mask
+
+            b = pending[course].pop()
+            if not pending[course]:
+                del pending[course]
+
+            if options:
+                period = self._choose_period(course, options)
+                self._place(b, period, self._choose_room(course, period))
+                placed += 1
+            elif backtracks < budget and self._eject_and_place(b, course, ejected, pending):
+                backtracks += 1
+                placed += 1
+            else:
+                unplaced.append(b)
+
+        if unplaced:
+            counts = np.bincount(state.course[unplaced], minlength=inst.n_courses)
+            courses = np.flatnonzero(counts).tolist()
+            for c in courses[:MAX_REPORTED_COURSES]:
+                messages.append(f"{inst.course_ids[c]}: {counts[c]} bloques sin periodo y sala libres")
+            if len(courses) > MAX_REPORTED_COURSES:
+                messages.append(f"otros {len(courses) - MAX_REPORTED_COURSES} cursos con bloques sin ubicar")
+        return ConstructionResult(not unplaced, placed, backtracks, unplaced, messages)
+
+    def _capacity_messages(self, pending: Dict[int, List[int]]) -> List[str]:
+        """Condiciones necesarias de factibilidad que no se cumplen"""
+        inst = self.instance
+        state = self.state
+        messages = []
+        blocks = np.bincount(state.course, minlength=inst.n_courses)
+        for c in pending:
+            if not len(inst.course_rooms[c]):
+                messages.append(
+                    f"{inst.course_ids[c]}: no hay salas de tipo {ROOM_TYPES[inst.course_room_type[c]].value}"
+                )
+            allowed = self.allowed_mask[c].bit_count()
+            if allowed < blocks[c]:
+                messages.append(
+                    f"{inst.course_ids[c]}: {blocks[c]} bloques pero solo {allowed} periodos permitidos"
+                )
+
+        demand = np.bincount(inst.course_teacher[state.course], minlength=inst.n_teachers)
+        for t in np.flatnonzero(demand).tolist():
+            available = inst.teacher_available_mask[t].bit_count()
+            if available < demand[t]:
+                messages.append(
+                    f"Docente {inst.teacher_ids[t]}: {demand[t]} bloques pero solo {available} periodos disponibles"
+                )
+
+        type_demand = np.bincount(inst.course_room_type[state.course], minlength=len(ROOM_TYPES))
+        for k, rooms in enumerate(inst.rooms_by_type):
+            capacity = len(rooms) * inst.n_periods
+            if rooms.size and type_demand[k] > capacity:
+                messages.append(
+                    f"Salas de tipo {ROOM_TYPES[k].value}: {type_demand[k]} bloques y capacidad {capacity}"
+                )
+        return messages
+
+    def _options(self, c: int) -> int:
+        """Periodos en que el curso puede ubicarse sin topes"""
+        inst = self.instance
+        t = inst.course_teacher[c]
+        return self.allowed_mask[c] & ~self.teacher_busy[t] & ~self.type_full[inst.course_room_type[c]]
+
+    def _choose_period(self, c: int, options: int) -> int:
+        """Preferir días sin el curso, fuera de los extremos y junto a otros bloques del docente"""
+        inst = self.instance
+        t = inst.course_teacher[c]
+        busy = self.teacher_busy[t]
+        best_key, best = None, -1
+        while options:
+            low = options & -options
+            p = low.bit_length() - 1
+            options ^= low
+            d = inst.period_day[p]
+            adjacent = bool(busy & ((low << 1) | (low >> 1)) & self.day_mask[d])
+            key = (
+                self.course_day[c, d],
+                bool(inst.period_first[p] or inst.period_last[p]),
+                not adjacent,
+                self.teacher_day[t, d],
+                self.rng.random()
+            )
+            if best_key is None or key < best_key:
+                best_key, best = key, p
+        return best
+
+    def _choose_room(self, c: int, period: int) -> int:
+        free = [r for r in self.instance.course_rooms[c].tolist() if not (self.room_busy[r] >> period) & 1]
+        return self.rng.choice(free)
+
+    def _eject_and_place(self, b: int, c: int, ejected: np.ndarray,
+                         pending: Dict[int, List[int]]) -> bool:
+        """Liberar el periodo permitido con menos bloques no fijos que lo bloquean"""
+        inst = self.instance
+        state = self.state
+        t = int(inst.course_teacher[c])
+        rooms = inst.course_rooms[c].tolist()
+        best_key, best = None, None
+        options = self.allowed_mask[c]
+        while options:
+            low = options & -options
+            p = low.bit_length() - 1
+            options ^= low
+
+            blockers = set()
+            teacher_block = self.teacher_slot.get((t, p))
+            if teacher_block is not None:
+                if state.fixed[teacher_block] or state.course[teacher_block] == c:
+                    continue
+                blockers.add(teacher_block)
+
+            room = None
+            for r in rooms:
+                occupant = self.room_slot.get((r, p))
+                if occupant is None or occupant in blockers:
+                    room = r
+                    break
+            if room is None:
+                movable = [r for r in rooms if not state.fixed[self.room_slot[(r, p)]]]
+                if not movable:
+                    continue
+                room = min(movable, key=lambda r: (ejected[self.room_slot[(r, p)]], self.rng.random()))
+                blockers.add(self.room_slot[(room, p)])
+
+            key = (len(blockers), sum(int(ejected[x]) for x in blockers), self.rng.random())
+            if best_key is None or key < best_key:
+                best_key, best = key, (p, room, blockers)
+
+        if best is None:
+            return False
+        period, room, blockers = best
+        for x in blockers:
+            self._vacate(x)
+            ejected[x] += 1
+            pending.setdefault(int(state.course[x]), []).append(x)
+        self._place(b, period, room)
+        return True
+
+    def _place(self, b: int, period: int, room: int):
+        self.state.period[b] = period
+        self.state.room[b] = room
+        self._occupy(b, period, room)
+
+    def _occupy(self, b: int, period: int, room: int):
+        inst = self.instance
+        c = int(self.state.course[b])
+        t = int(inst.course_teacher[c])
+        bit = 1 << period
+        self.teacher_busy[t] |= bit
+        self.room_busy[room] |= bit
+        self.teacher_slot.setdefault((t, period), b)
+        self.room_slot.setdefault((room, period), b)
+        d = inst.period_day[period]
+        self.course_day[c, d] += 1
+        self.teacher_day[t, d] += 1
+        self._update_type(inst.room_type[room], period)
+
+    def _vacate(self, b: int):
+        inst = self.instance
+        state = self.state
+        c = int(state.course[b])
+        t = int(inst.course_teacher[c])
+        period = int(state.period[b])
+        room = int(state.room[b])
+        bit = 1 << period
+        self.teacher_busy[t] &= ~bit
+        self.room_busy[room] &= ~bit
+        del self.teacher_slot[(t, period)]
+        del self.room_slot[(room, period)]
+        d = inst.period_day[period]
+        self.course_day[c, d] -= 1
+        self.teacher_day[t, d] -= 1
+        self._update_type(inst.room_type[room], period)
+        state.period[b] = -1
+        state.room[b] = -1
+
+    def _update_type(self, k: int, period: int):
+        """Marcar el periodo como lleno para el tipo de sala si todas sus salas están ocupadas"""
+        bit = 1 << period
+        if all((self.room_busy[r] >> period) & 1 for r in self.instance.rooms_by_type[k].tolist()):
+            self.type_full[k] |= bit
+        else:
+            self.type_full[k] &= ~bit
@@ -0,0 +1,173 @@
+from typing import List, Tuple
+import numpy as np
+from ..domain.instance import ProblemInstance
+from ..domain.metrics import HARD_PENALTY
+from .state import ScheduleState
+
+# Cambio sobre un bloque: (bloque, nuevo periodo, nueva sala)
+Change = Tuple[int, int, int]
+
+
+class IncrementalEvaluator:
+    """
+    Evaluador incremental del costo de un ScheduleState.
+
+    Mantiene contadores de ocupación por (docente, periodo) y (sala, periodo),
+    carga por docente y día, huecos por docente y día, y los totales de cada
+    penalización. Mover un bloque actualiza solo los contadores afectados, por
+    lo que evaluar un swap/move/change_room cuesta O(bloques por día) en vez de
+    recorrer todo el horario.
+
+    El evaluador es dueño de las mutaciones: ``apply`` modifica el estado y los
+    contadores, y ``revert`` deshace un cambio rechazado.
+    """
+
+    def __init__(self, instance: ProblemInstance, state: ScheduleState):
+        self.instance = instance
+        self.state = state
+        weights = instance.request.weights
+        self.w_holes = weights.holes
+        self.w_early = weights.early
+        self.w_late = weights.late
+        self.w_imbalance = weights.imbalance
+        self.w_special = weights.specialRoom
+
+        self.course_teacher = instance.course_teacher
+        self.course_normal = instance.course_normal
+        self.course_allowed = instance.course_allowed
+        self.room_special = instance.room_special
+        self.period_day = instance.period_day
+        self.period_block = instance.period_block
+        self.period_first = instance.period_first
+        self.period_last = instance.period_last
+        self.day_periods = instance.day_periods
+        self.n_days = instance.n_days
+
+        n_days = max(self.n_days, 1)
+
+        # Contadores de ocupación
+        self.teacher_period = np.zeros((instance.n_teachers, instance.n_periods), dtype=np.int64)
+        self.room_period = np.zeros((instance.n_rooms, instance.n_periods), dtype=np.int64)
+        self.load = np.zeros((instance.n_teachers, n_days), dtype=np.int64)
+        self.holes_td = np.zeros((instance.n_teachers, n_days), dtype=np.int64)
+        self.load_sum = np.zeros(instance.n_teachers, dtype=np.int64)
+        self.load_sq = np.zeros(instance.n_teachers, dtype=np.int64)
+
+        # Totales acumulados
+        self.overlaps = 0
+        self.availability_violations = 0
+        self.holes = 0
+        self.early = 0
+        self.late = 0
+        self.special = 0
+        # Suma sobre docentes de D·Σx² - (Σx)², para calcular la varianza exacta
+        self.imbalance_num = 0
+
+        for b in np.flatnonzero(state.placed()).tolist():
+            self._add(int(state.course[b]), int(state.period[b]), int(state.room[b]))
+
+    @property
+    def hard_violations(self) -> int:
+        return self.overlaps + self.availability_violations
+
+    @property
+    def imbalance(self) -> float:
+        if self.n_days == 0:
+            return 0.0
+        return self.imbalance_num / (self.n_days * self.n_days)
+
+    @property
+    def cost(self) -> float:
+        """Costo actual; coincide con metrics.weighted_cost sobre el estado completo"""
+        return (
+            self.hard_violations * HARD_PENALTY +
+            self.holes * self.w_holes +
+            self.early * self.w_early +
+            self.late * self.w_late +
+            self.imbalance * self.w_imbalance +
+            self.special * self.w_special
+        )
+
+    def apply(self, changes: List[Change]) -> List[Change]:
+        """Aplicar cambios sobre el estado y devolver los cambios que los deshacen"""
+        state = self.state
+        undo = []
+        for b, period, room in changes:
+            undo.append((b, int(state.period[b]), int(state.room[b])))
+            self._move(b, period, room)
+        undo.reverse()
+        return undo
+
+    def revert(self, undo: List[Change]):
+        """Deshacer cambios aplicados con apply"""
+        for b, period, room in undo:
+            self._move(b, period, room)
+
+    def _move(self, b: int, period: int, room: int):
+        state = self.state
+        course = int(state.course[b])
+        old_period = int(state.period[b])
+        old_room = int(state.room[b])
+        if old_period >= 0 and old_room >= 0:
+            self._remove(course, old_period, old_room)
+        state.period[b] = period
+        state.room[b] = room
+        if period >= 0 and room >= 0:
+            self._add(course, period, room)
+
+    def _add(self, course: int, period: int, room: int):
+        t = int(self.course_teacher[course])
+        n = int(self.teacher_period[t, period])
+        self.overlaps += n
+        self.teacher_period[t, period] = n + 1
+        n = int(self.room_period[room, period])
+        self.overlaps += n
+        self.room_period[room, period] = n + 1
+        self._update_static(course, t, period, room, 1)
+
+    def _remove(self, course: int, period: int, room: int):
+        t = int(self.course_teacher[course])
+        n = int(self.teacher_period[t, period])
+        self.overlaps -= n - 1
+        self.teacher_period[t, period] = n - 1
+        n = int(self.room_period[room, period])
+        self.overlaps -= n - 1
+        self.room_period[room, period] = n - 1
+        self._update_static(course, t, period, room, -1)
+
+    def _update_static(self, course: int, t: int, period: int, room: int, sign: int):
+        """Actualizar disponibilidad, extremos, salas especiales, carga y huecos"""
+        if not self.course_allowed[course, period]:
+            self.availability_violations += sign
+        if self.period_first[period]:
+            self.early += sign
+        if self.period_last[period]:
+            self.late += sign
+        if self.room_special[room] and self.course_normal[course]:
+            self.special += sign
+
+        d = int(self.period_day[period])
+
+        # Varianza de la carga diaria del docente
+        x = int(self.load[t, d])
+        self.load[t, d] = x + sign
+        old_num = self.n_days * int(self.load_sq[t]) - int(self.load_sum[t]) ** 2
+        self.load_sq[t] += (x + sign) ** 2 - x * x
+        self.load_sum[t] += sign
+        new_num = self.n_days * int(self.load_sq[t]) - int(self.load_sum[t]) ** 2
+        self.imbalance_num += new_num - old_num
+
+        # Huecos del docente en el día afectado
+        old_holes = int(self.holes_td[t, d])
+        new_holes = self._day_holes(t, d)
+        self.holes_td[t, d] = new_holes
+        self.holes += new_holes - old_holes
+
+    def _day_holes(self, t: int, d: int) -> int:
+        periods = self.day_periods[d]
+        busy = self.teacher_period[t, periods] > 0
+        count = int(busy.sum())
+        if count < 2:
+            return 0
+        blocks = self.period_block[periods[busy]]
+        return int(blocks[-1] - blocks[0] + 1 - count)
@@ -0,0 +1,65 @@
+from typing import List, Optional, Tuple
+import multiprocessing
+import queue
+from ..domain.models import Assignment, ScheduleResponse
+
+
+class IncumbentExchange:
+    """
+    Canal entre el proceso principal de un portafolio y el proceso de la
+    metaheurística: el principal ofrece las soluciones que encuentra CP-SAT y
+    puede pedir que la búsqueda termine; la metaheurística informa el costo de
+    su mejor solución y, al terminar, su respuesta.
+    """
+
+    def __init__(self, context=None):
+        context = context or multiprocessing.get_context()
+        self._to_meta = context.Queue()
+        self._to_main = context.Queue()
+        self._stop = context.Event()
+
+    # Lado del proceso principal
+    def offer(self, assignments: List[Assignment]):
+        self._to_meta.put(assignments)
+
+    def stop(self):
+        self._stop.set()
+
+    def poll(self, timeout: float) -> Optional[Tuple[str, object]]:
+        """Siguiente mensaje de la metaheurística ("cost", "done" o "error"), o None"""
+        try:
+            return self._to_main.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        """
+        Liberar las colas del lado principal sin esperar a que se vacíen: lo
+        ofrecido después de que la metaheurística terminó nunca se lee y no debe
+        bloquear la salida del proceso.
+        """
+        for q in (self._to_meta, self._to_main):
+            q.close()
+            q.cancel_join_thread()
+
+    # Lado de la metaheurística
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def receive(self) -> Optional[List[Assignment]]:
+        """La última solución ofrecida desde la anterior llamada, o None"""
+        latest = None
+        while True:
+            try:
+                latest = self._to_meta.get_nowait()
+            except queue.Empty:
+                return latest
+
+    def publish(self, cost: float):
+        self._to_main.put(('cost', cost))
+
+    def finish(self, response: ScheduleResponse):
+        self._to_main.put(('done', response))
+
+    def fail(self, error: str):
+        self._to_main.put(('error', error))
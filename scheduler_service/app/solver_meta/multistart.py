@@ -0,0 +1,91 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+import math
+import numpy as np
+import logging
+from ..domain.models import ScheduleRequest, ScheduleResponse, Assignment
+from ..domain.instance import ProblemInstance
+from .simulated_annealing import SimulatedAnnealing
+from ..solver_cp.profiles import available_cpus
+
+logger = logging.getLogger(__name__)
+
+
+def derive_seeds(seed: int, count: int) -> List[int]:
+    """Derivar semillas independientes para cada trayectoria a partir de options.seed"""
+    children = np.random.SeedSequence(seed).spawn(count)
+    return [int(child.generate_state(1)[0]) for child in children]
+
+
+def _run_trajectory(request: ScheduleRequest, instance: ProblemInstance,
+                    initial_solution: Optional[List[Assignment]], seed: int) -> ScheduleResponse:
+    """Ejecutar una trayectoria de recocido (función de nivel de módulo para el pool)"""
+    return SimulatedAnnealing(request, instance, seed=seed).solve(initial_solution=initial_solution)
+
+
+class ParallelAnnealing:
+    """
+    Recocido simulado multi-arranque: ejecuta options.metaWorkers trayectorias
+    independientes de SimulatedAnnealing en un pool de procesos y devuelve la mejor.
+    Si hay menos núcleos que trayectorias, se ejecutan por tandas y el plazo se
+    reparte entre ellas.
+
+    Cada trayectoria usa una semilla derivada de options.seed con SeedSequence y
+    el empate se resuelve por número de trayectoria, por lo que el resultado es
+    determinista para una semilla y cantidad de trayectorias dadas siempre que
+    cada recocido lo sea. El esquema por defecto ("adaptive") enfría según el
+    reloj y no es reproducible; para serlo hace falta el esquema "fixed" o
+    definir metaMaxIterations.
+    """
+
+    def __init__(self, request: ScheduleRequest, instance: Optional[ProblemInstance] = None,
+                 workers: Optional[int] = None):
+        self.request = request
+        self.instance = instance or ProblemInstance(request)
+        self.workers = workers or request.options.metaWorkers
+
+    def solve(self, initial_solution: List[Assignment] = None) -> ScheduleResponse:
+        seeds = derive_seeds(self.request.options.seed, self.workers)
+        processes = min(self.workers, available_cpus())
+
+        # Con menos núcleos que trayectorias, el plazo se reparte entre las tandas
+        request = self.request
+        waves = math.ceil(self.workers / processes)
+        if waves > 1:
+            options = request.options
+            time_limit = (options.metaMaxTimeSec or options.maxTimeSec) / waves
+            request = request.model_copy(update={'options': options.model_copy(update={'metaMaxTimeSec': time_limit})})
+
+        if processes == 1:
+            responses = [_run_trajectory(request, self.instance, initial_solution, seed) for seed in seeds]
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                futures = [
+                    pool.submit(_run_trajectory, request, self.instance, initial_solution, seed)
+                    for seed in seeds
+                ]
+                responses = [f.result() for f in futures]
+
+        best_index = min(range(len(responses)), key=lambda i: (responses[i].metrics.objective, i))
+        best = responses[best_index]
+        logger.info(
+            f"Multi-arranque: mejor trayectoria {best_index + 1}/{len(responses)} "
+            f"con objetivo {best.metrics.objective:.2f}"
+        )
+        return self._merge_stats(best, responses)
+
+    def _merge_stats(self, best: ScheduleResponse, responses: List[ScheduleResponse]) -> ScheduleResponse:
+        """Sumar iteraciones y rendimiento de todas las trayectorias en la respuesta elegida"""
+        if len(responses) == 1:
+            return best
+        iterations = sum(r.metrics.iterations or 0 for r in responses)
+        accepted = sum((r.metrics.acceptanceRatio or 0) * (r.metrics.iterations or 0) for r in responses)
+        metrics = best.metrics.model_copy(update={
+            'iterations': iterations,
+            'iterationsPerSec': sum(r.metrics.iterationsPerSec or 0 for r in responses),
+            'acceptanceRatio': accepted / iterations if iterations else 0.0
+        })
+        return best.model_copy(update={
+            'metrics': metrics,
+            'explanation': f"Mejor de {len(responses)} trayectorias paralelas. {best.explanation}"
+        })
@@ -0,0 +1,153 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+import numpy as np
+import math
+import random
+import time
+import logging
+from ..domain.models import ScheduleRequest, ScheduleResponse, Assignment, SolutionStatus
+from ..domain.instance import ProblemInstance
+from .state import ScheduleState
+from .delta_evaluator import IncrementalEvaluator
+from .simulated_annealing import SimulatedAnnealing
+from ..solver_cp.profiles import available_cpus
+
+logger = logging.getLogger(__name__)
+
+SWEEP_MIN_ITERATIONS = 1000  # Iteraciones de cada réplica entre intercambios
+SWEEP_ITERATIONS_PER_BLOCK = 20
+STALL_ROUNDS = 25  # Rondas sin mejorar la mejor solución antes de terminar
+
+# Recocido de cada proceso del pool, creado una sola vez por el inicializador
+_worker_annealer: Optional[SimulatedAnnealing] = None
+
+
+def _init_worker(request: ScheduleRequest, instance: ProblemInstance):
+    global _worker_annealer
+    _worker_annealer = SimulatedAnnealing(request, instance)
+
+
+def _run_segment(state: ScheduleState, temperature: float, iterations: int,
+                 seed: int) -> Tuple[ScheduleState, float, Optional[ScheduleState], float, int]:
+    """Avanzar una réplica a temperatura constante (se ejecuta en el pool)"""
+    annealer = _worker_annealer
+    annealer.reseed(seed)
+    evaluator = IncrementalEvaluator(annealer.instance, state)
+    accepted, best_state, best_cost = annealer._sample_at_temperature(evaluator, temperature, iterations)
+    return state, evaluator.cost, best_state, best_cost, accepted
+
+
+class ParallelTempering:
+    """
+    Intercambio de réplicas (parallel tempering) para la metaheurística.
+
+    Ejecuta options.temperingReplicas cadenas de Metropolis en un pool de procesos,
+    cada una a una temperatura fija de una escalera geométrica calibrada con los
+    deltas del estado inicial. Tras cada ronda se proponen intercambios de estado
+    entre temperaturas vecinas, de modo que las buenas soluciones bajan a las
+    réplicas frías y las calientes siguen explorando.
+
+    Las semillas de cada ronda y réplica se derivan de options.seed, por lo que el
+    resultado es reproducible si se fija options.metaMaxIterations.
+    """
+
+    def __init__(self, request: ScheduleRequest, instance: Optional[ProblemInstance] = None,
+                 replicas: Optional[int] = None):
+        self.request = request
+        self.instance = instance or ProblemInstance(request)
+        self.replicas = replicas or request.options.temperingReplicas
+
+    def solve(self, initial_solution: List[Assignment] = None) -> ScheduleResponse:
+        options = self.request.options
+        start = time.perf_counter()
+        deadline = start + (options.metaMaxTimeSec or options.maxTimeSec)
+
+        # Estado inicial y escalera de temperaturas (índice 0 = réplica más fría)
+        annealer = SimulatedAnnealing(self.request, self.instance)
+        state = annealer._initial_state(initial_solution)
+        evaluator = IncrementalEvaluator(self.instance, state)
+        t_max, t_min = annealer._calibrate_temperature(evaluator)
+        temperatures = np.geomspace(t_min, t_max, self.replicas).tolist()
+
+        states = [state.copy() for _ in range(self.replicas)]
+        costs = [evaluator.cost] * self.replicas
+        best_state, best_cost = state.copy(), evaluator.cost
+
+        sweep = max(SWEEP_MIN_ITERATIONS, SWEEP_ITERATIONS_PER_BLOCK * len(state))
+        max_rounds = math.ceil(options.metaMaxIterations / sweep) if options.metaMaxIterations else None
+        exchange_rng = random.Random(options.seed)
+
+        movable = bool((~state.fixed).any())
+        rounds = 0
+        accepted = 0
+        swaps = 0
+        swap_attempts = 0
+        stall = 0
+        processes = min(self.replicas, available_cpus())
+        pool = None
+        if processes > 1:
+            pool = ProcessPoolExecutor(
+                max_workers=processes, initializer=_init_worker,
+                initargs=(self.request, self.instance)
+            )
+        else:
+            _init_worker(self.request, self.instance)
+
+        try:
+            while (
+                movable and best_cost > 0 and stall < STALL_ROUNDS
+                and time.perf_counter() < deadline
+                and (max_rounds is None or rounds < max_rounds)
+            ):
+                seeds = [
+                    int(np.random.SeedSequence(options.seed, spawn_key=(rounds, k)).generate_state(1)[0])
+                    for k in range(self.replicas)
+                ]
+                args = (states, temperatures, [sweep] * self.replicas, seeds)
+                results = list(pool.map(_run_segment, *args) if pool else map(_run_segment, *args))
+
+                stall += 1
+                for k, (replica_state, cost, replica_best, replica_best_cost, replica_accepted) in enumerate(results):
+                    states[k] = replica_state
+                    costs[k] = cost
+                    accepted += replica_accepted
+                    if replica_best is not None and replica_best_cost < best_cost:
+                        best_state, best_cost = replica_best, replica_best_cost
+                        stall = 0
+
+                # Intercambios entre temperaturas vecinas (pares alternados por ronda)
+                for k in range(rounds % 2, self.replicas - 1, 2):
+                    swap_attempts += 1
+                    x = (1 / temperatures[k] - 1 / temperatures[k + 1]) * (costs[k] - costs[k + 1])
+                    if x >= 0 or exchange_rng.random() < math.exp(x):
+                        states[k], states[k + 1] = states[k + 1], states[k]
+                        costs[k], costs[k + 1] = costs[k + 1], costs[k]
+                        swaps += 1
+                rounds += 1
+        finally:
+            if pool:
+                pool.shutdown()
+
+        elapsed = time.perf_counter() - start
+        iterations = rounds * sweep * self.replicas
+        metrics = annealer._calculate_metrics(best_state)
+        metrics.iterations = iterations
+        metrics.iterationsPerSec = iterations / elapsed if elapsed > 0 else 0.0
+        metrics.acceptanceRatio = accepted / iterations if iterations else 0.0
+
+        logger.info(
+            f"Parallel tempering: {rounds} rondas, {self.replicas} réplicas, "
+            f"intercambios aceptados {swaps}/{swap_attempts}"
+        )
+        explanation = (
+            f"Intercambio de réplicas con {self.replicas} temperaturas "
+            f"({swaps}/{swap_attempts} intercambios aceptados). "
+            + annealer._generate_explanation(metrics, iterations)
+        )
+
+        return ScheduleResponse(
+            status=SolutionStatus.METAHEURISTIC,
+            assignments=annealer._to_assignments(best_state),
+            metrics=metrics,
+            explanation=explanation
+        )
@@ -1,439 +1,522 @@
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional
 import numpy as np
 from ..domain.models import (
-    ScheduleRequest, 
+    ScheduleRequest,
     ScheduleResponse,
     Assignment,
     Metrics,
-    SolutionStatus
+    SolutionStatus,
+    AnnealingSchedule
 )
+from ..domain.instance import ProblemInstance
+from ..domain.metrics import compute_metrics, HARD_PENALTY
+from .state import ScheduleState
+from .delta_evaluator import IncrementalEvaluator, Change
+from .batch_moves import BatchMoveEvaluator
+from .construction import GreedyConstructor, ConstructionResult
+from .incumbent import IncumbentExchange
+import math
 import random
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Parámetros del esquema adaptativo
+CALIBRATION_SAMPLES = 200  # Movimientos muestreados para calibrar la temperatura
+INITIAL_ACCEPTANCE = 0.8  # Probabilidad inicial de aceptar un empeoramiento típico
+FINAL_ACCEPTANCE = 0.001  # Probabilidad final de aceptar el menor empeoramiento
+CLOCK_CHECK_INTERVAL = 64  # Iteraciones entre lecturas del reloj
+STALL_MIN_ITERATIONS = 2000  # Iteraciones mínimas sin mejora antes de recalentar
+STALL_ITERATIONS_PER_BLOCK = 100
+MAX_REHEATS = 5
+REHEAT_FACTOR = 0.5  # Cada recalentamiento parte de una fracción de T0
+
+# Lotes de movimientos (options.metaBatchSize > 1)
+DESCENT_TIME_FRACTION = 0.05  # Fracción del plazo reservada al descenso final
+DESCENT_PATIENCE = 3  # Lotes seguidos sin mejora que terminan el descenso
+BATCH_SPAN = 4  # El lote cubre unas BATCH_SPAN veces los movimientos esperados hasta aceptar
+BATCH_MIN_SIZE = 8  # Con lotes menores conviene evaluar movimiento a movimiento
+ACCEPTANCE_SMOOTHING = 0.2
+
 class SimulatedAnnealing:
-    def __init__(self, request: ScheduleRequest):
+    def __init__(self, request: ScheduleRequest, instance: Optional[ProblemInstance] = None,
+                 seed: Optional[int] = None):
         self.request = request
-        self.best_solution = None
+        self.instance = instance or ProblemInstance(request)
+        self.batch_size = request.options.metaBatchSize
+        self.batch: Optional[BatchMoveEvaluator] = None
+        self.reseed(request.options.seed if seed is None else seed)
+        self.construction: Optional[ConstructionResult] = None
+        self.best_solution: Optional[ScheduleState] = None
         self.best_cost = float('inf')
-        
+        # Canal con el portafolio CP-SAT, si el recocido corre dentro de uno
+        self.exchange: Optional[IncumbentExchange] = None
+
+    def reseed(self, seed: int):
+        """Reiniciar los generadores: cada instancia sigue una secuencia reproducible"""
+        self.rng = random.Random(seed)
+        self.acceptance_rate = 1.0  # Estimación móvil de la tasa de aceptación (lotes)
+        if self.batch_size > 1:
+            self.batch = BatchMoveEvaluator(self.instance, self.rng.getrandbits(63))
+
     def solve(self, initial_solution: List[Assignment] = None) -> ScheduleResponse:
         """
         Implementar recocido simulado para encontrar una solución factible
         cuando CP-SAT no encuentra solución o como método de reparación rápida
         """
+        solution = self._initial_state(initial_solution)
+        evaluator = IncrementalEvaluator(self.instance, solution)
+        self.best_solution = solution.copy()
+        self.best_cost = evaluator.cost
+
+        start = time.perf_counter()
+        if not (~solution.fixed).any():
+            # Nada que optimizar: todos los bloques son fijos
+            iterations, accepted = 0, 0
+        elif self.request.options.annealingSchedule == AnnealingSchedule.FIXED:
+            iterations, accepted = self._anneal_fixed(evaluator)
+        else:
+            deadline = start + self._time_limit()
+            if self.batch is None:
+                iterations, accepted = self._anneal_adaptive(evaluator, deadline)
+            else:
+                descent_time = self._time_limit() * DESCENT_TIME_FRACTION
+                iterations, accepted = self._anneal_adaptive(evaluator, deadline - descent_time)
+                examined, improved = self._descend(deadline)
+                iterations += examined
+                accepted += improved
+        elapsed = time.perf_counter() - start
+
+        metrics = self._calculate_metrics(self.best_solution)
+        metrics.iterations = iterations
+        metrics.iterationsPerSec = iterations / elapsed if elapsed > 0 else 0.0
+        metrics.acceptanceRatio = accepted / iterations if iterations else 0.0
+        explanation = self._generate_explanation(metrics, iterations)
+
+        return ScheduleResponse(
+            status=SolutionStatus.METAHEURISTIC,
+            assignments=self._to_assignments(self.best_solution),
+            metrics=metrics,
+            explanation=explanation
+        )
+
+    def _initial_state(self, initial_solution: Optional[List[Assignment]]) -> ScheduleState:
+        """Construir el estado de partida del recocido"""
         if initial_solution is None:
-            solution = self._generate_initial_solution()
+            solution = self._build_state([])
+            self._generate_initial_solution(solution)
         else:
             # Si tenemos una solución inicial, completarla respetando las asignaciones dadas
-            self.fixed_assignments = {
-                (a.courseId, a.period, a.roomId) for a in initial_solution
-            }
-            solution = self._complete_initial_solution(initial_solution)
-            
-        current_solution = solution
-        current_cost = self._evaluate_solution(current_solution)
-        
-        self.best_solution = current_solution.copy()
-        self.best_cost = current_cost
-        
+            solution = self._build_state(initial_solution)
+            self._complete_initial_solution(solution)
+        return solution
+
+    def _time_limit(self) -> float:
+        """Presupuesto de tiempo de la metaheurística (por defecto el del solver)"""
+        options = self.request.options
+        return options.metaMaxTimeSec or options.maxTimeSec
+
+    def _anneal_fixed(self, evaluator: IncrementalEvaluator) -> Tuple[int, int]:
+        """Esquema clásico: enfriamiento geométrico con un número fijo de iteraciones"""
+        state = evaluator.state
+        current_cost = evaluator.cost
+
         # Parámetros del recocido simulado
         T = 1.0  # Temperatura inicial
         T_min = 0.00001  # Temperatura mínima
         alpha = 0.9  # Factor de enfriamiento
         max_iterations = 1000
-        
+
         iteration = 0
+        accepted = 0
         while T > T_min and iteration < max_iterations:
-            # Generar vecino
-            neighbor = self._get_neighbor(current_solution)
-            neighbor_cost = self._evaluate_solution(neighbor)
-            
-            # No aceptar soluciones con violaciones duras
-            if math.isinf(neighbor_cost):
-                continue
-                
-            # Calcular delta    
-            delta = neighbor_cost - current_cost
-            
+            # Aplicar un movimiento sobre el estado actual (se deshace si se rechaza)
+            undo = evaluator.apply(self._propose_move(state))
+            delta = evaluator.cost - current_cost
+
             # Criterio de aceptación
-            if delta < 0 or random.random() < np.exp(-delta / T):
-                current_solution = neighbor
-                current_cost = neighbor_cost
-                
+            if self._accept(delta, T):
+                current_cost += delta
+                accepted += 1
+
                 # Actualizar mejor solución
                 if current_cost < self.best_cost:
-                    self.best_solution = current_solution.copy()
+                    self.best_solution = state.copy()
                     self.best_cost = current_cost
-            
+            else:
+                evaluator.revert(undo)
+
             # Enfriar
             T *= alpha
             iteration += 1
-        
-        metrics = self._calculate_metrics(self.best_solution)
-        explanation = self._generate_explanation(metrics, iteration)
-        
-        return ScheduleResponse(
-            status=SolutionStatus.METAHEURISTIC,
-            assignments=self.best_solution,
-            metrics=metrics,
-            explanation=explanation
-        )
-    
-    def _generate_initial_solution(self) -> List[Assignment]:
-        """Generar una solución inicial factible intentando respetar restricciones"""
-        solution = []
-        max_attempts = 1000
-        attempts = 0
-        
-        # Ordenar cursos por número de bloques (más restrictivos primero)
-        sorted_courses = sorted(
-            self.request.courses, 
-            key=lambda c: c.blocksPerWeek, 
-            reverse=True
-        )
-        
-        while attempts < max_attempts:
-            solution = []
-            success = True
-            
-            for course in sorted_courses:
-                compatible_rooms = [r for r in self.request.rooms 
-                                  if r.type == course.roomType]
-                
-                # Obtener periodos disponibles según disponibilidad del docente
-                available_periods = [
-                    p for p in self.request.periods
-                    if not any(a for a in self.request.availability
-                             if a.teacherId == course.teacherId 
-                             and a.period == p 
-                             and not a.allowed)
-                ]
-                
-                blocks_assigned = 0
-                course_attempts = 0
-                max_course_attempts = len(self.request.periods)
-                
-                while blocks_assigned < course.blocksPerWeek:
-                    if not available_periods or course_attempts >= max_course_attempts:
-                        success = False
+
+        return iteration, accepted
+
+    def _anneal_adaptive(self, evaluator: IncrementalEvaluator, deadline: float) -> Tuple[int, int]:
+        """
+        Esquema guiado por el reloj: la temperatura inicial se calibra con deltas
+        muestreados y decae geométricamente según la fracción del tiempo restante.
+        Ante estancamiento se recalienta desde la mejor solución; si se agotan los
+        recalentamientos y vuelve a estancarse, termina antes del plazo.
+
+        Si se define options.metaMaxIterations, el enfriamiento avanza por
+        iteraciones en vez de por tiempo y el resultado es reproducible para una
+        semilla dada (el plazo sigue actuando como corte de seguridad).
+        """
+        max_iterations = self.request.options.metaMaxIterations
+        state = evaluator.state
+        current_cost = evaluator.cost
+        t_start, t_end = self._calibrate_temperature(evaluator)
+        stall_limit = max(STALL_MIN_ITERATIONS, STALL_ITERATIONS_PER_BLOCK * len(state))
+
+        segment_start = time.perf_counter()
+        segment_iteration = 0
+        segment_t = t_start
+        T = t_start
+        iteration = 0
+        next_check = 0
+        accepted = 0
+        last_improvement = 0
+        reheats = 0
+        published = float('inf')
+
+        while self.best_cost > 0:
+            if iteration >= next_check:
+                next_check = iteration + CLOCK_CHECK_INTERVAL
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                if self.exchange is not None:
+                    if self.exchange.stopped():
                         break
-                    
-                    period = random.choice(available_periods)
-                    room = random.choice(compatible_rooms)
-                    
-                    if self._is_assignment_valid(course.id, period, room.id, solution):
-                        solution.append(Assignment(
-                            courseId=course.id,
-                            period=period,
-                            roomId=room.id
-                        ))
-                        blocks_assigned += 1
-                        available_periods.remove(period)
-                    else:
-                        course_attempts += 1
-                
-                if not success:
+                    if self.best_cost < published:
+                        published = self.best_cost
+                        self.exchange.publish(published)
+                    incoming = self._receive_incumbent()
+                    if incoming is not None:
+                        # Continuar desde la solución de CP-SAT, mejor que la propia
+                        state = incoming
+                        evaluator = IncrementalEvaluator(self.instance, state)
+                        current_cost = evaluator.cost
+                        last_improvement = iteration
+                if max_iterations:
+                    fraction = (iteration - segment_iteration) / max(max_iterations - segment_iteration, 1)
+                else:
+                    fraction = (now - segment_start) / max(deadline - segment_start, 1e-9)
+                T = segment_t * (t_end / segment_t) ** fraction
+            if max_iterations and iteration >= max_iterations:
+                break
+
+            examined, moved = self._metropolis_step(evaluator, T)
+            iteration += examined
+            if moved:
+                current_cost = evaluator.cost
+                accepted += 1
+                if current_cost < self.best_cost:
+                    self.best_solution = state.copy()
+                    self.best_cost = current_cost
+                    last_improvement = iteration
+
+            # Recalentar desde la mejor solución si no hay mejoras
+            if iteration - last_improvement > stall_limit:
+                if reheats >= MAX_REHEATS:
                     break
-            
-            if success:
-                return solution
-            
-            attempts += 1
-        
-        logger.warning("No se pudo generar una solución inicial sin violaciones")
-        return solution
-    
-    def _complete_initial_solution(self, initial_solution: List[Assignment]) -> List[Assignment]:
-        """Completar una solución inicial respetando las asignaciones fijas"""
-        solution = initial_solution.copy()
-        
-        # Calcular bloques ya asignados por curso
-        assigned_blocks = {}
-        for assignment in solution:
-            assigned_blocks[assignment.courseId] = assigned_blocks.get(assignment.courseId, 0) + 1
-        
-        # Completar bloques faltantes
-        for course in self.request.courses:
-            blocks_needed = course.blocksPerWeek - assigned_blocks.get(course.id, 0)
-            if blocks_needed <= 0:
+                reheats += 1
+                state = self.best_solution.copy()
+                evaluator = IncrementalEvaluator(self.instance, state)
+                current_cost = evaluator.cost
+                segment_start = time.perf_counter()
+                segment_iteration = iteration
+                segment_t = max(t_start * REHEAT_FACTOR ** reheats, t_end)
+                T = segment_t
+                last_improvement = iteration
+
+        logger.info(
+            f"Recocido: {iteration} iteraciones, T0={t_start:.4g}, "
+            f"{reheats} recalentamientos, aceptación {accepted / max(iteration, 1):.2%}"
+        )
+        return iteration, accepted
+
+    def _calibrate_temperature(self, evaluator: IncrementalEvaluator) -> Tuple[float, float]:
+        """Estimar temperaturas inicial y final a partir de deltas de movimientos aleatorios"""
+        base = evaluator.cost
+        deltas = []
+        for _ in range(CALIBRATION_SAMPLES):
+            undo = evaluator.apply(self._propose_move(evaluator.state))
+            delta = evaluator.cost - base
+            evaluator.revert(undo)
+            # Los movimientos que rompen restricciones duras no representan la escala blanda
+            if 0 < delta < HARD_PENALTY:
+                deltas.append(delta)
+
+        if not deltas:
+            return 1.0, 0.001
+        t_start = -float(np.mean(deltas)) / math.log(INITIAL_ACCEPTANCE)
+        t_end = -float(min(deltas)) / math.log(FINAL_ACCEPTANCE)
+        return t_start, min(t_end, t_start)
+
+    def _sample_at_temperature(self, evaluator: IncrementalEvaluator, T: float,
+                               iterations: int) -> Tuple[int, Optional[ScheduleState], float]:
+        """
+        Ejecutar Metropolis a temperatura constante sobre el estado del evaluador.
+        Devuelve los movimientos aceptados y la mejor solución vista (None si no
+        mejoró el costo inicial) con su costo.
+        """
+        best_state, best_cost = None, evaluator.cost
+        accepted = 0
+        done = 0
+        while done < iterations:
+            examined, moved = self._metropolis_step(evaluator, T)
+            done += examined
+            if moved:
+                accepted += 1
+                if evaluator.cost < best_cost:
+                    best_state, best_cost = evaluator.state.copy(), evaluator.cost
+        return accepted, best_state, best_cost
+
+    def _metropolis_step(self, evaluator: IncrementalEvaluator, T: float) -> Tuple[int, bool]:
+        """
+        Un paso de Metropolis sobre el estado del evaluador: un movimiento, o un
+        lote de options.metaBatchSize movimientos evaluados con NumPy del que se
+        aplica el primero aceptado. Devuelve los movimientos examinados y si se
+        aplicó alguno.
+        """
+        if self.batch is not None:
+            # A alta temperatura casi todo se acepta y un lote grande se desperdicia
+            size = min(self.batch_size, int(BATCH_SPAN / max(self.acceptance_rate, 1e-6)))
+            if size >= BATCH_MIN_SIZE:
+                moves = self.batch.propose(evaluator, size)
+                k, examined = self.batch.metropolis(self.batch.score(evaluator, moves), T)
+                if k is not None:
+                    evaluator.apply(self.batch.changes(moves, k))
+                self._update_acceptance(k is not None, examined)
+                return examined, k is not None
+
+        current_cost = evaluator.cost
+        undo = evaluator.apply(self._propose_move(evaluator.state))
+        moved = self._accept(evaluator.cost - current_cost, T)
+        if not moved:
+            evaluator.revert(undo)
+        if self.batch is not None:
+            self._update_acceptance(moved, 1)
+        return 1, moved
+
+    def _update_acceptance(self, moved: bool, examined: int):
+        self.acceptance_rate += ACCEPTANCE_SMOOTHING * (moved / examined - self.acceptance_rate)
+
+    def _descend(self, deadline: float) -> Tuple[int, int]:
+        """
+        Descenso de mayor mejora desde la mejor solución: en cada lote se aplica
+        el movimiento que más reduce el costo, hasta DESCENT_PATIENCE lotes
+        seguidos sin mejora. Devuelve los movimientos examinados y aplicados.
+        """
+        evaluator = IncrementalEvaluator(self.instance, self.best_solution.copy())
+        examined = 0
+        improved = 0
+        failures = 0
+        while (
+            failures < DESCENT_PATIENCE and evaluator.cost > 0 and time.perf_counter() < deadline
+            and not (self.exchange is not None and self.exchange.stopped())
+        ):
+            moves = self.batch.propose(evaluator, self.batch_size)
+            k = self.batch.best_improvement(self.batch.score(evaluator, moves))
+            examined += self.batch_size
+            if k is None:
+                failures += 1
                 continue
-                
-            compatible_rooms = [r for r in self.request.rooms if r.type == course.roomType]
-            available_periods = set(self.request.periods)
-            
-            # Excluir periodos ya usados por este docente
-            used_periods = {
-                a.period for a in solution 
-                if next(c for c in self.request.courses 
-                       if c.id == a.courseId).teacherId == course.teacherId
-            }
-            available_periods -= used_periods
-            
-            # Intentar asignar los bloques faltantes
-            attempts = 0
-            max_attempts = len(self.request.periods) * 2
-            while blocks_needed > 0 and attempts < max_attempts and available_periods:
-                period = random.choice(list(available_periods))
-                room = random.choice(compatible_rooms)
-                
-                if self._is_assignment_valid(course.id, period, room.id, solution):
-                    solution.append(Assignment(
-                        courseId=course.id,
-                        period=period,
-                        roomId=room.id
-                    ))
-                    blocks_needed -= 1
-                    available_periods.remove(period)
-                
-                attempts += 1
-        
-        return solution
-        
-    def _get_neighbor(self, solution: List[Assignment]) -> List[Assignment]:
+            evaluator.apply(self.batch.changes(moves, k))
+            improved += 1
+            failures = 0
+
+        if evaluator.cost < self.best_cost:
+            self.best_solution = evaluator.state
+            self.best_cost = evaluator.cost
+        return examined, improved
+
+    def _receive_incumbent(self) -> Optional[ScheduleState]:
+        """
+        Tomar la última solución ofrecida por el portafolio si mejora la mejor
+        propia; queda también como mejor solución. None si no hay o no mejora.
+        """
+        assignments = self.exchange.receive()
+        if assignments is None:
+            return None
+        state = ScheduleState.from_solution(self.instance, assignments)
+        cost = IncrementalEvaluator(self.instance, state).cost
+        if cost >= self.best_cost:
+            return None
+        self.best_solution = state.copy()
+        self.best_cost = cost
+        return state
+
+    def _accept(self, delta: float, T: float) -> bool:
+        """Criterio de Metropolis"""
+        return delta <= 0 or self.rng.random() < math.exp(-delta / T)
+
+    def _build_state(self, initial_solution: List[Assignment]) -> ScheduleState:
+        """
+        Crear el estado con un bloque por cada hora semanal de cada curso.
+        Las asignaciones fijas de la solicitud, las asignaciones iniciales y los
+        bloqueos "must-place" ocupan los primeros bloques de su curso y quedan fijos.
+        """
+        inst = self.instance
+        given: Dict[int, List[Tuple[int, int]]] = {}
+        seen = set()
+        initial = [
+            (inst.course_index[a.courseId], inst.period_index[a.period], inst.room_index[a.roomId])
+            for a in initial_solution
+            if a.courseId in inst.course_index and a.period in inst.period_index
+            and a.roomId in inst.room_index
+        ]
+        if len(initial) < len(initial_solution):
+            logger.warning("Se ignoraron asignaciones iniciales con identificadores desconocidos")
+        for c, p, r in inst.fixed + initial:
+            if (c, p, r) not in seen:
+                seen.add((c, p, r))
+                given.setdefault(c, []).append((p, r))
+
+        # Bloqueos "must-place" sin asignación dada: sala compatible libre en ese periodo
+        used_rooms = {(p, r) for c, p, r in seen}
+        for c, p in inst.must_place:
+            if any(gp == p for gp, _ in given.get(c, [])):
+                continue
+            rooms = [r for r in inst.course_rooms[c].tolist() if (p, r) not in used_rooms]
+            if rooms:
+                r = self.rng.choice(rooms)
+                used_rooms.add((p, r))
+                given.setdefault(c, []).append((p, r))
+
+        block_courses = []
+        for c in range(inst.n_courses):
+            n_blocks = max(int(inst.course_blocks[c]), len(given.get(c, [])))
+            block_courses.extend([c] * n_blocks)
+
+        state = ScheduleState.empty(block_courses)
+        next_block = 0
+        for c in range(inst.n_courses):
+            fixed = given.get(c, [])
+            for k, (p, r) in enumerate(fixed):
+                state.period[next_block + k] = p
+                state.room[next_block + k] = r
+                state.fixed[next_block + k] = True
+            next_block += max(int(inst.course_blocks[c]), len(fixed))
+        return state
+
+    def _to_assignments(self, state: ScheduleState) -> List[Assignment]:
+        return state.to_assignments(
+            self.instance.course_ids,
+            self.instance.periods,
+            self.instance.room_ids
+        )
+
+    def _generate_initial_solution(self, state: ScheduleState):
+        """Generar una solución inicial factible con el constructor voraz"""
+        self._construct(state)
+
+    def _complete_initial_solution(self, state: ScheduleState):
+        """Completar una solución inicial respetando las asignaciones fijas"""
+        self._construct(state)
+
+    def _construct(self, state: ScheduleState):
+        """Ubicar los bloques pendientes; si no se logra sin violaciones, forzarlos"""
+        self.construction = GreedyConstructor(self.instance, self.rng).build(state)
+        if not self.construction.feasible:
+            logger.warning(
+                "No se pudo construir una solución inicial sin violaciones: "
+                + "; ".join(self.construction.messages)
+            )
+            self._force_place(state)
+
+    def _force_place(self, state: ScheduleState):
+        """Ubicar los bloques pendientes aunque generen violaciones, para que el recocido las repare"""
+        inst = self.instance
+        for b in np.flatnonzero(state.period < 0):
+            ci = state.course[b]
+            periods = np.flatnonzero(inst.course_allowed[ci])
+            if len(periods) == 0:
+                periods = np.arange(inst.n_periods)
+            state.period[b] = int(self.rng.choice(periods))
+            rooms = inst.course_rooms[ci]
+            state.room[b] = int(self.rng.choice(rooms)) if len(rooms) else self.rng.randrange(inst.n_rooms)
+
+    def _propose_move(self, state: ScheduleState) -> List[Change]:
         """
-        Generar un vecino aplicando uno de varios movimientos posibles:
+        Proponer uno de varios movimientos posibles como lista de cambios
+        (bloque, nuevo periodo, nueva sala), sin modificar el estado:
         1. Intercambiar dos periodos
         2. Mover un bloque a otro periodo
         3. Cambiar de sala
         """
-        neighbor = solution.copy()
-        move_type = random.choice(['swap', 'move', 'change_room'])
-        
-        # Filtrar asignaciones que no son fijas
-        modifiable_indices = [
-            i for i, a in enumerate(neighbor)
-            if not hasattr(self, 'fixed_assignments') or
-               (a.courseId, a.period, a.roomId) not in self.fixed_assignments
-        ]
-        
-        if not modifiable_indices:
-            return neighbor
-            
+        move_type = self.rng.choice(['swap', 'move', 'change_room'])
+
+        # Solo se modifican bloques que no son fijos
+        modifiable_indices = np.flatnonzero(~state.fixed)
+
+        if len(modifiable_indices) == 0:
+            return []
+
         if move_type == 'swap':
             if len(modifiable_indices) >= 2:
-                i, j = random.sample(modifiable_indices, 2)
-                neighbor[i].period, neighbor[j].period = neighbor[j].period, neighbor[i].period
-                
-        elif move_type == 'move':
-            i = random.choice(modifiable_indices)
-            old_period = neighbor[i].period
-            available_periods = [p for p in self.request.periods if p != old_period]
+                i, j = (int(b) for b in self.rng.sample(list(modifiable_indices), 2))
+                return [(i, int(state.period[j]), int(state.room[i])),
+                        (j, int(state.period[i]), int(state.room[j]))]
+            return []
+
+        i = int(self.rng.choice(modifiable_indices))
+        if move_type == 'move':
+            old_period = state.period[i]
+            available_periods = [p for p in range(self.instance.n_periods) if p != old_period]
             if available_periods:
-                neighbor[i].period = random.choice(available_periods)
-                
+                return [(i, self.rng.choice(available_periods), int(state.room[i]))]
+
         else:  # change_room
-            i = random.choice(modifiable_indices)
-            course = next(c for c in self.request.courses 
-                        if c.id == neighbor[i].courseId)
-            compatible_rooms = [r for r in self.request.rooms 
-                              if r.type == course.roomType]
-            if compatible_rooms:
-                neighbor[i].roomId = random.choice(compatible_rooms).id
-        
-        return neighbor
-    
-    def _evaluate_solution(self, solution: List[Assignment]) -> float:
+            compatible_rooms = self.instance.course_rooms[state.course[i]]
+            if len(compatible_rooms):
+                return [(i, int(state.period[i]), int(self.rng.choice(compatible_rooms)))]
+
+        return []
+
+    def _evaluate_solution(self, solution: ScheduleState) -> float:
         """
-        Evaluar la calidad de una solución considerando:
+        Evaluar desde cero la calidad de una solución considerando:
         1. Violaciones duras (topes, disponibilidad)
         2. Penalizaciones blandas (huecos, extremos, etc.)
+        El recocido usa IncrementalEvaluator; esta versión sirve de referencia.
         """
-        cost = 0
-        
-        # Penalización muy alta para violaciones duras
-        hard_penalty = float('inf')
-        
-        # Verificar topes
-        overlaps = self._count_overlaps(solution)
-        if overlaps > 0:
-            return hard_penalty
-        
-        # Verificar disponibilidad
-        availability_violations = self._count_availability_violations(solution)
-        if availability_violations > 0:
-            return hard_penalty
-        
-        # Calcular penalizaciones blandas
-        holes = self._count_holes(solution)
-        cost += holes * self.request.weights.holes
-        
-        late_early = self._count_late_early(solution)
-        cost += late_early * (self.request.weights.late + self.request.weights.early)
-        
-        imbalance = self._calculate_imbalance(solution)
-        cost += imbalance * self.request.weights.imbalance
-        
-        special_room = self._count_special_room_usage(solution)
-        cost += special_room * self.request.weights.specialRoom
-        
-        return cost
-    
-    def _is_assignment_valid(self, course_id: str, period: str, 
-                           room_id: str, solution: List[Assignment]) -> bool:
-        """Verificar si una asignación es válida"""
-        # Verificar disponibilidad del docente
-        course = next(c for c in self.request.courses if c.id == course_id)
-        teacher_id = course.teacherId
-        
-        if any(a for a in self.request.availability 
-               if a.teacherId == teacher_id and a.period == period 
-               and not a.allowed):
-            return False
-        
-        # Verificar topes de docente
-        if any(s for s in solution 
-               if s.period == period 
-               and next(c for c in self.request.courses if c.id == s.courseId).teacherId == teacher_id):
-            return False
-        
-        # Verificar topes de sala
-        if any(s for s in solution 
-               if s.period == period and s.roomId == room_id):
-            return False
-        
-        return True
-    
-    def _count_overlaps(self, solution: List[Assignment]) -> int:
-        """Contar número de topes (docente y sala)"""
-        overlaps = 0
-        for i, a1 in enumerate(solution):
-            for a2 in solution[i+1:]:
-                if a1.period == a2.period:
-                    # Verificar tope de docente
-                    course1 = next(c for c in self.request.courses if c.id == a1.courseId)
-                    course2 = next(c for c in self.request.courses if c.id == a2.courseId)
-                    if course1.teacherId == course2.teacherId:
-                        overlaps += 1
-                    
-                    # Verificar tope de sala
-                    if a1.roomId == a2.roomId:
-                        overlaps += 1
-        return overlaps
-    
-    def _count_availability_violations(self, solution: List[Assignment]) -> int:
-        """Contar violaciones de disponibilidad"""
-        violations = 0
-        for assignment in solution:
-            course = next(c for c in self.request.courses if c.id == assignment.courseId)
-            teacher_id = course.teacherId
-            
-            if any(a for a in self.request.availability 
-                   if a.teacherId == teacher_id 
-                   and a.period == assignment.period 
-                   and not a.allowed):
-                violations += 1
-        return violations
-    
-    def _count_holes(self, solution: List[Assignment]) -> int:
-        """Contar huecos en los horarios de los docentes"""
-        holes = 0
-        for teacher in self.request.teachers:
-            # Obtener bloques por día
-            teacher_assignments = [a for a in solution 
-                                 if next(c for c in self.request.courses 
-                                       if c.id == a.courseId).teacherId == teacher.id]
-            
-            for day in set(p.split('-')[0] for p in self.request.periods):
-                day_blocks = sorted(
-                    int(a.period.split('-')[1]) 
-                    for a in teacher_assignments 
-                    if a.period.startswith(day)
-                )
-                
-                if len(day_blocks) >= 2:
-                    # Contar huecos entre el primer y último bloque
-                    for i in range(len(day_blocks) - 1):
-                        holes += day_blocks[i+1] - day_blocks[i] - 1
-        
-        return holes
-    
-    def _count_late_early(self, solution: List[Assignment]) -> int:
-        """Contar bloques en primera y última hora"""
-        count = 0
-        for assignment in solution:
-            block = int(assignment.period.split('-')[1])
-            if block == 1 or block == len(set(
-                int(p.split('-')[1]) for p in self.request.periods 
-                if p.split('-')[0] == assignment.period.split('-')[0]
-            )):
-                count += 1
-        return count
-    
-    def _calculate_imbalance(self, solution: List[Assignment]) -> float:
-        """Calcular desbalance en la carga diaria"""
-        teacher_loads = {}
-        for teacher in self.request.teachers:
-            loads = []
-            for day in set(p.split('-')[0] for p in self.request.periods):
-                load = len([a for a in solution 
-                           if a.period.startswith(day) 
-                           and next(c for c in self.request.courses 
-                                  if c.id == a.courseId).teacherId == teacher.id])
-                loads.append(load)
-            if loads:
-                teacher_loads[teacher.id] = np.var(loads)
-        
-        return sum(teacher_loads.values())
-    
-    def _count_special_room_usage(self, solution: List[Assignment]) -> int:
-        """Contar uso innecesario de salas especiales"""
-        count = 0
-        for assignment in solution:
-            room = next(r for r in self.request.rooms if r.id == assignment.roomId)
-            course = next(c for c in self.request.courses if c.id == assignment.courseId)
-            
-            if room.type != "normal" and course.roomType == "normal":
-                count += 1
-        return count
-    
-    def _calculate_metrics(self, solution: List[Assignment]) -> Metrics:
+        return self._calculate_metrics(solution).objective
+
+    def _calculate_metrics(self, solution: ScheduleState) -> Metrics:
         """Calcular métricas de la solución"""
-        holes = self._count_holes(solution)
-        late_early = self._count_late_early(solution)
-        imbalance = self._calculate_imbalance(solution)
-        special_room = self._count_special_room_usage(solution)
-        
-        hard_violations = (
-            self._count_overlaps(solution) + 
-            self._count_availability_violations(solution)
-        )
-        
-        objective = (
-            self.request.weights.holes * holes +
-            (self.request.weights.late + self.request.weights.early) * late_early +
-            self.request.weights.imbalance * imbalance +
-            self.request.weights.specialRoom * special_room
-        )
-        
-        if hard_violations > 0:
-            objective += hard_violations * 1000000
-        
-        return Metrics(
-            objective=objective,
-            holes=holes,
-            late=late_early // 2,
-            early=late_early // 2,
-            imbalance=imbalance,
-            hardViolations=hard_violations
+        placed = solution.placed()
+        return compute_metrics(
+            self.instance,
+            solution.course[placed],
+            solution.period[placed],
+            solution.room[placed]
         )
-    
+
     def _generate_explanation(self, metrics: Metrics, iterations: int) -> str:
         """Generar explicación de la solución"""
         parts = []
-        
+
         if metrics.hardViolations > 0:
             parts.append(
                 f"ADVERTENCIA: La solución tiene {metrics.hardViolations} "
                 "violaciones de restricciones duras."
             )
-        
+        if self.construction is not None and not self.construction.feasible:
+            parts.append(
+                "No existe una construcción inicial factible: "
+                + "; ".join(self.construction.messages) + "."
+            )
+
+        rate = f" ({metrics.iterationsPerSec:.0f} it/s)" if metrics.iterationsPerSec else ""
         parts.append(
-            f"Solución encontrada después de {iterations} iteraciones "
+            f"Solución encontrada después de {iterations} iteraciones{rate} "
             f"con {metrics.holes} huecos, "
             f"{metrics.late + metrics.early} bloques en horarios extremos "
             f"y un índice de desbalance de {metrics.imbalance:.2f}."
         )
-        
+
         return " ".join(parts)
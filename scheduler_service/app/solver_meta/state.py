@@ -0,0 +1,80 @@
+from typing import List, Sequence
+import numpy as np
+from ..domain.models import Assignment
+from ..domain.instance import ProblemInstance
+from ..domain.metrics import assignments_to_arrays
+
+
+class ScheduleState:
+    """
+    Representación compacta de un horario para la metaheurística.
+
+    Cada bloque semanal de un curso ocupa una posición en arreglos NumPy:
+    ``course[b]`` es el índice del curso, ``period[b]`` el índice del periodo
+    y ``room[b]`` el índice de la sala asignada. ``fixed[b]`` marca los bloques
+    que el recocido no puede mover. Los índices se refieren al orden de las
+    listas del ``ScheduleRequest``.
+    """
+
+    __slots__ = ('course', 'period', 'room', 'fixed')
+
+    def __init__(self, course: np.ndarray, period: np.ndarray,
+                 room: np.ndarray, fixed: np.ndarray):
+        self.course = course
+        self.period = period
+        self.room = room
+        self.fixed = fixed
+
+    @classmethod
+    def empty(cls, block_courses: Sequence[int]) -> 'ScheduleState':
+        """Crear un estado con los bloques indicados y sin periodo ni sala (-1)"""
+        n = len(block_courses)
+        return cls(
+            course=np.asarray(block_courses, dtype=np.int64),
+            period=np.full(n, -1, dtype=np.int64),
+            room=np.full(n, -1, dtype=np.int64),
+            fixed=np.zeros(n, dtype=bool)
+        )
+
+    @classmethod
+    def from_solution(cls, instance: ProblemInstance, assignments: List[Assignment]) -> 'ScheduleState':
+        """
+        Crear un estado a partir de un horario completo (por ejemplo de CP-SAT).
+        Solo quedan fijas las asignaciones fijas y los bloqueos "must-place".
+        """
+        course, period, room = assignments_to_arrays(instance, assignments)
+        state = cls(course, period, room, np.zeros(len(course), dtype=bool))
+        fixed_cells = {(c, p, r) for c, p, r in instance.fixed}
+        must_place = set(instance.must_place)
+        for b, (c, p, r) in enumerate(zip(course.tolist(), period.tolist(), room.tolist())):
+            if (c, p, r) in fixed_cells or (c, p) in must_place:
+                state.fixed[b] = True
+        return state
+
+    def __len__(self) -> int:
+        return len(self.course)
+
+    def copy(self) -> 'ScheduleState':
+        return ScheduleState(
+            self.course.copy(),
+            self.period.copy(),
+            self.room.copy(),
+            self.fixed.copy()
+        )
+
+    def placed(self) -> np.ndarray:
+        """Máscara de bloques con periodo y sala asignados"""
+        return (self.period >= 0) & (self.room >= 0)
+
+    def to_assignments(self, course_ids: Sequence[str], periods: Sequence[str],
+                       room_ids: Sequence[str]) -> List[Assignment]:
+        """Convertir el estado en asignaciones del dominio (solo bloques ubicados)"""
+        return [
+            Assignment(
+                courseId=course_ids[c],
+                period=periods[p],
+                roomId=room_ids[r]
+            )
+            for c, p, r in zip(self.course.tolist(), self.period.tolist(), self.room.tolist())
+            if p >= 0 and r >= 0
+        ]
@@ -64,3 +64,270 @@ def test_interpret_endpoint():
         
         # Al menos uno de weightsDelta o newLocks debe estar presente
         assert "weightsDelta" in data or "newLocks" in data
+
+def test_solve_reuses_model_for_weight_changes(small_schedule_request):
+    """Un cambio solo de pesos reutiliza el modelo construido"""
+    from app.main import solve_pool, result_cache
+    from app.service import clear_model_cache
+    from app.solver_cp.model_cache import structural_key
+
+    # La caché de modelos vive en los procesos del pool; la de resultados, en la API
+    solve_pool.broadcast(clear_model_cache)
+    result_cache.clear()
+    first = client.post("/solve", json=small_schedule_request.dict()).json()
+    assert first["metrics"]["modelCacheHit"] is False
+
+    # Mismo problema con otros pesos y las listas en otro orden
+    changed = small_schedule_request.model_copy(deep=True)
+    changed.weights.holes = 5.0
+    changed.courses.reverse()
+    assert structural_key(changed) == structural_key(small_schedule_request)
+
+    second = client.post("/solve", json=changed.dict()).json()
+    assert second["metrics"]["modelCacheHit"] is True
+    assert second["metrics"]["hintFeasible"] is True
+    assert second["status"] in ["OPTIMAL", "FEASIBLE"]
+    assert len(second["assignments"]) == len(first["assignments"])
+
+    # Un cambio estructural o en el orden de los periodos construye un modelo nuevo
+    reordered = changed.model_copy(deep=True)
+    reordered.periods.reverse()
+    assert structural_key(reordered) != structural_key(small_schedule_request)
+    changed.courses[0].blocksPerWeek += 1
+    assert structural_key(changed) != structural_key(small_schedule_request)
+
+def test_solve_stream_endpoint(small_schedule_request):
+    """El streaming envía soluciones mejoradas y termina con la respuesta de /solve"""
+    import json
+
+    response = client.post("/solve/stream", json=small_schedule_request.dict())
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    messages = [json.loads(line) for line in response.text.splitlines() if line]
+    updates, final = messages[:-1], messages[-1]
+    assert updates
+    for update in updates:
+        assert update["objective"] >= update["bound"] - 1e-6
+        assert update["gap"] >= 0
+        assert update["assignments"]
+    objectives = [update["objective"] for update in updates]
+    assert objectives == sorted(objectives, reverse=True)
+    assert final["status"] in ["OPTIMAL", "FEASIBLE"]
+    assert final["metrics"]["objective"] == pytest.approx(objectives[-1])
+
+    # Con Accept: text/event-stream se responde con server-sent events
+    sse = client.post(
+        "/solve/stream", json=small_schedule_request.dict(), headers={"Accept": "text/event-stream"}
+    )
+    events = [line for line in sse.text.splitlines() if line.startswith("event:")]
+    assert events[-1] == "event: result"
+    assert "event: solution" in events
+
+    # La búsqueda corre en el pool: /solve con otros pesos reutiliza el modelo del streaming
+    from app.main import solve_pool
+    from app.service import clear_model_cache
+
+    solve_pool.broadcast(clear_model_cache)
+    client.post("/solve/stream", json=small_schedule_request.dict())
+    small_schedule_request.weights.holes += 1
+    solved = client.post("/solve", json=small_schedule_request.dict()).json()
+    assert solved["metrics"]["modelCacheHit"] is True
+
+def test_stream_request_stops_on_request(medium_schedule_request):
+    """Al activar el evento de detención el proceso del pool corta la búsqueda"""
+    import time
+    from app.main import solve_pool
+    from app.service import stream_request
+
+    medium_schedule_request.options.maxTimeSec = 30
+    medium_schedule_request.options.seed += 1
+    updates, stop = solve_pool.channel()
+    start = time.perf_counter()
+    future = solve_pool.submit(stream_request, medium_schedule_request, updates, stop)
+    assert updates.get(timeout=20).assignments
+    stop.set()
+    response = future.result(timeout=20)
+    assert time.perf_counter() - start < 10
+    assert response.assignments
+
+def test_solve_pool_rejects_when_full(medium_schedule_request, monkeypatch):
+    """Con la cola llena se rechaza con 429 y /health sigue respondiendo"""
+    import threading
+    import time
+    import app.main as main
+    from app.solve_pool import SolvePool
+
+    pool = SolvePool(workers=1, queue_depth=0)
+    monkeypatch.setattr(main, "solve_pool", pool)
+    medium_schedule_request.options.maxTimeSec = 3
+
+    busy = threading.Thread(target=client.post, args=("/solve",), kwargs={"json": medium_schedule_request.dict()})
+    busy.start()
+    try:
+        deadline = time.perf_counter() + 10
+        while pool.admitted == 0 and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        assert pool.admitted == 1
+
+        start = time.perf_counter()
+        assert client.get("/health").status_code == 200
+        assert time.perf_counter() - start < 1
+
+        # Otra semilla: una solicitud idéntica esperaría a la que está en curso
+        medium_schedule_request.options.seed += 1
+        rejected = client.post("/solve", json=medium_schedule_request.dict())
+        assert rejected.status_code == 429
+        assert "Retry-After" in rejected.headers
+    finally:
+        busy.join()
+        pool.shutdown()
+    assert pool.admitted == 0
+
+def test_jobs_endpoints(small_schedule_request, medium_schedule_request):
+    """Un job se resuelve en segundo plano y uno en curso se puede cancelar"""
+    import time
+
+    def wait_for(job_id, condition, timeout=20):
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            job = client.get(f"/jobs/{job_id}").json()
+            if condition(job):
+                return job
+            time.sleep(0.05)
+        raise AssertionError(f"Job {job_id} no llegó al estado esperado: {job}")
+
+    created = client.post("/jobs", json=small_schedule_request.dict())
+    assert created.status_code == 202
+    assert created.json()["status"] in ("QUEUED", "RUNNING")
+    job = wait_for(created.json()["id"], lambda job: job["status"] == "COMPLETED")
+    assert job["result"]["status"] in ("OPTIMAL", "FEASIBLE")
+    assert job["finishedAt"] >= job["startedAt"]
+
+    # Un job largo reporta la mejor solución hasta ahora y se detiene al cancelarlo
+    medium_schedule_request.options.maxTimeSec = 30
+    medium_schedule_request.options.gapTolerance = 0
+    job_id = client.post("/jobs", json=medium_schedule_request.dict()).json()["id"]
+    wait_for(job_id, lambda job: job["progress"] is not None)
+    start = time.perf_counter()
+    cancelled = client.delete(f"/jobs/{job_id}")
+    assert cancelled.status_code == 200
+    assert cancelled.json()["status"] == "CANCELLED"
+    job = wait_for(job_id, lambda job: job["finishedAt"] is not None)
+    assert time.perf_counter() - start < 10
+    assert job["status"] == "CANCELLED"
+    assert job["result"]["assignments"]
+
+    assert client.get("/jobs/desconocido").status_code == 404
+
+def test_cancel_running_lns_job(medium_schedule_request):
+    """Un job LNS en curso se detiene al cancelarlo y conserva su mejor horario"""
+    import time
+    from app.domain.models import CpMode
+
+    medium_schedule_request.options.cpMode = CpMode.LNS
+    medium_schedule_request.options.maxTimeSec = 30
+    job_id = client.post("/jobs", json=medium_schedule_request.dict()).json()["id"]
+
+    deadline = time.perf_counter() + 20
+    while client.get(f"/jobs/{job_id}").json()["status"] != "RUNNING" and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    time.sleep(1)
+    start = time.perf_counter()
+    cancelled = client.delete(f"/jobs/{job_id}")
+    assert cancelled.status_code == 200
+    assert cancelled.json()["status"] == "CANCELLED"
+
+    while client.get(f"/jobs/{job_id}").json()["finishedAt"] is None and time.perf_counter() - start < 20:
+        time.sleep(0.05)
+    job = client.get(f"/jobs/{job_id}").json()
+    assert time.perf_counter() - start < 10
+    assert job["status"] == "CANCELLED"
+    assert len(job["result"]["assignments"]) == sum(c.blocksPerWeek for c in medium_schedule_request.courses)
+
+def test_solve_result_cache_and_coalescing(small_schedule_request, monkeypatch):
+    """Solicitudes idénticas se resuelven una vez: en paralelo se comparten y luego se sirven de la caché"""
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    import app.main as main
+    from app.result_cache import ResultCache, request_key
+
+    cache = ResultCache(max_entries=2, ttl_sec=60)
+    monkeypatch.setattr(main, "result_cache", cache)
+    small_schedule_request.options.maxTimeSec = 2
+    body = small_schedule_request.dict()
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        responses = list(executor.map(lambda _: client.post("/solve", json=body).json(), range(3)))
+    assert cache.misses == 1
+    assert cache.coalesced + cache.hits == 2
+    assert sorted(r["metrics"]["resultCacheHit"] for r in responses) == [False, True, True]
+    assert all(r["assignments"] == responses[0]["assignments"] for r in responses)
+
+    # El orden de las listas de datos no cambia la clave; el de los periodos y la semilla sí
+    reordered = small_schedule_request.model_copy(deep=True)
+    reordered.courses.reverse()
+    reordered.rooms.reverse()
+    assert request_key(reordered) == request_key(small_schedule_request)
+    assert client.post("/solve", json=reordered.dict()).json()["metrics"]["resultCacheHit"] is True
+    reordered.periods.reverse()
+    assert request_key(reordered) != request_key(small_schedule_request)
+    reseeded = small_schedule_request.model_copy(deep=True)
+    reseeded.options.seed += 1
+    assert request_key(reseeded) != request_key(small_schedule_request)
+
+    # Expulsión LRU y por vencimiento
+    async def solved():
+        return main.ScheduleResponse(**responses[0])
+
+    async def fill(ttl_sec):
+        lru = ResultCache(max_entries=2, ttl_sec=ttl_sec)
+        for key in ["a", "b", "a", "c"]:
+            await lru.get_or_solve(key, solved)
+        return lru
+
+    lru = asyncio.run(fill(60))
+    assert lru.misses == 3 and lru.hits == 1
+    assert len(lru) == 2 and "b" not in lru._entries
+    expired = asyncio.run(fill(-1))
+    assert expired.misses == 4 and expired.hits == 0
+
+    # Un TIMEOUT no se guarda: otro intento podría encontrar solución
+    async def timed_out():
+        return main.ScheduleResponse(**{**responses[0], "status": "TIMEOUT", "assignments": []})
+
+    async def twice():
+        retry = ResultCache(max_entries=2, ttl_sec=60)
+        await retry.get_or_solve("t", timed_out)
+        await retry.get_or_solve("t", timed_out)
+        return retry
+
+    assert asyncio.run(twice()).misses == 2
+
+def test_result_cache_survives_cancelled_waiter():
+    """Cancelar a un cliente que espera una resolución compartida no afecta al primero ni a los demás"""
+    import asyncio
+    from app.domain.models import Metrics, ScheduleResponse
+    from app.result_cache import ResultCache
+
+    cache = ResultCache(max_entries=2, ttl_sec=60)
+
+    async def solve():
+        await asyncio.sleep(0.2)
+        metrics = Metrics(objective=0, holes=0, late=0, early=0, imbalance=0, hardViolations=0)
+        return ScheduleResponse(status="OPTIMAL", assignments=[], metrics=metrics, explanation="")
+
+    async def run():
+        leader = asyncio.create_task(cache.get_or_solve("k", solve))
+        await asyncio.sleep(0.05)
+        cancelled = asyncio.create_task(cache.get_or_solve("k", solve))
+        waiter = asyncio.create_task(cache.get_or_solve("k", solve))
+        await asyncio.sleep(0.05)
+        cancelled.cancel()
+        return await asyncio.gather(leader, cancelled, waiter, return_exceptions=True)
+
+    leader, cancelled, waiter = asyncio.run(run())
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert leader.status == "OPTIMAL" and leader.metrics.resultCacheHit is False
+    assert waiter.status == "OPTIMAL" and waiter.metrics.resultCacheHit is True
+    assert cache.misses == 1 and cache.coalesced == 2
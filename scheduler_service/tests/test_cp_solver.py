@@ -9,6 +9,11 @@ def test_cp_solver_small_case(small_schedule_request):
     
     assert response.status in [SolutionStatus.OPTIMAL, SolutionStatus.FEASIBLE]
     assert len(response.assignments) == 5  # 3 bloques MAT + 2 bloques FIS
+
+    # Estadísticas de construcción del modelo
+    assert response.metrics.buildTimeSec >= 0
+    assert response.metrics.numVariables >= len(solver.x)
+    assert response.metrics.numConstraints > 0
     
     # Verificar restricciones duras
     teacher_periods = {}
@@ -73,3 +78,341 @@ def test_cp_solver_infeasible_case(small_schedule_request):
     response = solver.solve()
     
     assert response.status == SolutionStatus.INFEASIBLE
+
+def test_lns_improves_initial_schedule(medium_schedule_request):
+    """Prueba la búsqueda LNS partiendo de la solución de la metaheurística"""
+    from app.solver_cp.lns import LargeNeighborhoodSearch
+    from app.solver_meta.simulated_annealing import SimulatedAnnealing
+    from app.domain.models import AnnealingSchedule
+
+    medium_schedule_request.options.maxTimeSec = 3
+    medium_schedule_request.options.annealingSchedule = AnnealingSchedule.FIXED
+    initial = SimulatedAnnealing(medium_schedule_request).solve()
+
+    response = LargeNeighborhoodSearch(medium_schedule_request).solve(initial.assignments)
+
+    assert response.status == SolutionStatus.FEASIBLE
+    assert response.metrics.hardViolations == 0
+    assert len(response.assignments) == len(initial.assignments)
+    assert response.metrics.objective <= initial.metrics.objective
+
+def test_lns_with_all_blocks_fixed(small_schedule_request):
+    """Sin bloques libres, LNS devuelve el horario fijo sin agotar el plazo"""
+    import time
+    from app.solver_cp.lns import LargeNeighborhoodSearch
+    from app.domain.models import FixedAssignment
+
+    small_schedule_request.hardLocks = []
+    small_schedule_request.fixedAssignments = [
+        FixedAssignment(courseId="MAT-1A", period=p, roomId="A1") for p in ["Lun-2", "Mar-1", "Mar-2"]
+    ] + [
+        FixedAssignment(courseId="FIS-1A", period=p, roomId="LAB1") for p in ["Lun-1", "Lun-3"]
+    ]
+    start = time.perf_counter()
+    response = LargeNeighborhoodSearch(small_schedule_request).solve()
+
+    assert time.perf_counter() - start < 2
+    assert response.metrics.objective > 0
+    assert len(response.assignments) == 5
+
+def test_lns_completes_partial_previous_schedule(medium_schedule_request):
+    """Un horario anterior parcial se completa antes de la búsqueda"""
+    from app.solver_cp.lns import LargeNeighborhoodSearch
+    from app.solver_meta.simulated_annealing import SimulatedAnnealing
+    from app.domain.models import AnnealingSchedule
+
+    medium_schedule_request.options.maxTimeSec = 3
+    medium_schedule_request.options.annealingSchedule = AnnealingSchedule.FIXED
+    previous = SimulatedAnnealing(medium_schedule_request).solve().assignments
+    medium_schedule_request.previousSchedule = previous[:6]
+
+    response = LargeNeighborhoodSearch(medium_schedule_request).solve()
+
+    assert len(response.assignments) == sum(c.blocksPerWeek for c in medium_schedule_request.courses)
+    assert response.status == SolutionStatus.FEASIBLE
+    assert response.metrics.hardViolations == 0
+
+def test_lns_partial_initial_solution_and_empty_days(small_schedule_request):
+    """Una solución inicial parcial se completa y un día sin clases no cuenta huecos"""
+    from ortools.sat.python import cp_model
+    from app.solver_cp.lns import LargeNeighborhoodSearch
+    from app.domain.models import Assignment
+
+    small_schedule_request.options.maxTimeSec = 2
+    lns = LargeNeighborhoodSearch(small_schedule_request)
+    response = lns.solve([Assignment(courseId="MAT-1A", period="Lun-1", roomId="A1")])
+    assert len(response.assignments) == sum(c.blocksPerWeek for c in small_schedule_request.courses)
+    assert response.status == SolutionStatus.FEASIBLE
+
+    # Submodelo de un docente sin clases en el día: su penalización es cero
+    inst = lns.instance
+    periods = inst.day_period_lists[0]
+    model = cp_model.CpModel()
+    occupancy = [model.NewBoolVar('') for _ in periods]
+    for var in occupancy:
+        model.Add(var == 0)
+    model.Minimize(lns._day_penalty(model, periods, occupancy, 0, 0))
+    solver = cp_model.CpSolver()
+    assert solver.Solve(model) == cp_model.OPTIMAL
+    assert solver.ObjectiveValue() == 0
+
+def test_two_stage_solver(medium_schedule_request):
+    """La descomposición en dos etapas entrega un horario completo con menos variables"""
+    from app.solver_cp.two_stage import TwoStageSolver
+
+    medium_schedule_request.options.maxTimeSec = 5
+    solver = TwoStageSolver(medium_schedule_request)
+    response = solver.solve()
+    monolithic = ScheduleSolver(medium_schedule_request)
+
+    assert response.status in [SolutionStatus.OPTIMAL, SolutionStatus.FEASIBLE]
+    assert response.metrics.hardViolations == 0
+    assert len(response.assignments) == sum(c.blocksPerWeek for c in medium_schedule_request.courses)
+    assert len(solver.y) < len(monolithic.x)
+
+def test_cp_solver_profiles(small_schedule_request):
+    """Los perfiles configuran los parámetros de CP-SAT"""
+    from app.domain.models import CpProfile
+    from app.solver_cp.profiles import available_cpus
+
+    solver = ScheduleSolver(small_schedule_request)
+    assert solver.solver.parameters.num_workers == available_cpus()
+    assert solver.solver.parameters.relative_gap_limit == 0
+
+    small_schedule_request.options.cpProfile = CpProfile.DETERMINISTIC
+    small_schedule_request.options.cpWorkers = 2
+    first = ScheduleSolver(small_schedule_request)
+    assert first.solver.parameters.num_workers == 2
+    assert first.solver.parameters.interleave_search
+    assert first.solver.parameters.max_time_in_seconds == small_schedule_request.options.maxTimeSec
+    assert first.solver.parameters.max_deterministic_time < small_schedule_request.options.maxTimeSec
+
+    response = first.solve()
+    second = ScheduleSolver(small_schedule_request).solve()
+    assert response.status in [SolutionStatus.OPTIMAL, SolutionStatus.FEASIBLE]
+    assert response.assignments == second.assignments
+
+def test_cp_solver_warm_start(small_schedule_request):
+    """El horario previo se usa como sugerencia y se informa si es factible"""
+    from app.domain.models import Assignment
+
+    first = ScheduleSolver(small_schedule_request).solve()
+    small_schedule_request.previousSchedule = first.assignments
+    warm = ScheduleSolver(small_schedule_request).solve()
+
+    assert warm.status in [SolutionStatus.OPTIMAL, SolutionStatus.FEASIBLE]
+    assert warm.metrics.hintFeasible is True
+    assert warm.metrics.timeToFirstSolutionSec is not None
+
+    # Una sugerencia incompleta se repara en vez de descartarse
+    small_schedule_request.previousSchedule = [Assignment(courseId="MAT-1A", period="Lun-1", roomId="A1")]
+    repaired = ScheduleSolver(small_schedule_request).solve()
+    assert repaired.metrics.hintFeasible is False
+    assert repaired.status in [SolutionStatus.OPTIMAL, SolutionStatus.FEASIBLE]
+
+    # Sin horario previo, una pasada heurística provee la sugerencia
+    small_schedule_request.previousSchedule = []
+    small_schedule_request.options.warmStart = True
+    heuristic = ScheduleSolver(small_schedule_request).solve()
+    assert heuristic.metrics.hintFeasible is True
+    assert heuristic.metrics.warmStartTimeSec > 0
+
+def test_model_cache_eviction(small_schedule_request):
+    """La caché de modelos expulsa el menos usado al superar su capacidad"""
+    from app.solver_cp.model_cache import ModelCache
+
+    cache = ModelCache(max_entries=1)
+    first, second = ScheduleSolver(small_schedule_request), ScheduleSolver(small_schedule_request)
+    cache.checkin("a", first)
+    cache.checkin("b", second)
+
+    assert len(cache) == 1
+    assert cache.checkout("a") is None
+    assert cache.checkout("b") is second
+    assert cache.checkout("b") is None  # retirado mientras se usa
+
+    tiny = ModelCache(max_bytes=1)
+    tiny.checkin("a", first)
+    assert len(tiny) == 0
+
+def test_cp_solver_symmetry_breaking(medium_schedule_request):
+    """La ruptura de simetría conserva la factibilidad y acepta el horario previo"""
+    from app.domain.metrics import assignments_to_arrays, compute_metrics
+
+    request = medium_schedule_request.model_copy(deep=True)
+    # Sección paralela: mismo docente, tipo de sala y bloques que el primer curso
+    twin = request.courses[0].model_copy(update={'id': request.courses[0].id + '-B'})
+    request.courses.append(twin)
+    request.options.maxTimeSec = 10
+    baseline = ScheduleSolver(request).solve()
+    assert baseline.status in [SolutionStatus.OPTIMAL, SolutionStatus.FEASIBLE]
+
+    request.options.cpSymmetryBreaking = True
+    request.previousSchedule = baseline.assignments
+    solver = ScheduleSolver(request)
+    solution = solver.solve()
+
+    assert solution.status in [SolutionStatus.OPTIMAL, SolutionStatus.FEASIBLE]
+    assert solution.metrics.symmetryGroups >= 2
+    assert solution.metrics.hintFeasible is True
+
+    # La forma canónica del horario previo tiene el mismo costo
+    arrays = assignments_to_arrays(solver.instance, baseline.assignments)
+    canonical = solver.symmetry.canonicalize(*arrays)
+    before = compute_metrics(solver.instance, *arrays)
+    after = compute_metrics(solver.instance, *canonical)
+    assert after.hardViolations == 0
+    assert (after.holes, after.imbalance) == (before.holes, before.imbalance)
+
+def test_cp_solver_presolve(small_schedule_request):
+    """El presolve no crea variables prohibidas y fija las asignaciones fijas como constantes"""
+    from app.domain.models import FixedAssignment
+    from app.solver_cp.two_stage import TwoStageSolver
+
+    small_schedule_request.fixedAssignments = [
+        FixedAssignment(courseId="MAT-1A", period="Mar-1", roomId="A1")
+    ]
+    for solver_class in (ScheduleSolver, TwoStageSolver):
+        solver = solver_class(small_schedule_request)
+        response = solver.solve()
+        assert response.status in [SolutionStatus.OPTIMAL, SolutionStatus.FEASIBLE]
+        # Lun-1 (no disponible), Mar-3 (prohibido) y el resto de Mar-1 para T1 no generan variables
+        assert response.metrics.prunedVariables >= 2
+        assert ("MAT-1A", "Mar-1", "A1") in {(a.courseId, a.period, a.roomId) for a in response.assignments}
+
+    # Una asignación fija en un periodo no disponible sigue siendo infactible
+    small_schedule_request.fixedAssignments = [
+        FixedAssignment(courseId="MAT-1A", period="Lun-1", roomId="A1")
+    ]
+    assert ScheduleSolver(small_schedule_request).solve().status == SolutionStatus.INFEASIBLE
+
+def test_portfolio_solver(small_schedule_request, medium_schedule_request):
+    """El portafolio se detiene al probar optimalidad y respeta el plazo compartido"""
+    import time
+    from app.solver_cp.portfolio import PortfolioSolver
+
+    start = time.perf_counter()
+    response = PortfolioSolver(small_schedule_request, ScheduleSolver(small_schedule_request)).solve()
+    assert response.status == SolutionStatus.OPTIMAL
+    assert response.metrics.portfolioWinner == "cp"
+    assert time.perf_counter() - start < small_schedule_request.options.maxTimeSec
+
+    medium_schedule_request.options.maxTimeSec = 3
+    start = time.perf_counter()
+    portfolio = PortfolioSolver(medium_schedule_request, ScheduleSolver(medium_schedule_request))
+    response = portfolio.solve()
+    assert time.perf_counter() - start < 2 * medium_schedule_request.options.maxTimeSec
+    assert response.metrics.portfolioWinner in ["cp", "meta"]
+    assert response.metrics.hardViolations == 0
+    assert portfolio.meta_response is not None
+
+    # CP-SAT se detiene al alcanzar la brecha: el recocido no agota su plazo
+    medium_schedule_request.options.maxTimeSec = 30
+    medium_schedule_request.options.gapTolerance = 1.0
+    start = time.perf_counter()
+    response = PortfolioSolver(medium_schedule_request, ScheduleSolver(medium_schedule_request)).solve()
+    assert time.perf_counter() - start < 10
+    assert response.metrics.hardViolations == 0
+
+def test_cp_solver_lexicographic(small_schedule_request):
+    """El modo lexicográfico optimiza por etapas sin alterar el modelo reutilizable"""
+    from app.domain.models import ObjectiveMode, Penalty
+
+    weighted = ScheduleSolver(small_schedule_request).solve()
+
+    small_schedule_request.options.objectiveMode = ObjectiveMode.LEXICOGRAPHIC
+    small_schedule_request.options.lexicographicOrder = [Penalty.LATE]
+    solver = ScheduleSolver(small_schedule_request)
+    solver.build_model()
+    constraints = len(solver.model.Proto().constraints)
+    response = solver.solve()
+
+    assert response.status == SolutionStatus.OPTIMAL
+    values = response.metrics.lexicographicValues
+    assert list(values)[0] == "late"
+    assert response.metrics.late == values["late"] <= weighted.metrics.late
+    assert len(solver.model.Proto().constraints) == constraints
+    # Ningún curso normal puede usar el laboratorio: esa penalización no tiene etapa
+    assert solver.constant_penalties == {"specialRoom"}
+    assert "specialRoom" not in values
+
+def test_decomposed_solver(small_schedule_request):
+    """Cursos sin docente ni tipo de sala en común se resuelven por separado"""
+    from app.solver_cp.decomposition import DecomposedSolver, split_components
+    from app.domain.models import Availability, Room, RoomType
+
+    components = split_components(small_schedule_request)
+    assert [[c.id for c in r.courses] for r in components] == [["MAT-1A"], ["FIS-1A"]]
+    assert [[r.id for r in c.rooms] for c in components] == [["A1"], ["LAB1"]]
+    assert components[0].hardLocks and not components[1].hardLocks
+
+    response = DecomposedSolver(small_schedule_request, components).solve()
+    assert response.status == SolutionStatus.OPTIMAL
+    assert response.metrics.components == 2
+    assert len(response.assignments) == 5
+    assert response.metrics.hardViolations == 0
+
+    # Un docente sin disponibilidad deja su componente sin solución: se devuelven las demás
+    infeasible = small_schedule_request.model_copy(deep=True)
+    infeasible.options.fallbackIfNoFeasible = False
+    infeasible.availability = [Availability(teacherId="T2", period=p, allowed=False) for p in infeasible.periods]
+    response = DecomposedSolver(infeasible, split_components(infeasible)).solve()
+    assert response.status == SolutionStatus.INFEASIBLE
+    assert {a.courseId for a in response.assignments} == {"MAT-1A"}
+    assert len(response.assignments) == 3
+
+    # Dos docentes con una sola sala del tipo compiten por ella; con dos salas no
+    shared = small_schedule_request.model_copy(deep=True)
+    shared.courses[1].roomType = RoomType.NORMAL
+    shared.hardLocks = []
+    assert len(split_components(shared)) == 1
+    shared.rooms.append(Room(id="A2", type=RoomType.NORMAL))
+    components = split_components(shared)
+    assert len(components) == 2
+    response = DecomposedSolver(shared, components).solve()
+    assert response.metrics.hardViolations == 0
+    assert len({(a.period, a.roomId) for a in response.assignments}) == 5
+
+    # Un docente con cursos de ambos tipos une las componentes
+    small_schedule_request.courses[1].teacherId = "T1"
+    assert len(split_components(small_schedule_request)) == 1
+
+def test_cp_solver_compact_formulation(medium_schedule_request):
+    """La formulación compacta usa menos variables auxiliares y cuenta los huecos como las métricas"""
+    from app.domain.models import Availability, CpFormulation
+
+    window = ScheduleSolver(medium_schedule_request)
+    window.build_model()
+
+    medium_schedule_request.options.cpFormulation = CpFormulation.COMPACT
+    solver = ScheduleSolver(medium_schedule_request)
+    response = solver.solve()
+
+    assert response.status == SolutionStatus.OPTIMAL
+    assert response.metrics.numVariables < window._model_stats()['numVariables']
+    assert solver.solver.Value(solver.penalties['holes']) == response.metrics.holes
+
+    # Un día sin periodos disponibles para el docente no tiene variables de huecos
+    medium_schedule_request.availability += [
+        Availability(teacherId="T1", period=f"Vie-{block}", allowed=False) for block in range(1, 8)
+    ]
+    solver = ScheduleSolver(medium_schedule_request)
+    solver.build_model()
+    names = {var.name for var in solver.model.Proto().variables}
+    assert "first_0_4" not in names and "first_0_3" in names
+    assert solver.solve().metrics.holes == solver.solver.Value(solver.penalties['holes'])
+
+def test_cp_solver_gap_reporting(medium_schedule_request):
+    """Las métricas informan cota, brecha y tiempos; una tolerancia amplia termina antes"""
+    medium_schedule_request.options.maxTimeSec = 10
+    medium_schedule_request.options.gapTolerance = 1.0
+    response = ScheduleSolver(medium_schedule_request).solve()
+    metrics = response.metrics
+
+    # Con tolerancia del 100 % basta la primera solución
+    assert response.status in [SolutionStatus.OPTIMAL, SolutionStatus.FEASIBLE]
+    assert metrics.wallTimeSec < medium_schedule_request.options.maxTimeSec
+    assert metrics.bestBound <= metrics.objective
+    assert 0 <= metrics.gap <= 1.0
+    assert metrics.deterministicTimeSec > 0
+    assert metrics.solutionsFound >= 1
@@ -0,0 +1,47 @@
+from app.domain.instance import ProblemInstance
+from app.domain.metrics import compute_metrics
+import numpy as np
+import pytest
+
+def test_problem_instance_indexes(small_schedule_request):
+    """Prueba la compilación de la solicitud a índices enteros"""
+    inst = ProblemInstance(small_schedule_request)
+
+    assert inst.n_periods == 6 and inst.n_days == 2
+    assert inst.days == ["Lun", "Mar"]
+    assert inst.day_period_lists == [[0, 1, 2], [3, 4, 5]]
+    assert inst.period_first.tolist() == [True, False, False, True, False, False]
+    assert inst.period_last.tolist() == [False, False, True, False, False, True]
+
+    mat = inst.course_index["MAT-1A"]
+    t1 = inst.teacher_index["T1"]
+    assert inst.course_teacher[mat] == t1
+    assert inst.teacher_courses[t1] == [mat]
+    assert inst.course_rooms[mat].tolist() == [inst.room_index["A1"]]
+
+    # Disponibilidad como arreglo y máscara de bits
+    lun1 = inst.period_index["Lun-1"]
+    assert not inst.teacher_available[t1, lun1]
+    assert not (inst.teacher_available_mask[t1] >> lun1) & 1
+
+    # La prohibición de MAT-1A en Mar-3 se refleja en los periodos permitidos
+    assert not inst.course_allowed[mat, inst.period_index["Mar-3"]]
+    assert inst.course_allowed[mat, inst.period_index["Mar-2"]]
+
+def test_compute_metrics(small_schedule_request):
+    """Prueba el conteo de huecos, extremos y violaciones sobre arreglos"""
+    inst = ProblemInstance(small_schedule_request)
+    mat = inst.course_index["MAT-1A"]
+    a1 = inst.room_index["A1"]
+
+    # MAT-1A en Lun-1 (no disponible) y Lun-3: un hueco, un bloque temprano y uno tardío
+    course = np.array([mat, mat])
+    period = np.array([inst.period_index["Lun-1"], inst.period_index["Lun-3"]])
+    room = np.array([a1, a1])
+    metrics = compute_metrics(inst, course, period, room)
+
+    assert metrics.holes == 1
+    assert metrics.early == 1
+    assert metrics.late == 1
+    assert metrics.hardViolations == 1
+    assert metrics.imbalance == pytest.approx(1.0)
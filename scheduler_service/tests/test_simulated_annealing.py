@@ -51,3 +51,164 @@ def test_simulated_annealing_repair(medium_schedule_request):
     
     for course in medium_schedule_request.courses:
         assert course_blocks.get(course.id, 0) == course.blocksPerWeek
+
+def test_simulated_annealing_state_roundtrip(medium_schedule_request):
+    """El estado compacto conserva las asignaciones fijas y se convierte una sola vez"""
+    solver = SimulatedAnnealing(medium_schedule_request)
+    initial_solution = [Assignment(courseId="MAT-1A", period="Mar-2", roomId="A1")]
+
+    state = solver._build_state(initial_solution)
+    assert len(state) == sum(c.blocksPerWeek for c in medium_schedule_request.courses)
+    assert state.fixed.sum() == 1
+
+    solver._complete_initial_solution(state)
+    assert state.placed().all()
+
+    assignments = solver._to_assignments(state)
+    assert len(assignments) == len(state)
+    assert any(
+        a.courseId == "MAT-1A" and a.period == "Mar-2" and a.roomId == "A1"
+        for a in assignments
+    )
+
+def test_incremental_evaluator_matches_full_evaluation(medium_schedule_request):
+    """El costo incremental coincide con la evaluación completa tras cada movimiento"""
+    from app.solver_meta.delta_evaluator import IncrementalEvaluator
+
+    solver = SimulatedAnnealing(medium_schedule_request)
+    state = solver._build_state([])
+    solver._generate_initial_solution(state)
+    evaluator = IncrementalEvaluator(solver.instance, state)
+
+    for step in range(300):
+        undo = evaluator.apply(solver._propose_move(state))
+        assert evaluator.cost == pytest.approx(solver._evaluate_solution(state))
+        if step % 3 == 0:
+            evaluator.revert(undo)
+            assert evaluator.cost == pytest.approx(solver._evaluate_solution(state))
+
+def test_simulated_annealing_adaptive_deadline(medium_schedule_request):
+    """El esquema adaptativo respeta el presupuesto de tiempo y reporta estadísticas"""
+    import time
+
+    medium_schedule_request.options.metaMaxTimeSec = 0.5
+    solver = SimulatedAnnealing(medium_schedule_request)
+    start = time.perf_counter()
+    response = solver.solve()
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 2.0
+    assert response.metrics.hardViolations == 0
+    assert response.metrics.iterations > 0
+    assert response.metrics.iterationsPerSec > 0
+    assert 0 <= response.metrics.acceptanceRatio <= 1
+
+def test_simulated_annealing_fixed_schedule(small_schedule_request):
+    """El esquema clásico de iteraciones fijas sigue disponible"""
+    from app.domain.models import AnnealingSchedule
+
+    small_schedule_request.options.annealingSchedule = AnnealingSchedule.FIXED
+    response = SimulatedAnnealing(small_schedule_request).solve()
+
+    assert response.metrics.iterations <= 1000
+    assert response.metrics.hardViolations == 0
+
+def test_parallel_annealing_deterministic(medium_schedule_request):
+    """El multi-arranque en paralelo es reproducible para una semilla y cantidad de trayectorias"""
+    from app.solver_meta.multistart import ParallelAnnealing, derive_seeds
+    from app.domain.models import AnnealingSchedule
+
+    medium_schedule_request.options.metaWorkers = 3
+    medium_schedule_request.options.metaMaxIterations = 3000
+
+    first = ParallelAnnealing(medium_schedule_request).solve()
+    second = ParallelAnnealing(medium_schedule_request).solve()
+
+    assert first.status == SolutionStatus.METAHEURISTIC
+    assert first.metrics.hardViolations == 0
+    assert first.assignments == second.assignments
+    assert first.metrics.objective == second.metrics.objective
+    assert len(set(derive_seeds(42, 3))) == 3
+
+    # El esquema fijo tampoco depende del reloj
+    medium_schedule_request.options.metaMaxIterations = None
+    medium_schedule_request.options.annealingSchedule = AnnealingSchedule.FIXED
+    first = ParallelAnnealing(medium_schedule_request).solve()
+    second = ParallelAnnealing(medium_schedule_request).solve()
+    assert first.assignments == second.assignments
+
+def test_parallel_tempering(medium_schedule_request):
+    """El intercambio de réplicas entrega un horario completo, factible y reproducible"""
+    from app.solver_meta.parallel_tempering import ParallelTempering
+
+    medium_schedule_request.options.temperingReplicas = 3
+    medium_schedule_request.options.metaMaxIterations = 4000
+
+    first = ParallelTempering(medium_schedule_request).solve()
+    second = ParallelTempering(medium_schedule_request).solve()
+
+    assert first.status == SolutionStatus.METAHEURISTIC
+    assert first.metrics.hardViolations == 0
+    assert len(first.assignments) == sum(c.blocksPerWeek for c in medium_schedule_request.courses)
+    assert first.assignments == second.assignments
+
+def test_batch_move_deltas_match_incremental(medium_schedule_request):
+    """Los deltas vectorizados de un lote coinciden con aplicar y revertir cada movimiento"""
+    from app.solver_meta.batch_moves import BatchMoveEvaluator
+    from app.solver_meta.delta_evaluator import IncrementalEvaluator
+    import numpy as np
+
+    solver = SimulatedAnnealing(medium_schedule_request)
+    state = solver._initial_state(None)
+    evaluator = IncrementalEvaluator(solver.instance, state)
+    batch = BatchMoveEvaluator(solver.instance, seed=5)
+
+    for _ in range(3):
+        moves = batch.propose(evaluator, 300)
+        deltas = batch.score(evaluator, moves)
+        base = evaluator.cost
+        for k in np.flatnonzero(np.isfinite(deltas)).tolist():
+            undo = evaluator.apply(batch.changes(moves, k))
+            assert deltas[k] == pytest.approx(evaluator.cost - base)
+            evaluator.revert(undo)
+        # Avanzar el estado para probar otros contadores
+        evaluator.apply(batch.changes(moves, int(np.argmin(deltas))))
+
+def test_simulated_annealing_batch_moves(medium_schedule_request):
+    """El recocido con lotes de movimientos es factible y reproducible"""
+    medium_schedule_request.options.metaBatchSize = 128
+    medium_schedule_request.options.metaMaxIterations = 20000
+
+    first = SimulatedAnnealing(medium_schedule_request).solve()
+    second = SimulatedAnnealing(medium_schedule_request).solve()
+
+    assert first.metrics.hardViolations == 0
+    assert first.metrics.iterations > 0
+    assert first.assignments == second.assignments
+
+def test_greedy_construction(medium_schedule_request):
+    """El constructor voraz entrega un inicio sin violaciones duras"""
+    import time
+
+    solver = SimulatedAnnealing(medium_schedule_request)
+    state = solver._build_state([])
+    start = time.perf_counter()
+    solver._generate_initial_solution(state)
+    elapsed = time.perf_counter() - start
+
+    assert solver.construction.feasible
+    assert state.placed().all()
+    assert solver._calculate_metrics(state).hardViolations == 0
+    assert elapsed < 1.0
+
+def test_greedy_construction_reports_infeasibility(small_schedule_request):
+    """Si no hay construcción factible se informa la causa"""
+    # T1 solo está disponible en 5 periodos y MAT-1A no puede ir en Mar-3
+    small_schedule_request.courses[0].blocksPerWeek = 6
+
+    solver = SimulatedAnnealing(small_schedule_request)
+    response = solver.solve()
+
+    assert not solver.construction.feasible
+    assert any("MAT-1A" in m for m in solver.construction.messages)
+    assert "No existe una construcción inicial factible" in response.explanation